@@ -1,17 +1,19 @@
-from flask import Flask, jsonify, request
+from flask import Flask, Response, g, jsonify, request, stream_with_context
 from flask_cors import CORS
 import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
 import traceback
 import logging
+import json
 import os
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from importlib.machinery import SourceFileLoader
 
 # Robustly import fetch functions from config.py whether run as script or package
 try:
     # package-style
-    from .config import fetch_history, fetch_fundamentals_av, fetch_global_quote_av
+    from .config import fetch_history, fetch_fundamentals_av, fetch_global_quote_av, cache_stats
 except Exception:
     try:
         # script/module in same folder
@@ -19,6 +21,7 @@ except Exception:
         fetch_history = config.fetch_history  # type: ignore[attr-defined]
         fetch_fundamentals_av = config.fetch_fundamentals_av  # type: ignore[attr-defined]
         fetch_global_quote_av = config.fetch_global_quote_av  # type: ignore[attr-defined]
+        cache_stats = config.cache_stats  # type: ignore[attr-defined]
     except Exception:
         try:
             # direct load from file path
@@ -27,6 +30,7 @@ except Exception:
             fetch_history = _config.fetch_history  # type: ignore[attr-defined]
             fetch_fundamentals_av = _config.fetch_fundamentals_av  # type: ignore[attr-defined]
             fetch_global_quote_av = _config.fetch_global_quote_av  # type: ignore[attr-defined]
+            cache_stats = _config.cache_stats  # type: ignore[attr-defined]
         except Exception:
             # last resort: define a stub to avoid signature mismatch
             def fetch_history(ticker, period='120d', frequency='daily', outputsize='compact', return_metadata=False, api_key=None):
@@ -35,18 +39,24 @@ except Exception:
                 return {}
             def fetch_global_quote_av(ticker):
                 return {"error": "config.fetch_global_quote_av is not available"}
+            def cache_stats():
+                return {}
 
 # Import indicators computation
 try:
-    from .features import compute_technical_indicators
+    from .features import compute_technical_indicators, indicator_dependencies, valid_rows
 except Exception:
     try:
         import features  # type: ignore
         compute_technical_indicators = features.compute_technical_indicators  # type: ignore[attr-defined]
+        indicator_dependencies = features.indicator_dependencies  # type: ignore[attr-defined]
+        valid_rows = features.valid_rows  # type: ignore[attr-defined]
     except Exception:
         _feat_path = os.path.join(os.path.dirname(__file__), 'features.py')
         _feat = SourceFileLoader('features', _feat_path).load_module()  # type: ignore[deprecated]
         compute_technical_indicators = _feat.compute_technical_indicators  # type: ignore[attr-defined]
+        indicator_dependencies = _feat.indicator_dependencies  # type: ignore[attr-defined]
+        valid_rows = _feat.valid_rows  # type: ignore[attr-defined]
 
 # Try to import ML forecaster
 try:
@@ -65,17 +75,319 @@ except Exception:
             def train_and_predict_ml(df, fundamentals, steps=5):
                 raise RuntimeError('ml.train_and_predict_ml is not available')
 
+try:
+    from .ratelimit import BACKGROUND, provider_priority
+except Exception:
+    import ratelimit  # type: ignore
+    BACKGROUND = ratelimit.BACKGROUND  # type: ignore[attr-defined]
+    provider_priority = ratelimit.provider_priority  # type: ignore[attr-defined]
+
+try:
+    from .timing import span, start_timeline, stop_timeline
+except Exception:
+    import timing  # type: ignore
+    span = timing.span  # type: ignore[attr-defined]
+    start_timeline = timing.start_timeline  # type: ignore[attr-defined]
+    stop_timeline = timing.stop_timeline  # type: ignore[attr-defined]
+
+try:
+    from .feature_cache import cached_features, cached_indicators, current_scope, feature_cache_stats, feature_scope
+except Exception:
+    import feature_cache  # type: ignore
+    current_scope = feature_cache.current_scope  # type: ignore[attr-defined]
+    cached_features = feature_cache.cached_features  # type: ignore[attr-defined]
+    cached_indicators = feature_cache.cached_indicators  # type: ignore[attr-defined]
+    feature_cache_stats = feature_cache.feature_cache_stats  # type: ignore[attr-defined]
+    feature_scope = feature_cache.feature_scope  # type: ignore[attr-defined]
+
+try:
+    from .model_registry import model_registry_stats
+except Exception:
+    import model_registry  # type: ignore
+    model_registry_stats = model_registry.model_registry_stats  # type: ignore[attr-defined]
+
+try:
+    from .precompute import start_in_process, store_from_env, watchlist_from_env
+except Exception:
+    import precompute  # type: ignore
+    start_in_process = precompute.start_in_process  # type: ignore[attr-defined]
+    store_from_env = precompute.store_from_env  # type: ignore[attr-defined]
+    watchlist_from_env = precompute.watchlist_from_env  # type: ignore[attr-defined]
+
+try:
+    from .training import offloaded, training_executor, training_stats
+except Exception:
+    import training  # type: ignore
+    offloaded = training.offloaded  # type: ignore[attr-defined]
+    training_executor = training.training_executor  # type: ignore[attr-defined]
+    training_stats = training.training_stats  # type: ignore[attr-defined]
+
+try:
+    from .panel import compute_panel
+except Exception:
+    import panel  # type: ignore
+    compute_panel = panel.compute_panel  # type: ignore[attr-defined]
+
+try:
+    from .market import MarketIndices
+except Exception:
+    import market  # type: ignore
+    MarketIndices = market.MarketIndices  # type: ignore[attr-defined]
+
 LOG = logging.getLogger(__name__)
+TIMING_LOG = logging.getLogger(__name__ + '.timing')
 
 app = Flask(__name__)
 # Allow requests from the React dev server
 CORS(app, resources={r"/api/*": {"origins": ["http://localhost:3000", "http://localhost:5173"]}})
 
 
-def load_and_predict(ticker: str, days: int = 5, manual: dict = None, frequency: str = 'daily'):
+def _timings_requested() -> bool:
+    """Opt-in for the JSON breakdown: ?timings=1, an X-Timings: 1 header or {"timings": true} in the body."""
+    flag = request.args.get('timings') or request.headers.get('X-Timings')
+    if flag is not None:
+        return flag.lower() not in ('0', 'false', 'no', '')
+    payload = request.get_json(force=True, silent=True) if request.method == 'POST' else None
+    return isinstance(payload, dict) and payload.get('timings') is True
+
+
+@app.before_request
+def _start_request_timeline():
+    g._timeline, g._timeline_token = start_timeline()
+
+
+@app.after_request
+def _emit_request_timings(response):
+    """Attach stage timings as a Server-Timing header, log them, and optionally embed them in the JSON body."""
+    tl = g.get('_timeline')
+    if tl is None:
+        return response
+    breakdown = tl.as_dict()
+    if os.environ.get('SERVER_TIMING', '1') != '0':
+        response.headers['Server-Timing'] = tl.server_timing()
+    TIMING_LOG.info(
+        'request timings %s',
+        json.dumps({'method': request.method, 'path': request.path, 'status': response.status_code, 'timings_ms': breakdown}),
+        extra={'timings_ms': breakdown, 'path': request.path, 'status': response.status_code},
+    )
+    if not response.is_streamed and response.is_json and _timings_requested():
+        body = response.get_json(silent=True)
+        if isinstance(body, dict):
+            body['timings'] = breakdown
+            response.set_data(app.json.dumps(body))
+    return response
+
+
+@app.teardown_request
+def _stop_request_timeline(exc):
+    token = g.pop('_timeline_token', None)
+    if token is not None:
+        try:
+            stop_timeline(token)
+        except ValueError:
+            # Token created in another context (e.g. a copied app context); nothing to reset here
+            pass
+
+
+def _fetch_history_with_fallback(ticker: str, frequency: str, api_key=None) -> pd.DataFrame:
+    """Fetch full history; retry once with monthly since some tickers only respond on monthly."""
+    try:
+        with span('history'):
+            hist = fetch_history(ticker, period='120d', frequency=frequency, outputsize='full', api_key=api_key)
+    except Exception:
+        LOG.exception('fetch_history failed for %s', ticker)
+        hist = pd.DataFrame()
+    if (hist is None or hist.empty) and frequency != 'monthly':
+        try:
+            with span('history_monthly'):
+                hist = fetch_history(ticker, period='120d', frequency='monthly', outputsize='full', api_key=api_key)
+        except Exception:
+            LOG.exception('fallback monthly fetch_history failed for %s', ticker)
+            hist = pd.DataFrame()
+    return hist if hist is not None else pd.DataFrame()
+
+
+def _market_tickers(payload: dict) -> list:
+    """Extra benchmark indices from a request: a list or a comma-separated string of tickers."""
+    value = payload.get('market_tickers') or []
+    if isinstance(value, str):
+        value = value.split(',')
+    return [t.strip().upper() for t in value if isinstance(t, str) and t.strip()]
+
+
+def fetch_market_indices(market_ticker=None, market_tickers=(), frequency: str = 'daily', api_key=None):
+    """Benchmark closes for a request or a whole batch, fetched once.
+
+    market_ticker is the primary index (market_index / corr_with_index_20); market_tickers add
+    named indices (corr_/beta_/rs_<name>_20). Returns a market.MarketIndices, or None.
+    """
+    primary = market_ticker.strip().upper() if isinstance(market_ticker, str) and market_ticker.strip() else None
+    closes = {}
+    for t in dict.fromkeys(([primary] if primary else []) + list(market_tickers or ())):
+        try:
+            with span('market_history'):
+                m_hist = fetch_history(t, period='120d', frequency=frequency, outputsize='full', api_key=api_key)
+            if m_hist is not None and not m_hist.empty and 'close' in m_hist.columns:
+                closes[t] = m_hist['close'].astype(float)
+        except Exception:
+            LOG.exception('fetch_history for market index failed: %s', t)
+    market = MarketIndices({t: closes[t] for t in market_tickers or () if t in closes},
+                           primary=closes.get(primary) if primary else None)
+    return market if market else None
+
+
+# Indicator columns each payload serializes; compute_technical_indicators only evaluates what these need
+LATEST_INDICATOR_COLUMNS = (
+    'sma_20', 'ema_20', 'rsi_14', 'macd', 'macd_signal', 'macd_hist', 'bb_mid', 'bb_upper', 'bb_lower',
+    'atr_14', 'obv',
+)
+INDICATOR_ROW_COLUMNS = (
+    'sma_5', 'sma_10', 'sma_20', 'ema_12', 'ema_20', 'ema_26', 'rsi_14', 'macd', 'macd_signal', 'macd_hist',
+    'bb_mid', 'bb_upper', 'bb_lower', 'bb_width', 'atr_14', 'obv',
+)
+
+
+def _latest_indicators(hist: pd.DataFrame):
+    """Latest indicators snapshot for the UI, or None if indicators cannot be computed."""
+    try:
+        with span('indicators'):
+            inds = cached_indicators(hist, columns=LATEST_INDICATOR_COLUMNS)
+        last = inds.iloc[-1]
+        def _g(name):
+            try:
+                v = last[name]
+                return None if pd.isna(v) else float(v)
+            except Exception:
+                return None
+        snapshot = {
+            'date': (inds.index[-1].isoformat() if hasattr(inds.index[-1], 'isoformat') else str(inds.index[-1])),
+            'close': float(last['close']) if 'close' in inds.columns and pd.notna(last['close']) else None,
+        }
+        snapshot.update({name: _g(name) for name in LATEST_INDICATOR_COLUMNS})
+        return snapshot
+    except Exception:
+        return None
+
+
+def _fallback_prices(hist: pd.DataFrame, n_pred: int):
+    """Deterministic projection from the mean log-return of the last K periods.
+
+    Returns (prices, error); error is a message when history is too short.
+    """
+    ser = None
+    if 'close' in hist.columns:
+        ser = hist['close'].astype(float)
+    elif 'Close' in hist.columns:
+        ser = hist['Close'].astype(float)
+    else:
+        num_cols = hist.select_dtypes('number').columns
+        if len(num_cols):
+            ser = hist[num_cols[0]].astype(float)
+    if ser is None or ser.shape[0] < 5:
+        return [], "insufficient history returned from provider"
+    log_rets = np.log(ser / ser.shift(1)).dropna()
+    if log_rets.empty:
+        return [], "insufficient history to compute returns"
+    K = int(min(20, len(log_rets)))
+    mean_r = float(log_rets.tail(K).mean())
+    prices = []
+    curr = float(ser.iloc[-1])
+    for _ in range(n_pred):
+        curr = curr * float(np.exp(mean_r))
+        prices.append(curr)
+    return prices, None
+
+
+def _dated_predictions(prices, frequency: str):
+    """Attach forecast dates (1/7/30-day steps by frequency) to predicted prices."""
+    step_days = 1 if frequency == 'daily' else (7 if frequency == 'weekly' else 30)
+    start_date = datetime.utcnow().date() + timedelta(days=step_days)
+    return [
+        {"date": (start_date + timedelta(days=i * step_days)).isoformat(), "price": round(float(p), 2)}
+        for i, p in enumerate(prices)
+    ]
+
+
+def _history_rows(df: pd.DataFrame, limit) -> list:
+    """Last `limit` OHLCV rows as JSON-ready dicts (missing fields omitted)."""
+    rows = []
+    if df is not None and not df.empty:
+        df2 = df.tail(int(limit))
+        for idx, row in df2.iterrows():
+            item = {
+                'date': idx.isoformat() if hasattr(idx, 'isoformat') else str(idx),
+            }
+            for k in ['open','high','low','close','volume']:
+                if k in df2.columns and pd.notna(row.get(k, None)):
+                    try:
+                        item[k] = float(row[k])
+                    except Exception:
+                        pass
+            rows.append(item)
+    return rows
+
+
+def _indicator_rows(ind: pd.DataFrame, limit) -> list:
+    """Last `limit` indicator rows for /api/indicators as JSON-ready dicts."""
+    ind2 = ind.tail(int(limit))
+    rows = []
+    for idx, row in ind2.iterrows():
+        def _safe(name):
+            try:
+                val = row[name]
+                return None if pd.isna(val) else float(val)
+            except Exception:
+                return None
+        item = {
+            'date': idx.isoformat() if hasattr(idx, 'isoformat') else str(idx),
+            'close': _safe('close') if 'close' in ind2.columns else None,
+        }
+        item.update({name: _safe(name) for name in INDICATOR_ROW_COLUMNS})
+        rows.append(item)
+    return rows
+
+
+def _model_params(payload: dict):
+    """Return (model_type, window, ridge_alpha, strategy) from a request body's `model`/`window`/`alpha`/`strategy` fields."""
+    model_type = (payload.get('model') or 'ridge').lower() if isinstance(payload.get('model'), str) else (payload.get('model', {}).get('type', 'ridge') if isinstance(payload.get('model'), dict) else 'ridge')
+    window = payload.get('window') if isinstance(payload.get('window'), int) else (payload.get('model', {}).get('window') if isinstance(payload.get('model'), dict) else None)
+    ridge_alpha = payload.get('alpha') if isinstance(payload.get('alpha'), (int, float)) else (payload.get('model', {}).get('alpha') if isinstance(payload.get('model'), dict) else 1.0)
+    strategy = payload.get('strategy') if isinstance(payload.get('strategy'), str) else (payload.get('model', {}).get('strategy') if isinstance(payload.get('model'), dict) else None)
+    strategy = 'direct' if isinstance(strategy, str) and strategy.lower() == 'direct' else 'recursive'
+    return model_type, window, ridge_alpha, strategy
+
+
+def _predict_params(payload: dict) -> dict:
+    """Model, API key and benchmark parameters of a /api/predict body, as load_and_predict takes them."""
+    model_type, window, ridge_alpha, strategy = _model_params(payload)
+    return {'model_type': model_type, 'window': window, 'ridge_alpha': ridge_alpha, 'strategy': strategy,
+            'api_key': payload.get('api_key'), 'market_ticker': payload.get('market_ticker'),
+            'market_tickers': _market_tickers(payload)}
+
+
+def _days(payload: dict) -> int:
+    try:
+        return int(payload.get('days', 5))
+    except Exception:
+        return 5
+
+
+def fit_and_predict(hist, fundamentals, model_type: str = 'ridge', **kwargs):
+    """train_and_predict_ml for one request: on the training pool for the model types it takes
+    (training.offloaded), so the request thread only waits, otherwise in this thread."""
+    if not offloaded(model_type):
+        return train_and_predict_ml(hist, fundamentals, model_type=model_type, **kwargs)
+    # the pool process has no feature scope; its model is registered under the request's
+    fut = training_executor().submit(train_and_predict_ml, hist, fundamentals, model_type=model_type,
+                                     scope=current_scope(), **kwargs)
+    return fut.result()
+
+
+def load_and_predict(ticker: str, days: int = 5, manual: dict = None, frequency: str = 'daily', params: dict = None):
     """
     Fetch recent price data for the given ticker using configured provider and
     simulate a short forecast. Returns JSON-serializable dict.
+    params: model, API key and benchmark parameters, see _predict_params (default: all defaults).
     """
     try:
         if not ticker or not isinstance(ticker, str):
@@ -87,10 +399,10 @@ def load_and_predict(ticker: str, days: int = 5, manual: dict = None, frequency:
         # Manual mode: user-supplied parameters
         n_pred = min(int(days) if isinstance(days, (int, float)) and days > 0 else 5, 5)
 
-        # capture request-scoped model/api params
-        mp = app.config.get('_MODEL_PARAMS', {}) if hasattr(app, 'config') else {}
-        api_key = mp.get('api_key') if isinstance(mp, dict) else None
-        market_ticker = mp.get('market_ticker') if isinstance(mp, dict) else None
+        # model/api params of this call
+        mp = params if isinstance(params, dict) else {}
+        api_key = mp.get('api_key')
+        market_ticker = mp.get('market_ticker')
 
         ind_latest = None
 
@@ -105,50 +417,12 @@ def load_and_predict(ticker: str, days: int = 5, manual: dict = None, frequency:
             # choose starting price
             if base_price is None:
                 # fall back to provider history if available, else a safe default
-                try:
-                    hist = fetch_history(raw_ticker, period='120d', frequency=frequency, outputsize='full', api_key=api_key)
-                except Exception:
-                    LOG.exception('fetch_history failed for %s', raw_ticker)
-                    hist = pd.DataFrame()
-
-                if hist is None or hist.empty:
-                    # Try a fallback frequency (monthly) once, since some tickers respond only on monthly
-                    if frequency != 'monthly':
-                        try:
-                            hist = fetch_history(raw_ticker, period='120d', frequency='monthly', outputsize='full', api_key=api_key)
-                        except Exception:
-                            LOG.exception('fallback monthly fetch_history failed for %s', raw_ticker)
-                            hist = pd.DataFrame()
+                hist = _fetch_history_with_fallback(raw_ticker, frequency, api_key)
                 if hist is None or hist.empty:
                     return {"ticker": raw_ticker, "predictions": [], "error": "no history available from provider; provide base_price or try later"}
                 else:
                     # compute latest indicators snapshot for UI
-                    try:
-                        inds = compute_technical_indicators(hist)
-                        last = inds.iloc[-1]
-                        def _g(name):
-                            try:
-                                v = last[name]
-                                return None if pd.isna(v) else float(v)
-                            except Exception:
-                                return None
-                        ind_latest = {
-                            'date': (inds.index[-1].isoformat() if hasattr(inds.index[-1], 'isoformat') else str(inds.index[-1])),
-                            'close': float(last['close']) if 'close' in inds.columns and pd.notna(last['close']) else None,
-                            'sma_20': _g('sma_20'),
-                            'ema_20': _g('ema_20'),
-                            'rsi_14': _g('rsi_14'),
-                            'macd': _g('macd'),
-                            'macd_signal': _g('macd_signal'),
-                            'macd_hist': _g('macd_hist'),
-                            'bb_mid': _g('bb_mid'),
-                            'bb_upper': _g('bb_upper'),
-                            'bb_lower': _g('bb_lower'),
-                            'atr_14': _g('atr_14'),
-                            'obv': _g('obv') if 'obv' in inds.columns else None,
-                        }
-                    except Exception:
-                        ind_latest = None
+                    ind_latest = _latest_indicators(hist)
                     if 'close' in hist.columns:
                         last_close = float(hist['close'].iloc[-1])
                     elif 'Close' in hist.columns:
@@ -191,110 +465,47 @@ def load_and_predict(ticker: str, days: int = 5, manual: dict = None, frequency:
 
         else:
             # Auto mode: fetch history via configured provider
-            try:
-                hist = fetch_history(raw_ticker, period='120d', frequency=frequency, outputsize='full', api_key=api_key)
-            except Exception:
-                LOG.exception('fetch_history failed for %s', raw_ticker)
-                hist = pd.DataFrame()
-
-            if hist is None or hist.empty:
-                # Fallback to monthly once if initial frequency fails
-                if frequency != 'monthly':
-                    try:
-                        hist = fetch_history(raw_ticker, period='120d', frequency='monthly', outputsize='full', api_key=api_key)
-                    except Exception:
-                        LOG.exception('fallback monthly fetch_history failed for %s', raw_ticker)
-                        hist = pd.DataFrame()
+            hist = _fetch_history_with_fallback(raw_ticker, frequency, api_key)
             if hist is None or hist.empty:
                 return {"ticker": raw_ticker, "predictions": [], "error": "no history available from provider"}
 
             # compute latest indicators snapshot for UI
-            try:
-                inds = compute_technical_indicators(hist)
-                last = inds.iloc[-1]
-                def _g(name):
-                    try:
-                        v = last[name]
-                        return None if pd.isna(v) else float(v)
-                    except Exception:
-                        return None
-                ind_latest = {
-                    'date': (inds.index[-1].isoformat() if hasattr(inds.index[-1], 'isoformat') else str(inds.index[-1])),
-                    'close': float(last['close']) if 'close' in inds.columns and pd.notna(last['close']) else None,
-                    'sma_20': _g('sma_20'),
-                    'ema_20': _g('ema_20'),
-                    'rsi_14': _g('rsi_14'),
-                    'macd': _g('macd'),
-                    'macd_signal': _g('macd_signal'),
-                    'macd_hist': _g('macd_hist'),
-                    'bb_mid': _g('bb_mid'),
-                    'bb_upper': _g('bb_upper'),
-                    'bb_lower': _g('bb_lower'),
-                    'atr_14': _g('atr_14'),
-                    'obv': _g('obv') if 'obv' in inds.columns else None,
-                }
-            except Exception:
-                ind_latest = None
+            ind_latest = _latest_indicators(hist)
 
             # Fetch fundamentals (Alpha Vantage OVERVIEW) if available
             try:
-                fundamentals = fetch_fundamentals_av(raw_ticker, api_key=api_key) or {}
+                with span('fundamentals'):
+                    fundamentals = fetch_fundamentals_av(raw_ticker, api_key=api_key) or {}
             except Exception:
                 LOG.exception('fetch_fundamentals_av failed for %s', raw_ticker)
                 fundamentals = {}
 
-            # Optional market index correlation: fetch market_ticker history and attach market_close series
-            if market_ticker:
-                try:
-                    m_hist = fetch_history(market_ticker.strip().upper(), period='120d', frequency=frequency, outputsize='full', api_key=api_key)
-                    if m_hist is not None and not m_hist.empty:
-                        fundamentals['market_close'] = m_hist['close'].astype(float) if 'close' in m_hist.columns else None
-                except Exception:
-                    LOG.exception('fetch_history for market_ticker failed: %s', market_ticker)
+            # Optional benchmark indices for the market-relative features
+            market = fetch_market_indices(market_ticker, mp.get('market_tickers'), frequency, api_key)
+            if market is not None:
+                fundamentals['market_indices'] = market
 
             # Use ML-based predictions relying solely on provider data; if ML unavailable/insufficient, fall back to deterministic drift from API data
             try:
-                mp = app.config.get('_MODEL_PARAMS', {})
-                prices = train_and_predict_ml(
-                    hist,
-                    fundamentals,
-                    steps=n_pred,
-                    model_type=(mp.get('model_type') or 'ridge'),
-                    window=mp.get('window'),
-                    ridge_alpha=float(mp.get('ridge_alpha') or 1.0),
-                )
+                with span('model'):
+                    prices = fit_and_predict(
+                        hist,
+                        fundamentals,
+                        steps=n_pred,
+                        model_type=(mp.get('model_type') or 'ridge'),
+                        window=mp.get('window'),
+                        ridge_alpha=float(mp.get('ridge_alpha') or 1.0),
+                        strategy=mp.get('strategy') or 'recursive',
+                    )
             except Exception:
                 # Deterministic fallback: use average log-return over last K periods (API-only data)
-                ser = None
-                if 'close' in hist.columns:
-                    ser = hist['close'].astype(float)
-                elif 'Close' in hist.columns:
-                    ser = hist['Close'].astype(float)
-                else:
-                    num_cols = hist.select_dtypes('number').columns
-                    if len(num_cols):
-                        ser = hist[num_cols[0]].astype(float)
-                if ser is None or ser.shape[0] < 5:
-                    return {"ticker": raw_ticker, "predictions": [], "error": "insufficient history returned from provider"}
-                log_rets = np.log(ser / ser.shift(1)).dropna()
-                if log_rets.empty:
-                    return {"ticker": raw_ticker, "predictions": [], "error": "insufficient history to compute returns"}
-                K = int(min(20, len(log_rets)))
-                mean_r = float(log_rets.tail(K).mean())
-                last_close = float(ser.iloc[-1])
-                prices = []
-                curr = last_close
-                for _ in range(n_pred):
-                    curr = curr * float(np.exp(mean_r))
-                    prices.append(curr)
+                with span('fallback'):
+                    prices, err = _fallback_prices(hist, n_pred)
+                if err:
+                    return {"ticker": raw_ticker, "predictions": [], "error": err}
 
             # Build date series according to frequency
-            step_days = 1 if frequency == 'daily' else (7 if frequency == 'weekly' else 30)
-            start_date = datetime.utcnow().date() + timedelta(days=step_days)
-            predictions = []
-            for i, p in enumerate(prices):
-                pred_date = (start_date + timedelta(days=i * step_days)).isoformat()
-                predictions.append({"date": pred_date, "price": round(float(p), 2)})
+            predictions = _dated_predictions(prices, frequency)
 
         # Keep user-entered symbol as-is
         output_ticker = t
@@ -313,16 +524,9 @@ def predict_route():
         return jsonify({"ticker": None, "predictions": [], "error": "invalid or missing JSON body"}), 400
 
     ticker = payload.get('ticker')
-    days = payload.get('days', 5)
     mode = (payload.get('mode') or 'ml').lower()
     frequency = (payload.get('frequency') or 'daily').lower()
-    api_key = payload.get('api_key')
-    market_ticker = payload.get('market_ticker')
     manual = None
-    # Model params (optional)
-    model_type = (payload.get('model') or 'ridge').lower() if isinstance(payload.get('model'), str) else (payload.get('model', {}).get('type', 'ridge') if isinstance(payload.get('model'), dict) else 'ridge')
-    window = payload.get('window') if isinstance(payload.get('window'), int) else (payload.get('model', {}).get('window') if isinstance(payload.get('model'), dict) else None)
-    ridge_alpha = payload.get('alpha') if isinstance(payload.get('alpha'), (int, float)) else (payload.get('model', {}).get('alpha') if isinstance(payload.get('model'), dict) else 1.0)
     if mode == 'manual':
         manual = {
             'base_price': payload.get('base_price'),
@@ -334,25 +538,282 @@ def predict_route():
     if not ticker or not isinstance(ticker, str) or ticker.strip() == "":
         return jsonify({"ticker": ticker, "predictions": [], "error": "ticker is required"}), 400
 
-    try:
-        days_int = int(days)
-    except Exception:
-        days_int = 5
+    days_int = _days(payload)
+
+    if manual is None:
+        # watchlist tickers are usually answered from the precomputed forecasts
+        with span('precomputed'):
+            cached = precomputed_forecast(ticker, payload)
+        if cached is not None:
+            return jsonify(cached), 200
 
-    # Attach model params onto Flask global via closure not ideal; pass through in request context via globals
-    # Simpler: temporarily set on app config for this call
-    app.config['_MODEL_PARAMS'] = {'model_type': model_type, 'window': window, 'ridge_alpha': ridge_alpha, 'api_key': api_key, 'market_ticker': market_ticker}
-    result = load_and_predict(ticker, days_int, manual=manual, frequency=frequency)
-    app.config.pop('_MODEL_PARAMS', None)
+    with feature_scope(ticker, frequency):
+        result = load_and_predict(ticker, days_int, manual=manual, frequency=frequency,
+                                  params=_predict_params(payload))
     status = 200 if result.get('error') is None else 500
     return jsonify(result), status
 
 
+def precompute_key(ticker: str, payload: dict) -> str:
+    """Store key of a precomputed /api/predict response: the ticker and every body field that shapes it."""
+    params = _predict_params(payload)
+    days = _days(payload)
+    market_ticker = params['market_ticker']
+    return json.dumps([
+        ticker.strip().upper(), (payload.get('frequency') or 'daily').lower(), min(days if days > 0 else 5, 5),
+        params['model_type'], params['window'], float(params['ridge_alpha'] or 1.0), params['strategy'],
+        market_ticker.strip().upper() if isinstance(market_ticker, str) and market_ticker.strip() else None,
+        sorted(params['market_tickers']),
+    ])
+
+
+def precompute_forecast(ticker: str, payload: dict) -> dict:
+    """The /api/predict response for payload (without ticker) plus ticker, for the precompute scheduler."""
+    frequency = (payload.get('frequency') or 'daily').lower()
+    with feature_scope(ticker, frequency):
+        return load_and_predict(ticker, _days(payload), frequency=frequency, params=_predict_params(payload))
+
+
+_WATCHLIST = frozenset(watchlist_from_env())
+_FORECAST_STORE = None
+
+
+def precomputed_forecast(ticker: str, payload: dict):
+    """The scheduler's unexpired response for this request, or None (ticker not on the watchlist, other
+    parameters, not computed yet)."""
+    global _FORECAST_STORE
+    if ticker.strip().upper() not in _WATCHLIST:
+        return None
+    try:
+        if _FORECAST_STORE is None:
+            _FORECAST_STORE = store_from_env()
+        result = _FORECAST_STORE.get(precompute_key(ticker, payload))
+        if result is not None:
+            # forecast dates count from the day they are served
+            frequency = (payload.get('frequency') or 'daily').lower()
+            result['predictions'] = _dated_predictions([p['price'] for p in result['predictions']], frequency)
+        return result
+    except Exception:
+        LOG.exception('precomputed forecast lookup failed for %s', ticker)
+        return None
+
+
+def _batch_fetch(ticker: str, frequency: str, api_key, market):
+    """I/O half of a batch item: history + fundamentals at background provider priority."""
+    with provider_priority(BACKGROUND):
+        hist = _fetch_history_with_fallback(ticker, frequency, api_key)
+        if hist is None or hist.empty:
+            return hist, {}
+        try:
+            fundamentals = fetch_fundamentals_av(ticker, api_key=api_key) or {}
+        except Exception:
+            LOG.exception('fetch_fundamentals_av failed for %s', ticker)
+            fundamentals = {}
+    if market is not None:
+        fundamentals['market_indices'] = market
+    return hist, fundamentals
+
+
+def batch_predictions(tickers, days: int = 5, frequency: str = 'daily', model_type: str = 'ridge',
+                      window=None, ridge_alpha: float = 1.0, api_key=None, market_ticker=None, market_tickers=(),
+                      strategy: str = 'recursive'):
+    """Yield one result dict per ticker, in completion order.
+
+    History is fetched on a bounded thread pool (BATCH_FETCH_WORKERS, default 8;
+    the provider rate limiter still applies) and each fit is queued on the training
+    pool, behind interactive fits, as soon as its history arrives. A ticker whose model cannot train falls
+    back to the deterministic drift projection, like /api/predict. Benchmark
+    indices are fetched once and shared by every ticker of the batch.
+    """
+    n_pred = min(int(days) if isinstance(days, (int, float)) and days > 0 else 5, 5)
+    with provider_priority(BACKGROUND):
+        market = fetch_market_indices(market_ticker, market_tickers, frequency, api_key)
+
+    fit_kwargs = dict(steps=n_pred, model_type=model_type, window=window, ridge_alpha=float(ridge_alpha or 1.0),
+                      strategy=strategy)
+    pool = training_executor()
+    fetch_workers = max(1, int(os.environ.get('BATCH_FETCH_WORKERS', 8)))
+    with ThreadPoolExecutor(max_workers=fetch_workers) as io_pool:
+        fetches = {io_pool.submit(_batch_fetch, t, frequency, api_key, market): t for t in tickers}
+        fits = {}
+        pending = set(fetches)
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in done:
+                if fut in fetches:
+                    ticker = fetches[fut]
+                    try:
+                        hist, fundamentals = fut.result()
+                    except Exception as e:
+                        LOG.exception('batch fetch failed for %s', ticker)
+                        yield {"ticker": ticker, "predictions": [], "error": str(e)}
+                        continue
+                    if hist is None or hist.empty:
+                        yield {"ticker": ticker, "predictions": [], "error": "no history available from provider"}
+                        continue
+                    # fits run outside the request's feature_scope; register their models under the ticker
+                    scope = (str(ticker).strip().upper(), str(frequency).lower())
+                    if pool is not None:
+                        fit = pool.submit(train_and_predict_ml, hist, fundamentals, scope=scope,
+                                          priority=BACKGROUND, **fit_kwargs)
+                    else:
+                        fit = io_pool.submit(train_and_predict_ml, hist, fundamentals, scope=scope, **fit_kwargs)
+                    fits[fit] = (ticker, hist)
+                    pending.add(fit)
+                else:
+                    ticker, hist = fits.pop(fut)
+                    try:
+                        prices = fut.result()
+                    except Exception:
+                        prices, err = _fallback_prices(hist, n_pred)
+                        if err:
+                            yield {"ticker": ticker, "predictions": [], "error": err}
+                            continue
+                    yield {"ticker": ticker, "predictions": _dated_predictions(prices, frequency), "error": None}
+
+
+def batch_request(payload: dict):
+    """(status, body) for a /api/predict/batch body. body is an error or {results, count} dict, or, when
+    streaming, the generator of per-ticker result dicts."""
+    tickers = payload.get('tickers')
+    if not isinstance(tickers, list) or not tickers:
+        return 400, {"error": "tickers must be a non-empty list"}
+    tickers = list(dict.fromkeys(t.strip().upper() for t in tickers if isinstance(t, str) and t.strip()))
+    max_tickers = int(os.environ.get('BATCH_MAX_TICKERS', 500))
+    if not tickers:
+        return 400, {"error": "tickers must be a non-empty list"}
+    if len(tickers) > max_tickers:
+        return 400, {"error": f"at most {max_tickers} tickers per batch"}
+    model_type, window, ridge_alpha, strategy = _model_params(payload)
+    results = batch_predictions(
+        tickers,
+        days=_days(payload),
+        frequency=(payload.get('frequency') or 'daily').lower(),
+        model_type=model_type,
+        window=window,
+        ridge_alpha=ridge_alpha,
+        strategy=strategy,
+        api_key=payload.get('api_key'),
+        market_ticker=payload.get('market_ticker'),
+        market_tickers=_market_tickers(payload),
+    )
+    if payload.get('stream', True) is False:
+        rows = list(results)
+        return 200, {"results": rows, "count": len(rows)}
+    return 200, results
+
+
+@app.route('/api/predict/batch', methods=['POST'])
+def predict_batch_route():
+    """Forecast a watchlist in one call.
+    Body: { tickers: [..], days?, frequency?, model?, market_ticker?, market_tickers?, api_key?, stream? }
+    Streams one JSON object per line (application/x-ndjson) as tickers complete;
+    with "stream": false a single {results, count} document is returned instead.
+    """
+    status, body = batch_request(request.get_json(force=True, silent=True) or {})
+    if isinstance(body, dict):
+        return jsonify(body), status
+    return Response(stream_with_context(json.dumps(r) + "\n" for r in body), mimetype='application/x-ndjson')
+
+
+def _screen_fetch(ticker: str, frequency: str, api_key):
+    with provider_priority(BACKGROUND):
+        return _fetch_history_with_fallback(ticker, frequency, api_key)
+
+
+def screen_universe(tickers, columns=LATEST_INDICATOR_COLUMNS, frequency: str = 'daily', api_key=None,
+                    market_ticker=None):
+    """Latest indicator values for many tickers: (rows, errors).
+
+    Histories are fetched on the batch fetch pool at background priority, then every
+    ticker's indicators are computed in one panel pass (panel.compute_panel).
+    """
+    histories, errors = {}, []
+    market = None
+    fetch_workers = max(1, int(os.environ.get('BATCH_FETCH_WORKERS', 8)))
+    with span('history'), ThreadPoolExecutor(max_workers=fetch_workers) as io_pool:
+        futures = {io_pool.submit(_screen_fetch, t, frequency, api_key): t for t in tickers}
+        if market_ticker:
+            market_fut = io_pool.submit(_screen_fetch, market_ticker.strip().upper(), frequency, api_key)
+        for fut, ticker in futures.items():
+            try:
+                hist = fut.result()
+            except Exception as e:
+                LOG.exception('screen fetch failed for %s', ticker)
+                errors.append({"ticker": ticker, "error": str(e)})
+                continue
+            if hist is None or hist.empty or 'close' not in hist.columns:
+                errors.append({"ticker": ticker, "error": "no history available from provider"})
+                continue
+            histories[ticker] = hist
+        if market_ticker:
+            try:
+                m_hist = market_fut.result()
+                if m_hist is not None and 'close' in m_hist.columns:
+                    market = m_hist['close'].astype(float)
+            except Exception:
+                LOG.exception('fetch_history for market_ticker failed: %s', market_ticker)
+    if not histories:
+        return [], errors
+    with span('indicators'):
+        latest = compute_panel(histories, columns=columns, market_index=market).latest(columns)
+    with span('serialize'):
+        rows = []
+        for ticker, rec in zip(latest.index, latest.to_dict('records')):
+            date = rec.pop('date')
+            item = {'ticker': ticker, 'date': date.isoformat() if hasattr(date, 'isoformat') else str(date)}
+            item.update((k, None if pd.isna(v) else float(v)) for k, v in rec.items())
+            rows.append(item)
+    return rows, errors
+
+
+def screen_request(payload: dict):
+    """(status, body) for a /api/screen body."""
+    tickers = payload.get('tickers')
+    if not isinstance(tickers, list):
+        return 400, {"error": "tickers must be a non-empty list"}
+    tickers = list(dict.fromkeys(t.strip().upper() for t in tickers if isinstance(t, str) and t.strip()))
+    if not tickers:
+        return 400, {"error": "tickers must be a non-empty list"}
+    max_tickers = int(os.environ.get('SCREEN_MAX_TICKERS', 1000))
+    if len(tickers) > max_tickers:
+        return 400, {"error": f"at most {max_tickers} tickers per screen"}
+    columns = payload.get('columns') or list(LATEST_INDICATOR_COLUMNS)
+    try:
+        indicator_dependencies(columns)
+    except (TypeError, ValueError) as e:
+        return 400, {"error": str(e)}
+    rows, errors = screen_universe(
+        tickers,
+        columns=columns,
+        frequency=(payload.get('frequency') or 'daily').lower(),
+        api_key=payload.get('api_key'),
+        market_ticker=payload.get('market_ticker'),
+    )
+    return 200, {"rows": rows, "errors": errors, "count": len(rows)}
+
+
+@app.route('/api/screen', methods=['POST'])
+def screen_route():
+    """Latest indicators for a universe in one vectorized pass.
+    Body: { tickers: [..], columns?: [..], frequency?, market_ticker?, api_key? }
+    """
+    status, body = screen_request(request.get_json(force=True, silent=True) or {})
+    return jsonify(body), status
+
+
 @app.route('/health', methods=['GET'])
 def health_check():
     return jsonify({"status": "healthy", "message": "Stock Prediction API is running"})
 
 
+@app.route('/api/cache/stats', methods=['GET'])
+def api_cache_stats():
+    """Return hit/miss counters of the in-process provider, feature and model caches."""
+    return jsonify({"provider": cache_stats(), "features": feature_cache_stats(), "models": model_registry_stats(),
+                    "training": training_stats()})
+
+
 @app.route('/debug/history', methods=['GET'])
 def debug_history():
     """Debug helper: fetch minimal history and return sanitized request metadata.
@@ -417,32 +878,21 @@ def api_history():
     if not ticker:
         return jsonify({"error": "ticker is required"}), 400
     try:
-        result = fetch_history(
-            ticker.upper(),
-            period='120d',
-            frequency=frequency,
-            outputsize='full',
-            return_metadata=True,
-            api_key=api_key,
-        )
+        with span('history'):
+            result = fetch_history(
+                ticker.upper(),
+                period='120d',
+                frequency=frequency,
+                outputsize='full',
+                return_metadata=True,
+                api_key=api_key,
+            )
         if isinstance(result, tuple):
             df, meta = result
         else:
             df, meta = result, {}
-        rows = []
-        if df is not None and not df.empty:
-            df2 = df.tail(int(limit))
-            for idx, row in df2.iterrows():
-                item = {
-                    'date': idx.isoformat() if hasattr(idx, 'isoformat') else str(idx),
-                }
-                for k in ['open','high','low','close','volume']:
-                    if k in df2.columns and pd.notna(row.get(k, None)):
-                        try:
-                            item[k] = float(row[k])
-                        except Exception:
-                            pass
-                rows.append(item)
+        with span('serialize'):
+            rows = _history_rows(df, limit)
         return jsonify({
             'provider': meta.get('provider', 'alphavantage'),
             'request': meta.get('params', {}),
@@ -463,7 +913,8 @@ def api_quote():
     if not ticker:
         return jsonify({"error": "ticker is required"}), 400
     try:
-        data = fetch_global_quote_av(ticker)
+        with span('quote'):
+            data = fetch_global_quote_av(ticker)
         if not isinstance(data, dict):
             return jsonify({"error": "unexpected response"}), 500
         return jsonify(data), 200 if 'error' not in data else 500
@@ -490,50 +941,24 @@ def api_indicators():
     if not ticker:
         return jsonify({"error": "ticker is required"}), 400
     try:
-        result = fetch_history(
-            ticker.upper(),
-            period='120d',
-            frequency=frequency,
-            outputsize='full',
-            return_metadata=True,
-        )
+        with span('history'):
+            result = fetch_history(
+                ticker.upper(),
+                period='120d',
+                frequency=frequency,
+                outputsize='full',
+                return_metadata=True,
+            )
         if isinstance(result, tuple):
             df, meta = result
         else:
             df, meta = result, {}
         if df is None or df.empty:
             return jsonify({"error": "no history available from provider"}), 500
-        ind = compute_technical_indicators(df)
-        ind2 = ind.tail(int(limit))
-        rows = []
-        for idx, row in ind2.iterrows():
-            def _safe(name):
-                try:
-                    val = row[name]
-                    return None if pd.isna(val) else float(val)
-                except Exception:
-                    return None
-            item = {
-                'date': idx.isoformat() if hasattr(idx, 'isoformat') else str(idx),
-                'close': _safe('close') if 'close' in ind2.columns else None,
-                'sma_5': _safe('sma_5'),
-                'sma_10': _safe('sma_10'),
-                'sma_20': _safe('sma_20'),
-                'ema_12': _safe('ema_12'),
-                'ema_20': _safe('ema_20'),
-                'ema_26': _safe('ema_26'),
-                'rsi_14': _safe('rsi_14'),
-                'macd': _safe('macd'),
-                'macd_signal': _safe('macd_signal'),
-                'macd_hist': _safe('macd_hist'),
-                'bb_mid': _safe('bb_mid'),
-                'bb_upper': _safe('bb_upper'),
-                'bb_lower': _safe('bb_lower'),
-                'bb_width': _safe('bb_width'),
-                'atr_14': _safe('atr_14'),
-                'obv': _safe('obv') if 'obv' in ind2.columns else None,
-            }
-            rows.append(item)
+        with span('indicators'), feature_scope(ticker, frequency):
+            ind = cached_indicators(df, columns=INDICATOR_ROW_COLUMNS)
+        with span('serialize'):
+            rows = _indicator_rows(ind, limit)
         return jsonify({
             'provider': meta.get('provider', 'alphavantage'),
             'request': meta.get('params', {}),
@@ -544,58 +969,66 @@ def api_indicators():
         return jsonify({"error": str(e)}), 500
 
 
-@app.route('/api/features-columns', methods=['POST'])
-def api_features_columns():
-    """Return the final feature columns used for model training given the current request.
-    Body: { ticker, frequency?, window?, market_ticker? }
-    """
-    payload = request.get_json(force=True, silent=True) or {}
+def features_columns_request(payload: dict):
+    """(status, body) for a /api/features-columns body."""
     ticker = (payload.get('ticker') or '').strip()
     frequency = (payload.get('frequency') or 'daily').lower()
     window = payload.get('window')
     market_ticker = payload.get('market_ticker')
     if not ticker:
-        return jsonify({"error": "ticker is required"}), 400
+        return 400, {"error": "ticker is required"}
     try:
         # Fetch asset history
-        result = fetch_history(
-            ticker.upper(),
-            period='120d',
-            frequency=frequency,
-            outputsize='full',
-            return_metadata=False,
-        )
+        with span('history'):
+            result = fetch_history(
+                ticker.upper(),
+                period='120d',
+                frequency=frequency,
+                outputsize='full',
+                return_metadata=False,
+            )
         df = result if not isinstance(result, tuple) else result[0]
         if df is None or df.empty:
-            return jsonify({"error": "no history available from provider"}), 500
-
-        fundamentals = {}
-        # Optional market correlation
-        if market_ticker:
-            try:
-                m_hist = fetch_history(market_ticker.strip().upper(), period='120d', frequency=frequency, outputsize='full')
-                if m_hist is not None and not m_hist.empty and 'close' in m_hist.columns:
-                    fundamentals['market_close'] = m_hist['close'].astype(float)
-            except Exception:
-                pass
+            return 500, {"error": "no history available from provider"}
 
-        # Build features and simulate training slice
+        # Fundamentals, as for the model fit
         try:
-            from .features import assemble_features
+            with span('fundamentals'):
+                fundamentals = fetch_fundamentals_av(ticker.upper(), api_key=payload.get('api_key')) or {}
         except Exception:
-            import features  # type: ignore
-            assemble_features = features.assemble_features  # type: ignore[attr-defined]
+            LOG.exception('fetch_fundamentals_av failed for %s', ticker)
+            fundamentals = {}
+        # Optional benchmark indices
+        market = fetch_market_indices(market_ticker, _market_tickers(payload), frequency)
+        if market is not None:
+            fundamentals['market_indices'] = market
 
-        feats = assemble_features(df, fundamentals)
-        if isinstance(window, int) and window > 0 and len(feats) > window:
-            feats = feats.iloc[-window:].copy()
-        # Add target for inspection then drop
+        # Build features and simulate training slice
+        with span('features'), feature_scope(ticker, frequency):
+            feats = cached_features(df, fundamentals)
+        cols = list(feats.columns)
+        # Training rows as in train_and_predict_ml: the last `window` rows with valid features and target
         feats['target'] = feats['close'].shift(-1)
-        feats = feats.dropna().copy()
-        cols = [c for c in feats.columns if c != 'target']
-        return jsonify({"columns": cols, "count": len(cols)}), 200
+        rows = valid_rows(feats)
+        if isinstance(window, int) and window > 0:
+            rows[np.flatnonzero(rows)[:-window]] = False
+        return 200, {"columns": cols, "count": len(cols), "rows": int(rows.sum())}
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        return 500, {"error": str(e)}
+
+
+@app.route('/api/features-columns', methods=['POST'])
+def api_features_columns():
+    """Return the final feature columns used for model training given the current request,
+    and the number of rows the model would train on.
+    Body: { ticker, frequency?, window?, market_ticker?, market_tickers?, api_key? }
+    """
+    status, body = features_columns_request(request.get_json(force=True, silent=True) or {})
+    return jsonify(body), status
+
+
+if os.environ.get('PRECOMPUTE', '0').lower() in ('1', 'true', 'yes', 'on'):
+    start_in_process(precompute_forecast, precompute_key)
 
 
 if __name__ == '__main__':
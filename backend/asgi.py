@@ -0,0 +1,309 @@
+"""Asyncio serving mode for the I/O-bound API routes.
+
+The Flask app in app.py stays the default. This module exposes the same JSON
+routes as a dependency-free ASGI application so one process can keep hundreds
+of provider round trips in flight:
+
+    uvicorn asgi:app --host 0.0.0.0 --port 5000
+
+Provider calls go through AsyncProvider. It runs the regular config.py
+fetchers (on-disk store, in-process cache, rate limiter, pooled session) on a
+large I/O thread pool, so every caching and throttling rule still applies.
+Indicator computation for /api/indicators runs on a bounded CPU thread pool.
+/api/predict, the batch, screen and features-columns routes run the Flask
+app's own helpers on the I/O pool; model fits go from there to the shared
+training pool (training.py). Batch results stream as NDJSON, as in Flask.
+"""
+import asyncio
+import contextvars
+import json
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+import pandas as pd
+
+try:
+    from . import app as _wsgi
+except Exception:
+    import app as _wsgi  # type: ignore
+
+try:
+    from .timing import span, timeline
+except Exception:
+    import timing  # type: ignore
+    span = timing.span  # type: ignore[attr-defined]
+    timeline = timing.timeline  # type: ignore[attr-defined]
+
+LOG = logging.getLogger(__name__)
+
+_CORS_ORIGINS = {"http://localhost:3000", "http://localhost:5173"}
+
+
+class AsyncProvider:
+    """Awaitable facade over the provider layer.
+
+    ASYNC_IO_THREADS (default 256) bounds how many provider requests may be in
+    flight at once; the threads mostly sit in socket reads and cost no CPU.
+    """
+
+    def __init__(self, io_workers: int = None):
+        io_workers = io_workers or int(os.environ.get('ASYNC_IO_THREADS', 256))
+        self._io = ThreadPoolExecutor(max_workers=io_workers, thread_name_prefix='provider-io')
+
+    async def run(self, fn, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        # Carry the request's context (timeline, provider priority) into the worker thread
+        ctx = contextvars.copy_context()
+        return await loop.run_in_executor(self._io, ctx.run, partial(fn, *args, **kwargs))
+
+    async def history(self, ticker: str, frequency: str = 'daily', api_key=None, return_metadata: bool = False):
+        return await self.run(_wsgi.fetch_history, ticker, period='120d', frequency=frequency,
+                              outputsize='full', return_metadata=return_metadata, api_key=api_key)
+
+    async def history_with_fallback(self, ticker: str, frequency: str = 'daily', api_key=None) -> pd.DataFrame:
+        return await self.run(_wsgi._fetch_history_with_fallback, ticker, frequency, api_key)
+
+    async def fundamentals(self, ticker: str, api_key=None) -> dict:
+        return await self.run(_wsgi.fetch_fundamentals_av, ticker, api_key=api_key)
+
+    async def quote(self, ticker: str) -> dict:
+        return await self.run(_wsgi.fetch_global_quote_av, ticker)
+
+    def shutdown(self):
+        self._io.shutdown(wait=False)
+
+
+def _split_history(result):
+    return result if isinstance(result, tuple) else (result, {})
+
+
+def _frequency(payload: dict) -> str:
+    function = (payload.get('function') or '').upper()
+    frequency = (payload.get('frequency') or 'daily').lower()
+    return {
+        'TIME_SERIES_DAILY': 'daily',
+        'TIME_SERIES_WEEKLY': 'weekly',
+        'TIME_SERIES_MONTHLY': 'monthly',
+    }.get(function, frequency)
+
+
+def _timings_requested(scope, headers: dict, payload) -> bool:
+    """Same opt-in as the Flask app: ?timings=1, an X-Timings: 1 header or {"timings": true} in the body."""
+    query = dict(p.partition('=')[::2] for p in scope.get('query_string', b'').decode('latin-1').split('&') if p)
+    flag = query.get('timings') or headers.get('x-timings')
+    if flag is not None:
+        return flag.lower() not in ('0', 'false', 'no', '')
+    return isinstance(payload, dict) and payload.get('timings') is True
+
+
+class AsyncApp:
+    """Minimal ASGI router mirroring the Flask JSON routes."""
+
+    def __init__(self):
+        self.provider = AsyncProvider()
+        self._cpu = ThreadPoolExecutor(max_workers=int(os.environ.get('ASYNC_CPU_WORKERS', os.cpu_count() or 1)),
+                                       thread_name_prefix='cpu')
+        self.routes = {
+            ('GET', '/health'): self.health,
+            ('GET', '/api/cache/stats'): self.cache_stats,
+            ('POST', '/api/history'): self.history,
+            ('POST', '/api/quote'): self.quote,
+            ('POST', '/api/indicators'): self.indicators,
+            ('POST', '/api/predict'): self.predict,
+            ('POST', '/api/predict/batch'): self.predict_batch,
+            ('POST', '/api/screen'): self.screen,
+            ('POST', '/api/features-columns'): self.features_columns,
+        }
+
+    async def _cpu_call(self, fn, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        ctx = contextvars.copy_context()
+        return await loop.run_in_executor(self._cpu, ctx.run, partial(fn, *args, **kwargs))
+
+    # --- routes -----------------------------------------------------------
+
+    async def health(self, payload):
+        return 200, {"status": "healthy", "message": "Stock Prediction API is running"}
+
+    async def cache_stats(self, payload):
+        return 200, {"provider": _wsgi.cache_stats(), "features": _wsgi.feature_cache_stats(),
+                     "models": _wsgi.model_registry_stats(),
+                     "training": _wsgi.training_stats()}
+
+    async def history(self, payload):
+        payload = payload or {}
+        ticker = (payload.get('ticker') or '').strip()
+        if not ticker:
+            return 400, {"error": "ticker is required"}
+        with span('history'):
+            df, meta = _split_history(await self.provider.history(
+                ticker.upper(), _frequency(payload), api_key=payload.get('api_key'), return_metadata=True))
+        with span('serialize'):
+            rows = await self._cpu_call(_wsgi._history_rows, df, payload.get('limit') or 100)
+        return 200, {
+            'provider': meta.get('provider', 'alphavantage'),
+            'request': meta.get('params', {}),
+            'url': meta.get('url'),
+            'rows': rows,
+        }
+
+    async def quote(self, payload):
+        ticker = ((payload or {}).get('ticker') or '').strip()
+        if not ticker:
+            return 400, {"error": "ticker is required"}
+        with span('quote'):
+            data = await self.provider.quote(ticker)
+        if not isinstance(data, dict):
+            return 500, {"error": "unexpected response"}
+        return (200 if 'error' not in data else 500), data
+
+    async def indicators(self, payload):
+        payload = payload or {}
+        ticker = (payload.get('ticker') or '').strip()
+        if not ticker:
+            return 400, {"error": "ticker is required"}
+        with span('history'):
+            df, meta = _split_history(await self.provider.history(ticker.upper(), _frequency(payload), return_metadata=True))
+        if df is None or df.empty:
+            return 500, {"error": "no history available from provider"}
+        with span('indicators'), _wsgi.feature_scope(ticker, _frequency(payload)):
+            ind = await self._cpu_call(_wsgi.cached_indicators, df, columns=_wsgi.INDICATOR_ROW_COLUMNS)
+        with span('serialize'):
+            rows = await self._cpu_call(_wsgi._indicator_rows, ind, payload.get('limit') or 120)
+        return 200, {
+            'provider': meta.get('provider', 'alphavantage'),
+            'request': meta.get('params', {}),
+            'url': meta.get('url'),
+            'rows': rows,
+        }
+
+    async def predict(self, payload):
+        if not payload:
+            return 400, {"ticker": None, "predictions": [], "error": "invalid or missing JSON body"}
+        ticker = payload.get('ticker')
+        if not ticker or not isinstance(ticker, str) or ticker.strip() == "":
+            return 400, {"ticker": ticker, "predictions": [], "error": "ticker is required"}
+        frequency = (payload.get('frequency') or 'daily').lower()
+        manual = None
+        if (payload.get('mode') or 'ml').lower() == 'manual':
+            manual = {k: payload.get(k) for k in ('base_price', 'drift_pct', 'vol_pct', 'slope')}
+        else:
+            with span('precomputed'):
+                cached = await self.provider.run(_wsgi.precomputed_forecast, ticker, payload)
+            if cached is not None:
+                return 200, cached
+        # the Flask route's pipeline, on a worker thread; model fits go to the training pool from there
+        with _wsgi.feature_scope(ticker, frequency):
+            result = await self.provider.run(_wsgi.load_and_predict, ticker, _wsgi._days(payload), manual=manual,
+                                             frequency=frequency, params=_wsgi._predict_params(payload))
+        return (200 if result.get('error') is None else 500), result
+
+    async def predict_batch(self, payload):
+        return await self.provider.run(_wsgi.batch_request, payload or {})
+
+    async def screen(self, payload):
+        return await self.provider.run(_wsgi.screen_request, payload or {})
+
+    async def features_columns(self, payload):
+        return await self.provider.run(_wsgi.features_columns_request, payload or {})
+
+    # --- ASGI plumbing ----------------------------------------------------
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            return
+        method, path = scope['method'], scope['path']
+        headers = {k.decode('latin-1').lower(): v.decode('latin-1') for k, v in scope.get('headers', [])}
+        origin = headers.get('origin')
+        cors = origin if origin in _CORS_ORIGINS and path.startswith('/api/') else None
+
+        if method == 'OPTIONS' and cors:
+            await self._send(send, 204, None, cors, extra=[
+                (b'access-control-allow-methods', b'GET, POST, OPTIONS'),
+                (b'access-control-allow-headers', headers.get('access-control-request-headers', 'content-type').encode()),
+            ])
+            return
+        handler = self.routes.get((method, path))
+        if handler is None:
+            status = 405 if any(p == path for _, p in self.routes) else 404
+            await self._send(send, status, {"error": "method not allowed" if status == 405 else "not found"}, cors)
+            return
+
+        body = b''
+        more = True
+        while more:
+            message = await receive()
+            body += message.get('body', b'')
+            more = message.get('more_body', False)
+        try:
+            payload = json.loads(body) if body else None
+        except ValueError:
+            payload = None
+        with timeline() as tl:
+            try:
+                status, data = await handler(payload)
+            except Exception as e:
+                LOG.exception('%s %s failed', method, path)
+                status, data = 500, {"error": str(e)}
+            breakdown = tl.as_dict()
+            extra = [(b'server-timing', tl.server_timing().encode())] if os.environ.get('SERVER_TIMING', '1') != '0' else []
+        _wsgi.TIMING_LOG.info(
+            'request timings %s',
+            json.dumps({'method': method, 'path': path, 'status': status, 'timings_ms': breakdown}),
+            extra={'timings_ms': breakdown, 'path': path, 'status': status},
+        )
+        if isinstance(data, dict) and _timings_requested(scope, headers, payload):
+            data = {**data, 'timings': breakdown}
+        if data is not None and not isinstance(data, (dict, list)):
+            await self._stream(send, status, data, cors, extra=extra)
+            return
+        await self._send(send, status, data, cors, extra=extra)
+
+    @staticmethod
+    async def _send(send, status: int, data, cors_origin=None, extra=()):
+        body = b'' if data is None else json.dumps(data, default=str).encode()
+        headers = [(b'content-type', b'application/json'), (b'content-length', str(len(body)).encode())]
+        if cors_origin:
+            headers.append((b'access-control-allow-origin', cors_origin.encode()))
+            headers.append((b'vary', b'Origin'))
+        headers.extend(extra)
+        await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+        await send({'type': 'http.response.body', 'body': body})
+
+    async def _stream(self, send, status: int, items, cors_origin=None, extra=()):
+        """Send an iterator of dicts as NDJSON, one chunk per item; the (blocking) iterator is advanced
+        on the I/O pool."""
+        headers = [(b'content-type', b'application/x-ndjson')]
+        if cors_origin:
+            headers.append((b'access-control-allow-origin', cors_origin.encode()))
+            headers.append((b'vary', b'Origin'))
+        headers.extend(extra)
+        await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+        done = object()
+        items = iter(items)
+        while True:
+            item = await self.provider.run(next, items, done)
+            if item is done:
+                break
+            await send({'type': 'http.response.body', 'body': (json.dumps(item, default=str) + "\n").encode(),
+                        'more_body': True})
+        await send({'type': 'http.response.body', 'body': b''})
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.provider.shutdown()
+                self._cpu.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+
+app = AsyncApp()
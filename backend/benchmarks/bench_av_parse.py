@@ -0,0 +1,102 @@
+"""Benchmark Alpha Vantage payload parsing: legacy per-row loop vs columnar JSON/CSV parse.
+
+Usage (from backend/):  python benchmarks/bench_av_parse.py [--rows 5000] [--repeat 20]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+BACKEND_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_ROOT not in sys.path:
+    sys.path.insert(0, BACKEND_ROOT)
+
+import config  # noqa: E402
+
+
+def synthetic_payload(rows: int):
+    """Return (json_text, csv_text) for a TIME_SERIES_DAILY response with `rows` bars."""
+    rng = np.random.default_rng(0)
+    dates = pd.bdate_range(end='2024-12-31', periods=rows)[::-1]
+    close = 100 + rng.normal(0, 1, rows).cumsum()
+    ts = {}
+    lines = ['timestamp,open,high,low,close,volume']
+    for d, c in zip(dates.strftime('%Y-%m-%d'), close):
+        o, h, l, v = c - 0.5, c + 1.0, c - 1.0, int(rng.integers(1e5, 1e6))
+        ts[d] = {'1. open': f'{o:.4f}', '2. high': f'{h:.4f}', '3. low': f'{l:.4f}',
+                 '4. close': f'{c:.4f}', '5. volume': str(v)}
+        lines.append(f'{d},{o:.4f},{h:.4f},{l:.4f},{c:.4f},{v}')
+    body = json.dumps({'Meta Data': {}, 'Time Series (Daily)': ts})
+    return body, '\r\n'.join(lines) + '\r\n'
+
+
+def legacy_parse(ts: dict) -> pd.DataFrame:
+    """The per-row loop fetch_history used before the columnar parse (kept for comparison)."""
+    records = []
+    for date_str, vals in ts.items():
+        try:
+            date = datetime.fromisoformat(date_str)
+        except Exception:
+            date = datetime.strptime(date_str, '%Y-%m-%d')
+        close = vals.get('4. close') or vals.get('close')
+        open_ = vals.get('1. open') or vals.get('open')
+        high = vals.get('2. high') or vals.get('high')
+        low = vals.get('3. low') or vals.get('low')
+        volume = vals.get('5. volume') or vals.get('volume')
+        if close is None:
+            continue
+        row = {'date': date, 'close': float(close)}
+        if open_ is not None:
+            row['open'] = float(open_)
+        if high is not None:
+            row['high'] = float(high)
+        if low is not None:
+            row['low'] = float(low)
+        if volume is not None:
+            row['volume'] = float(volume)
+        records.append(row)
+    return pd.DataFrame(records).sort_values('date').set_index('date')
+
+
+def _time(fn, repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def run(rows: int = 5000, repeat: int = 20) -> dict:
+    body, csv_text = synthetic_payload(rows)
+    cases = {
+        'legacy_loop (json.loads)': lambda: legacy_parse(json.loads(body)['Time Series (Daily)']),
+        'columnar (json decode)': lambda: config._parse_av_series(config._json_loads(body)['Time Series (Daily)']),
+        'csv': lambda: config._parse_av_csv(csv_text),
+    }
+    ref = cases['legacy_loop (json.loads)']()
+    new = cases['columnar (json decode)']()
+    pd.testing.assert_frame_equal(ref[new.columns], new, check_names=False)
+    results = {name: _time(fn, repeat) for name, fn in cases.items()}
+    return {'rows': rows, 'json_bytes': len(body), 'csv_bytes': len(csv_text), 'best_seconds': results}
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument('--rows', type=int, default=5000)
+    ap.add_argument('--repeat', type=int, default=20)
+    args = ap.parse_args(argv)
+    res = run(args.rows, args.repeat)
+    base = res['best_seconds']['legacy_loop (json.loads)']
+    print(f"rows={res['rows']} json={res['json_bytes']}B csv={res['csv_bytes']}B")
+    for name, secs in res['best_seconds'].items():
+        print(f'  {name:28s} {secs * 1e3:8.2f} ms  x{base / secs:5.1f}')
+
+
+if __name__ == '__main__':
+    main()
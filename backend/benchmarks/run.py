@@ -0,0 +1,319 @@
+"""Benchmark suite for indicators, feature assembly, model training and the Flask routes.
+
+Usage (from backend/):
+
+    python benchmarks/run.py                              # quick profile, compare with baseline.json
+    python benchmarks/run.py --profile full -o out.json   # 100..50,000 bars, 1..500 tickers
+    python benchmarks/run.py --save-baseline              # overwrite benchmarks/baseline.json
+    python benchmarks/run.py --only indicators,train --fail-on-regression
+
+Every case is timed `repeat` times after one warm-up run and reported as
+median/min seconds. Synthetic OHLCV comes from local_provider.synthetic_ohlcv.
+The route cases use DATA_PROVIDER=local on a temporary directory, so no
+network is involved. Comparing against a baseline flags cases whose median
+got slower by more than --threshold.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import warnings
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+
+BACKEND_ROOT = Path(__file__).resolve().parents[1]
+if str(BACKEND_ROOT) not in sys.path:
+    sys.path.insert(0, str(BACKEND_ROOT))
+
+DEFAULT_BASELINE = Path(__file__).with_name('baseline.json')
+
+PROFILES = {
+    'quick': {
+        'bars': [100, 1000, 5000],
+        'update_bars': [3000],
+        'tickers': [1, 10],
+        'ticker_bars': 500,
+        'train_bars': 600,
+        'windows': [None, 250],
+        'models': ['ridge', 'rf'],
+        'route_bars': 600,
+        'batch_tickers': 5,
+        'repeat': 3,
+    },
+    'full': {
+        'bars': [100, 1000, 5000, 20000, 50000],
+        'update_bars': [3000, 20000],
+        'tickers': [1, 10, 100, 500],
+        'ticker_bars': 1000,
+        'train_bars': 2000,
+        'windows': [None, 250, 1000],
+        'models': ['ridge', 'rf'],
+        'route_bars': 2000,
+        'batch_tickers': 50,
+        'repeat': 5,
+    },
+}
+
+
+def synthetic_frame(bars: int, seed: int = 0):
+    """OHLCV plus a correlated `market_index` column (needed for corr_with_index_20, and so for ML training)."""
+    from local_provider import synthetic_ohlcv
+
+    df = synthetic_ohlcv(bars, seed=seed)
+    rng = np.random.default_rng(seed + 10_000)
+    df['market_index'] = df['close'].to_numpy() * 40.0 * np.exp(rng.normal(0, 0.005, bars).cumsum())
+    return df
+
+
+def measure(fn, repeat: int) -> dict:
+    fn()  # warm-up (imports, caches, JIT)
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return {'median_s': statistics.median(times), 'min_s': min(times), 'repeat': repeat}
+
+
+# --- benchmark groups -------------------------------------------------------
+
+def bench_parse(cfg):
+    import config
+    from bench_av_parse import synthetic_payload
+
+    for bars in cfg['bars']:
+        body, csv_text = synthetic_payload(bars)
+        yield f'parse.av_json[bars={bars}]', lambda b=body: config._series_from_payload(config._json_loads(b))
+        yield f'parse.av_csv[bars={bars}]', lambda t=csv_text: config._parse_av_csv(t)
+
+
+def bench_indicators(cfg):
+    from app import INDICATOR_ROW_COLUMNS
+    from features import compute_technical_indicators, update_technical_indicators
+
+    for bars in cfg['bars']:
+        df = synthetic_frame(bars)
+        yield f'indicators.compute[bars={bars}]', lambda d=df: compute_technical_indicators(d)
+        prev = compute_technical_indicators(df.iloc[:-1])
+        yield (f'indicators.update_one_bar[bars={bars}]',
+               lambda p=prev, d=df: update_technical_indicators(p, d.iloc[-1:]))
+        yield (f'indicators.compute_ui_subset[bars={bars}]',
+               lambda d=df: compute_technical_indicators(d, columns=INDICATOR_ROW_COLUMNS))
+        yield f'indicators.compute_numpy[bars={bars}]', lambda d=df: compute_technical_indicators(d, engine='numpy')
+        yield (f'indicators.numpy_arrays_f32[bars={bars}]',
+               lambda d=df: compute_technical_indicators(d, engine='numpy', as_arrays=True, dtype=np.float32))
+    # one new bar on histories long enough for the tail path, against recomputing them
+    for bars in cfg['update_bars']:
+        df = synthetic_frame(bars)
+        prev = compute_technical_indicators(df.iloc[:-1])
+        yield f'indicators.new_bar_full[bars={bars}]', lambda d=df: compute_technical_indicators(d)
+        yield (f'indicators.new_bar_tail[bars={bars}]',
+               lambda p=prev, d=df: update_technical_indicators(p, d.iloc[-1:]))
+
+
+def bench_assemble(cfg):
+    from features import assemble_features
+
+    for bars in cfg['bars']:
+        df = synthetic_frame(bars)
+        yield f'features.assemble[bars={bars}]', lambda d=df: assemble_features(d, {})
+
+
+def bench_tickers(cfg):
+    from features import compute_technical_indicators
+    from panel import compute_panel
+
+    for n in cfg['tickers']:
+        frames = [synthetic_frame(cfg['ticker_bars'], seed=i) for i in range(n)]
+        def run(frames=frames):
+            for d in frames:
+                compute_technical_indicators(d)
+        yield f'indicators.universe[tickers={n},bars={cfg["ticker_bars"]}]', run
+        universe = {f'T{i}': d for i, d in enumerate(frames)}
+        yield f'indicators.panel[tickers={n},bars={cfg["ticker_bars"]}]', lambda u=universe: compute_panel(u)
+
+
+def bench_train(cfg):
+    from sklearn.linear_model import Ridge
+
+    from features import assemble_features, valid_rows
+    from ml import train_and_predict_ml
+    from online_ridge import OnlineRidge
+
+    df = synthetic_frame(cfg['train_bars'])
+    feats = assemble_features(df, {}, compact=True)
+    y = feats['close'].shift(-1)
+    rows = valid_rows(feats.assign(target=y))
+    X, y = feats.loc[rows], y.loc[rows]
+    yield f'ml.ridge_fit[bars={cfg["train_bars"]}]', lambda: Ridge().fit(X.iloc[1:], y.iloc[1:]).predict(X.iloc[-1:])
+    # the window moves forward by one bar: one row in, one row out
+    online = OnlineRidge().fit(X.iloc[:-1], y.iloc[:-1])
+
+    def update():
+        model = online.copy()
+        model.slide(X.iloc[1:], y.iloc[1:], feats)
+        return model.predict(X.iloc[-1:])
+    yield f'ml.ridge_update_one_bar[bars={cfg["train_bars"]}]', update
+    for model in cfg['models']:
+        for window in cfg['windows']:
+            yield (f'ml.train_predict[model={model},window={window},bars={cfg["train_bars"]}]',
+                   lambda m=model, w=window: train_and_predict_ml(df, {}, steps=5, model_type=m, window=w))
+            yield (f'ml.train_predict_direct[model={model},window={window},bars={cfg["train_bars"]}]',
+                   lambda m=model, w=window: train_and_predict_ml(df, {}, steps=5, model_type=m, window=w,
+                                                                  strategy='direct'))
+
+
+def bench_routes(cfg):
+    from local_provider import write_synthetic_dataset
+
+    tmp = tempfile.mkdtemp(prefix='bench-local-')
+    tickers = [f'SYM{i}.BSE' for i in range(max(cfg['batch_tickers'], 1))]
+    write_synthetic_dataset(tmp, tickers, bars=cfg['route_bars'])
+    os.environ.update({'DATA_PROVIDER': 'local', 'LOCAL_DATA_DIR': tmp, 'TRAIN_WORKERS': '0'})
+
+    import config
+    from app import app
+    from feature_cache import FEATURE_CACHE
+
+    client = app.test_client()
+    t = tickers[0]
+    posts = {
+        'history': ('/api/history', {'ticker': t, 'limit': 100}),
+        'indicators': ('/api/indicators', {'ticker': t, 'limit': 120}),
+        'quote': ('/api/quote', {'ticker': t}),
+        'features_columns': ('/api/features-columns', {'ticker': t}),
+        'predict': ('/api/predict', {'ticker': t, 'days': 5}),
+        'predict_batch': ('/api/predict/batch', {'tickers': tickers, 'days': 5, 'stream': False}),
+    }
+
+    def cold(path, body):
+        def run():
+            config.PROVIDER_CACHE.clear()
+            FEATURE_CACHE.clear()
+            resp = client.post(path, json=body)
+            assert resp.status_code < 500, resp.get_data(as_text=True)[:200]
+        return run
+
+    yield 'route.health', lambda: client.get('/health')
+    for name, (path, body) in posts.items():
+        yield f'route.{name}[cold]', cold(path, body)
+    yield 'route.predict[warm]', lambda: client.post('/api/predict', json=posts['predict'][1])
+
+
+GROUPS = {
+    'parse': bench_parse,
+    'indicators': bench_indicators,
+    'assemble': bench_assemble,
+    'tickers': bench_tickers,
+    'train': bench_train,
+    'routes': bench_routes,
+}
+
+
+# --- reporting ----------------------------------------------------------------
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BACKEND_ROOT,
+                              capture_output=True, text=True, timeout=10).stdout.strip() or None
+    except Exception:
+        return None
+
+
+def run(profile: str = 'quick', only=None, verbose: bool = True) -> dict:
+    import pandas as pd
+
+    cfg = PROFILES[profile]
+    results = {}
+    for group, factory in GROUPS.items():
+        if only and group not in only:
+            continue
+        for name, fn in factory(cfg):
+            res = measure(fn, cfg['repeat'])
+            results[name] = res
+            if verbose:
+                print(f'{name:70s} {res["median_s"] * 1e3:10.2f} ms', flush=True)
+    return {
+        'meta': {
+            'profile': profile,
+            'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'commit': _git_commit(),
+            'python': platform.python_version(),
+            'pandas': pd.__version__,
+            'numpy': np.__version__,
+            'machine': platform.machine(),
+            'cpus': os.cpu_count(),
+        },
+        'results': results,
+    }
+
+
+def compare(current: dict, baseline: dict, threshold: float = 0.25, floor_s: float = 0.001):
+    """Return (rows, regressions) comparing medians; tiny cases under floor_s are never flagged."""
+    rows, regressions = [], []
+    base = baseline.get('results', {})
+    for name, cur in current['results'].items():
+        if name not in base:
+            rows.append((name, None, cur['median_s'], None, 'new'))
+            continue
+        b = base[name]['median_s']
+        ratio = cur['median_s'] / b if b else float('inf')
+        status = 'ok'
+        if ratio > 1 + threshold and cur['median_s'] - b > floor_s:
+            status = 'REGRESSION'
+            regressions.append(name)
+        elif ratio < 1 - threshold:
+            status = 'faster'
+        rows.append((name, b, cur['median_s'], ratio, status))
+    return rows, regressions
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description='Benchmark suite for the prediction backend.')
+    ap.add_argument('--profile', choices=sorted(PROFILES), default='quick')
+    ap.add_argument('--only', help=f'comma-separated groups ({",".join(GROUPS)})')
+    ap.add_argument('-o', '--output', help='write results JSON here')
+    ap.add_argument('--baseline', default=str(DEFAULT_BASELINE), help='baseline JSON to compare against')
+    ap.add_argument('--save-baseline', action='store_true', help='write results to --baseline')
+    ap.add_argument('--threshold', type=float, default=0.25, help='allowed slowdown before flagging (0.25 = 25%%)')
+    ap.add_argument('--fail-on-regression', action='store_true')
+    args = ap.parse_args(argv)
+
+    warnings.simplefilter('ignore')  # sklearn ill-conditioning warnings on random walks drown the table
+    only = set(args.only.split(',')) if args.only else None
+    current = run(args.profile, only)
+    if args.output:
+        Path(args.output).write_text(json.dumps(current, indent=2))
+    baseline_path = Path(args.baseline)
+    if args.save_baseline:
+        baseline_path.write_text(json.dumps(current, indent=2) + '\n')
+        print(f'baseline saved to {baseline_path}')
+        return 0
+    if not baseline_path.exists():
+        print(f'no baseline at {baseline_path}; run with --save-baseline to create one')
+        return 0
+    baseline = json.loads(baseline_path.read_text())
+    if baseline.get('meta', {}).get('profile') != args.profile:
+        print(f'warning: baseline profile {baseline.get("meta", {}).get("profile")!r} != {args.profile!r}')
+    rows, regressions = compare(current, baseline, args.threshold)
+    print(f'\n{"case":70s} {"baseline":>10s} {"current":>10s} {"ratio":>7s}')
+    for name, b, c, ratio, status in rows:
+        b_s = f'{b * 1e3:8.2f}ms' if b is not None else '       -'
+        r_s = f'{ratio:6.2f}x' if ratio is not None else '      -'
+        print(f'{name:70s} {b_s:>10s} {c * 1e3:8.2f}ms {r_s:>7s}  {status}')
+    if regressions:
+        print(f'\n{len(regressions)} regression(s) over {args.threshold:.0%}')
+        return 1 if args.fail_on_regression else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.path.insert(0, str(Path(__file__).resolve().parent))
+    sys.exit(main())
@@ -0,0 +1,181 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional, Union
+
+Ttl = Union[float, Callable[[Any], float]]
+
+
+class _Flight:
+    """One in-progress load that concurrent callers for the same key wait on."""
+
+    __slots__ = ('event', 'value', 'error')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.error: Optional[BaseException] = None
+
+
+class TTLCache:
+    """Bounded, thread-safe LRU cache with per-entry TTL and single-flight loads.
+
+    `get_or_load` runs `loader` at most once per key at a time: callers that
+    arrive while a load is in flight block on it and share its result (or its
+    exception). Counters are exposed through `stats()` for sizing.
+
+    With `maxbytes` and a `sizeof(value)` function the cache is also bounded by
+    memory footprint: least recently used entries are evicted until the total
+    fits, and values larger than the whole budget are not stored.
+    """
+
+    def __init__(self, maxsize: int = 512, name: str = 'cache', clock: Callable[[], float] = time.monotonic,
+                 maxbytes: Optional[int] = None, sizeof: Optional[Callable[[Any], int]] = None):
+        self.maxsize = int(maxsize)
+        self.name = name
+        self._clock = clock
+        self.maxbytes = None if maxbytes is None else int(maxbytes)
+        self._sizeof = sizeof
+        self.nbytes = 0
+        self._data: 'OrderedDict[Hashable, tuple]' = OrderedDict()
+        self._inflight: dict = {}
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def _lookup(self, key: Hashable):
+        """Return (found, value); caller must hold the lock."""
+        item = self._data.get(key)
+        if item is None:
+            return False, None
+        value, expires_at, size = item
+        if expires_at is not None and self._clock() >= expires_at:
+            del self._data[key]
+            self.nbytes -= size
+            self.expirations += 1
+            return False, None
+        self._data.move_to_end(key)
+        return True, value
+
+    def get(self, key: Hashable, default=None):
+        with self._lock:
+            found, value = self._lookup(key)
+            if found:
+                self.hits += 1
+                return value
+            self.misses += 1
+            return default
+
+    def peek(self, key: Hashable, default=None):
+        """get() without counting a hit or miss."""
+        with self._lock:
+            found, value = self._lookup(key)
+            return value if found else default
+
+    def set(self, key: Hashable, value, ttl: Optional[float] = None) -> None:
+        """Store value; ttl in seconds (None = no expiry, <= 0 = don't store)."""
+        if ttl is not None and ttl <= 0:
+            return
+        size = int(self._sizeof(value)) if self._sizeof is not None else 0
+        if self.maxbytes is not None and size > self.maxbytes:
+            return
+        with self._lock:
+            expires_at = None if ttl is None else self._clock() + float(ttl)
+            old = self._data.pop(key, None)
+            if old is not None:
+                self.nbytes -= old[2]
+            self._data[key] = (value, expires_at, size)
+            self.nbytes += size
+            while len(self._data) > self.maxsize or (self.maxbytes is not None and self.nbytes > self.maxbytes):
+                _, (_, _, evicted) = self._data.popitem(last=False)
+                self.nbytes -= evicted
+                self.evictions += 1
+
+    def invalidate(self, key: Hashable) -> None:
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self.nbytes -= old[2]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.nbytes = 0
+
+    def get_or_load(
+        self,
+        key: Hashable,
+        loader: Callable[[], Any],
+        ttl: Optional[Ttl] = None,
+        cache_if: Optional[Callable[[Any], bool]] = None,
+    ):
+        """Return the cached value for key, loading it once if absent.
+
+        ttl may be a number of seconds or a callable computing it from the loaded
+        value. Results for which cache_if returns False are handed to every
+        waiting caller but not stored (e.g. empty provider responses).
+        """
+        with self._lock:
+            found, value = self._lookup(key)
+            if found:
+                self.hits += 1
+                return value
+            flight = self._inflight.get(key)
+            if flight is None:
+                flight = _Flight()
+                self._inflight[key] = flight
+                leader = True
+                self.misses += 1
+            else:
+                leader = False
+                self.coalesced += 1
+
+        if not leader:
+            flight.event.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            value = loader()
+            flight.value = value
+            if cache_if is None or cache_if(value):
+                seconds = ttl(value) if callable(ttl) else ttl
+                self.set(key, value, seconds)
+            return value
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            flight.event.set()
+
+    def sizes(self) -> dict:
+        """{key: size} of the stored entries, as measured by sizeof (0 without one)."""
+        with self._lock:
+            return {key: item[2] for key, item in self._data.items()}
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'name': self.name,
+                'size': len(self._data),
+                'maxsize': self.maxsize,
+                'bytes': self.nbytes,
+                'maxbytes': self.maxbytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'coalesced': self.coalesced,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'inflight': len(self._inflight),
+                'hit_ratio': (self.hits / lookups) if lookups else None,
+            }
@@ -1,11 +1,25 @@
+import io
 import os
+import json
 import logging
-from datetime import datetime
+from datetime import datetime, timedelta
+import threading
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import numpy as np
 import pandas as pd
+from itertools import chain
 from pathlib import Path
 from typing import Optional
 
+try:
+    import orjson as _orjson  # optional: several times faster than json for large series
+except ImportError:
+    _orjson = None
+
+_json_loads = _orjson.loads if _orjson is not None else json.loads
+
 try:
     from dotenv import load_dotenv
     # 1) Load from current working directory if present
@@ -17,14 +31,281 @@ try:
 except Exception:
     pass
 
+try:
+    from .history_store import OHLCV_COLUMNS, get_history_store, merge_history
+except Exception:
+    import history_store  # type: ignore
+    get_history_store = history_store.get_history_store  # type: ignore[attr-defined]
+    merge_history = history_store.merge_history  # type: ignore[attr-defined]
+    OHLCV_COLUMNS = history_store.OHLCV_COLUMNS  # type: ignore[attr-defined]
+
+try:
+    from .cache import TTLCache
+except Exception:
+    import cache  # type: ignore
+    TTLCache = cache.TTLCache  # type: ignore[attr-defined]
+
+try:
+    from .local_provider import LocalProvider
+except Exception:
+    import local_provider  # type: ignore
+    LocalProvider = local_provider.LocalProvider  # type: ignore[attr-defined]
+
+try:
+    from .ratelimit import RateLimiter, RequestScheduler
+except Exception:
+    import ratelimit  # type: ignore
+    RateLimiter = ratelimit.RateLimiter  # type: ignore[attr-defined]
+    RequestScheduler = ratelimit.RequestScheduler  # type: ignore[attr-defined]
+
 LOG = logging.getLogger(__name__)
 
 
 def get_provider():
-    """Return configured data provider. Default: 'alphavantage'."""
+    """Return configured data provider ('alphavantage' | 'yfinance' | 'local'). Default: 'alphavantage'."""
     return os.environ.get('DATA_PROVIDER', 'alphavantage').lower()
 
 
+_LOCAL: Optional['LocalProvider'] = None
+_LOCAL_KEY = None
+
+
+def get_local_provider() -> 'LocalProvider':
+    """Return the DATA_PROVIDER=local replay provider configured from the environment.
+
+    LOCAL_DATA_DIR (default backend/data), LOCAL_LATENCY_MS, LOCAL_LATENCY_JITTER_MS,
+    LOCAL_ERROR_RATE (0..1) and LOCAL_SEED control where data comes from and
+    how much latency/failure is injected per call.
+    """
+    global _LOCAL, _LOCAL_KEY
+    key = (
+        os.environ.get('LOCAL_DATA_DIR') or str(Path(__file__).with_name('data')),
+        _env_float('LOCAL_LATENCY_MS', 0.0),
+        _env_float('LOCAL_LATENCY_JITTER_MS', 0.0),
+        _env_float('LOCAL_ERROR_RATE', 0.0),
+        os.environ.get('LOCAL_SEED'),
+    )
+    if _LOCAL is None or _LOCAL_KEY != key:
+        _LOCAL = LocalProvider(
+            key[0],
+            latency_ms=key[1],
+            jitter_ms=key[2],
+            error_rate=key[3],
+            seed=int(key[4]) if key[4] not in (None, '') else None,
+            series_parser=_series_from_payload,
+            normalize=_finish_ohlcv,
+        )
+        _LOCAL_KEY = key
+    return _LOCAL
+
+
+def _env_float(name: str, default: Optional[float]) -> Optional[float]:
+    v = os.environ.get(name)
+    if v in (None, ''):
+        return default
+    try:
+        return float(v)
+    except ValueError:
+        LOG.warning('ignoring non-numeric %s=%r', name, v)
+        return default
+
+
+# In-process cache shared by every provider call in this worker. TTLs per endpoint:
+#   CACHE_TTL_QUOTE (default 15s), CACHE_TTL_OVERVIEW (default 24h),
+#   history lives until the next bar boundary, optionally capped by CACHE_TTL_HISTORY.
+PROVIDER_CACHE = TTLCache(maxsize=int(_env_float('CACHE_MAXSIZE', 512)), name='provider')
+
+
+def seconds_until_next_bar(frequency: str, now: Optional[datetime] = None) -> float:
+    """Seconds until the next daily/weekly/monthly bar boundary (UTC midnight,
+    next Monday, first of next month)."""
+    now = now or datetime.utcnow()
+    midnight = datetime(now.year, now.month, now.day)
+    if frequency == 'weekly':
+        boundary = midnight + timedelta(days=7 - now.weekday())
+    elif frequency == 'monthly':
+        boundary = datetime(now.year + (now.month == 12), now.month % 12 + 1, 1)
+    else:
+        boundary = midnight + timedelta(days=1)
+    return max((boundary - now).total_seconds(), 1.0)
+
+
+AV_URL = 'https://www.alphavantage.co/query'
+
+_SESSION: Optional[requests.Session] = None
+_SESSION_PID: Optional[int] = None
+_SESSION_LOCK = threading.Lock()
+
+
+def _build_session() -> requests.Session:
+    """Session with a keep-alive pool and bounded, jittered retries on 5xx/timeouts.
+
+    Tunables: HTTP_POOL_CONNECTIONS (hosts, default 4), HTTP_POOL_MAXSIZE
+    (connections per host, default 16), HTTP_RETRIES (default 3),
+    HTTP_BACKOFF (backoff factor in seconds, default 0.5), HTTP_BACKOFF_JITTER
+    (max random seconds added per retry, default 0.5).
+    """
+    retry_kwargs = dict(
+        total=int(_env_float('HTTP_RETRIES', 3)),
+        backoff_factor=_env_float('HTTP_BACKOFF', 0.5),
+        status_forcelist=(500, 502, 503, 504),
+        allowed_methods=frozenset(['GET']),
+        raise_on_status=False,
+        respect_retry_after_header=True,
+    )
+    try:
+        retry = Retry(backoff_jitter=_env_float('HTTP_BACKOFF_JITTER', 0.5), **retry_kwargs)
+    except TypeError:
+        # urllib3 < 2 has no backoff_jitter
+        retry = Retry(**retry_kwargs)
+    adapter = HTTPAdapter(
+        pool_connections=int(_env_float('HTTP_POOL_CONNECTIONS', 4)),
+        pool_maxsize=int(_env_float('HTTP_POOL_MAXSIZE', 16)),
+        max_retries=retry,
+    )
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def get_session() -> requests.Session:
+    """Return this process's pooled session (rebuilt after fork so workers never share sockets)."""
+    global _SESSION, _SESSION_PID
+    pid = os.getpid()
+    if _SESSION is None or _SESSION_PID != pid:
+        with _SESSION_LOCK:
+            if _SESSION is None or _SESSION_PID != pid:
+                _SESSION = _build_session()
+                _SESSION_PID = pid
+    return _SESSION
+
+
+def _http_timeout():
+    """(connect, read) timeout in seconds from HTTP_CONNECT_TIMEOUT / HTTP_TIMEOUT."""
+    return (_env_float('HTTP_CONNECT_TIMEOUT', 5.0), _env_float('HTTP_TIMEOUT', 15.0))
+
+
+_SCHEDULER: Optional[RequestScheduler] = None
+_SCHEDULER_KEY = None
+# Used purely for single-flight: ttl=0 means results are shared with concurrent
+# identical calls but never stored (caching proper happens in PROVIDER_CACHE).
+_AV_INFLIGHT = TTLCache(maxsize=1, name='av-inflight')
+
+
+def get_scheduler() -> Optional[RequestScheduler]:
+    """Return this process's provider scheduler, or None when AV_RATE_LIMIT=0.
+
+    The token bucket lives in RATE_LIMIT_DB (default backend/.cache/ratelimit.sqlite)
+    and is shared by every worker process on the host. AV_RATE_LIMIT is calls per
+    minute (default 5), AV_RATE_BURST the bucket size (default = rate) and
+    AV_QUEUE_TIMEOUT the longest a call may wait for a token (default 120s).
+    """
+    global _SCHEDULER, _SCHEDULER_KEY
+    rate = _env_float('AV_RATE_LIMIT', 5.0)
+    if not rate or rate <= 0:
+        return None
+    path = Path(os.environ.get('RATE_LIMIT_DB') or Path(__file__).with_name('.cache') / 'ratelimit.sqlite')
+    key = (os.getpid(), str(path), rate, _env_float('AV_RATE_BURST', None), _env_float('AV_QUEUE_TIMEOUT', 120.0))
+    with _SESSION_LOCK:
+        if _SCHEDULER is None or _SCHEDULER_KEY != key:
+            limiter = RateLimiter(path, rate_per_minute=rate, burst=key[3], name='alphavantage')
+            _SCHEDULER = RequestScheduler(limiter, max_wait=key[4])
+            _SCHEDULER_KEY = key
+        return _SCHEDULER
+
+
+def _is_throttled(j: dict) -> bool:
+    """Alpha Vantage signals quota exhaustion with HTTP 200 and a Note/Information message."""
+    if not isinstance(j, dict):
+        return False
+    if j.get('Note'):
+        return True
+    info = j.get('Information')
+    return isinstance(info, str) and 'rate limit' in info.lower()
+
+
+def _av_get(params: dict):
+    """GET the Alpha Vantage query endpoint over the pooled session and decode JSON.
+
+    Calls are queued on the shared rate limiter (interactive before background)
+    and identical concurrent calls are coalesced into one request.
+    """
+    key = tuple(sorted((k, v) for k, v in params.items() if k != 'apikey'))
+    return _AV_INFLIGHT.get_or_load(key, lambda: _av_request(params), ttl=0)
+
+
+def _decode_av_response(r, params: dict):
+    """Decode a provider response: CSV text for datatype=csv, otherwise JSON.
+
+    Alpha Vantage reports errors and throttling as JSON even when CSV was
+    requested, so a CSV request may still come back as a dict.
+    """
+    if params.get('datatype') == 'csv':
+        text = r.text
+        if not text.lstrip().startswith('{'):
+            return text
+        return _json_loads(text)
+    if _orjson is not None:
+        return _orjson.loads(r.content)
+    return r.json()
+
+
+def _record_av_response(root: Path, params: dict, payload) -> None:
+    """Save a provider response as <SYMBOL>_<FUNCTION>.json|csv for DATA_PROVIDER=local replay."""
+    try:
+        root.mkdir(parents=True, exist_ok=True)
+        stem = f"{params.get('symbol')}_{params.get('function')}"
+        path = root / (stem + ('.csv' if isinstance(payload, str) else '.json'))
+        # Never let a compact top-up overwrite a recorded full series
+        if params.get('outputsize') == 'compact' and path.exists():
+            return
+        if isinstance(payload, str):
+            path.write_text(payload)
+        else:
+            path.write_text(json.dumps(payload))
+    except Exception:
+        LOG.exception('failed to record AlphaVantage response for %s', params.get('symbol'))
+
+
+def _av_request(params: dict):
+    scheduler = get_scheduler()
+    retries = int(_env_float('AV_NOTE_RETRIES', 2))
+    attempt = 0
+    while True:
+        if scheduler is not None:
+            scheduler.acquire()
+        r = get_session().get(AV_URL, params=params, timeout=_http_timeout())
+        r.raise_for_status()
+        j = _decode_av_response(r, params)
+        if scheduler is None or attempt >= retries or not _is_throttled(j):
+            if os.environ.get('AV_RECORD_DIR') and not _is_throttled(j):
+                _record_av_response(Path(os.environ['AV_RECORD_DIR']), params, j)
+            return j
+        # Quota was spent elsewhere (another host, the AV web UI, a stale bucket):
+        # drain our bucket and wait in line again instead of failing the call.
+        attempt += 1
+        LOG.warning('AlphaVantage throttled %s for %s; re-queueing (attempt %d)',
+                    params.get('function'), params.get('symbol'), attempt)
+        scheduler.limiter.penalize()
+
+
+def cache_stats() -> dict:
+    """Hit/miss counters for the in-process provider cache."""
+    return PROVIDER_CACHE.stats()
+
+
+def _detach(value):
+    """Shallow-copy containers handed out from the cache so callers can add keys/columns."""
+    if isinstance(value, tuple):
+        return tuple(_detach(v) for v in value)
+    if isinstance(value, dict):
+        return dict(value)
+    if isinstance(value, pd.DataFrame):
+        return value.copy(deep=False)
+    return value
+
+
 def fetch_history(
     ticker: str,
     period: str = "120d",
@@ -34,12 +315,69 @@ def fetch_history(
     api_key: Optional[str] = None,
 ):
     """
-    Fetch historical price data for ticker.
+    Fetch historical price data for ticker (cached in-process, see PROVIDER_CACHE).
     Returns a DataFrame indexed by datetime with at least 'close' column and (when available) 'open','high','low','volume'.
     frequency: 'daily' | 'weekly' | 'monthly'
     """
     provider = get_provider()
     frequency = (frequency or 'daily').lower()
+    key = ('history', provider, ticker.strip().upper(), period, frequency, outputsize)
+
+    def _load():
+        res = _fetch_history(ticker, period=period, frequency=frequency, outputsize=outputsize,
+                             return_metadata=True, api_key=api_key)
+        return res if isinstance(res, tuple) else (res, {'provider': provider})
+
+    def _ttl(_value):
+        cap = _env_float('CACHE_TTL_HISTORY', None)
+        ttl = seconds_until_next_bar(frequency)
+        return min(ttl, cap) if cap is not None else ttl
+
+    df, meta = _detach(PROVIDER_CACHE.get_or_load(
+        key, _load, ttl=_ttl, cache_if=lambda v: v[0] is not None and not v[0].empty,
+    ))
+    return (df, meta) if return_metadata else df
+
+
+def fetch_fundamentals_av(ticker: str, api_key: Optional[str] = None) -> dict:
+    """Fetch Alpha Vantage OVERVIEW fundamentals (EPS, PE, PEG, PB); cached for CACHE_TTL_OVERVIEW."""
+    key = ('overview', get_provider(), ticker.strip().upper())
+    return _detach(PROVIDER_CACHE.get_or_load(
+        key,
+        lambda: _fetch_fundamentals_av(ticker, api_key=api_key),
+        ttl=_env_float('CACHE_TTL_OVERVIEW', 86400.0),
+        cache_if=bool,
+    ))
+
+
+def fetch_global_quote_av(ticker: str, api_key: Optional[str] = None) -> dict:
+    """Fetch Alpha Vantage GLOBAL_QUOTE for the given symbol; cached for CACHE_TTL_QUOTE."""
+    key = ('quote', get_provider(), ticker.strip().upper())
+    return _detach(PROVIDER_CACHE.get_or_load(
+        key,
+        lambda: _fetch_global_quote_av(ticker, api_key=api_key),
+        ttl=_env_float('CACHE_TTL_QUOTE', 15.0),
+        cache_if=lambda v: isinstance(v, dict) and 'error' not in v,
+    ))
+
+
+def _fetch_history(
+    ticker: str,
+    period: str = "120d",
+    frequency: str = "daily",
+    outputsize: str = "compact",
+    return_metadata: bool = False,
+    api_key: Optional[str] = None,
+):
+    """Provider fetch behind fetch_history (no in-process caching)."""
+    provider = get_provider()
+    frequency = (frequency or 'daily').lower()
+
+    if provider == 'local':
+        symbol = ticker.strip().upper()
+        df = get_local_provider().history(symbol, frequency)
+        meta = {'provider': 'local', 'url': None, 'params': {'symbol': symbol, 'frequency': frequency}}
+        return (df, meta) if return_metadata else df
 
     if provider == 'yfinance':
         try:
@@ -75,91 +413,163 @@ def fetch_history(
             raise RuntimeError('ALPHA_VANTAGE_API_KEY is not set')
 
         symbol = ticker.strip().upper()
-        url = 'https://www.alphavantage.co/query'
-        # Use non-adjusted endpoints only (no adjusted endpoints)
-        fn_map = {
-            'daily': 'TIME_SERIES_DAILY',
-            'weekly': 'TIME_SERIES_WEEKLY',
-            'monthly': 'TIME_SERIES_MONTHLY',
-        }
-        fn = fn_map.get(frequency, 'TIME_SERIES_DAILY')
-        # Build params; only include outputsize for daily (ignored for weekly/monthly)
-        params = {
-            'function': fn,
-            'symbol': symbol,
-            'apikey': key,
-        }
-        if frequency == 'daily':
-            _out = outputsize if outputsize else 'full'
-            params['outputsize'] = _out
+        store = get_history_store()
+        cached = store.load(symbol, frequency) if store is not None else pd.DataFrame()
 
-        r = requests.get(url, params=params, timeout=15)
-        r.raise_for_status()
-        j = r.json()
-        # Match non-adjusted keys only
-        ts = (
-            j.get('Time Series (Daily)')
-            or j.get('Weekly Time Series')
-            or j.get('Monthly Time Series')
-        )
-        if not ts:
-            LOG.error('AlphaVantage unexpected response: %s', j)
-            return (pd.DataFrame(), {'provider': 'alphavantage', 'url': url, 'params': {k: v for k, v in params.items() if k != 'apikey'}, 'raw_keys': list(j.keys())}) if return_metadata else pd.DataFrame()
+        # Incremental top-up: daily full history already on disk only needs the
+        # latest ~100 bars ('compact'). A compact series on disk is not enough: it
+        # is refetched whole. Weekly/monthly have no outputsize, so they are always
+        # fetched whole and just written through.
+        full = (outputsize or 'full') == 'full'
+        if not cached.empty and frequency == 'daily' and full and store.is_full(symbol, frequency):
+            delta, meta = _fetch_av_series(symbol, frequency, 'compact', key)
+            if delta.empty:
+                LOG.warning('AlphaVantage top-up for %s returned no data; serving %d cached rows', symbol, len(cached))
+                meta['cache'] = 'stale'
+                return (cached, meta) if return_metadata else cached
+            if delta.index[0] <= cached.index[-1]:
+                try:
+                    store.save(symbol, frequency, delta)
+                except Exception:
+                    LOG.exception('history store write failed for %s', symbol)
+                df = merge_history(cached, delta)
+                meta['cache'] = 'topup'
+                return (df, meta) if return_metadata else df
+            # Gap larger than the compact window: fall through to a full refetch
+            LOG.info('AlphaVantage cache for %s is older than the compact window; refetching full', symbol)
 
-        records = []
-        for date_str, vals in ts.items():
+        df, meta = _fetch_av_series(symbol, frequency, outputsize, key)
+        if df.empty and not cached.empty:
+            LOG.warning('AlphaVantage fetch for %s returned no data; serving %d cached rows', symbol, len(cached))
+            meta['cache'] = 'stale'
+            return (cached, meta) if return_metadata else cached
+        if store is not None and not df.empty:
             try:
-                date = datetime.fromisoformat(date_str)
+                store.save(symbol, frequency, df, full=full or frequency != 'daily')
             except Exception:
-                date = datetime.strptime(date_str, '%Y-%m-%d')
-            # non-adjusted close/volume keys
-            close = vals.get('4. close') or vals.get('close')
-            open_ = vals.get('1. open') or vals.get('open')
-            high = vals.get('2. high') or vals.get('high')
-            low = vals.get('3. low') or vals.get('low')
-            volume = vals.get('5. volume') or vals.get('volume')
-            if close is None:
-                continue
-            row = {'date': date, 'close': float(close)}
-            if open_ is not None:
-                row['open'] = float(open_)
-            if high is not None:
-                row['high'] = float(high)
-            if low is not None:
-                row['low'] = float(low)
-            if volume is not None:
-                try:
-                    row['volume'] = float(volume)
-                except Exception:
-                    pass
-            records.append(row)
+                LOG.exception('history store write failed for %s', symbol)
+        meta['cache'] = 'miss'
+        return (df, meta) if return_metadata else df
+
+    raise RuntimeError(f'Unsupported DATA_PROVIDER: {provider}')
+
 
-        df = pd.DataFrame(records)
+def _fetch_av_series(symbol: str, frequency: str, outputsize: Optional[str], key: str):
+    """Request one TIME_SERIES_* payload and parse it. Returns (df, metadata)."""
+    url = AV_URL
+    # Use non-adjusted endpoints only (no adjusted endpoints)
+    fn_map = {
+        'daily': 'TIME_SERIES_DAILY',
+        'weekly': 'TIME_SERIES_WEEKLY',
+        'monthly': 'TIME_SERIES_MONTHLY',
+    }
+    fn = fn_map.get(frequency, 'TIME_SERIES_DAILY')
+    # Build params; only include outputsize for daily (ignored for weekly/monthly)
+    params = {
+        'function': fn,
+        'symbol': symbol,
+        'apikey': key,
+    }
+    if frequency == 'daily':
+        _out = outputsize if outputsize else 'full'
+        params['outputsize'] = _out
+    # AV_DATATYPE=csv asks for the smaller CSV body, parsed straight into columns
+    if os.environ.get('AV_DATATYPE', 'json').lower() == 'csv':
+        params['datatype'] = 'csv'
+    meta = {'provider': 'alphavantage', 'url': url, 'params': {k: v for k, v in params.items() if k != 'apikey'}}
+
+    payload = _av_get(params)
+    if isinstance(payload, str):
+        df = _parse_av_csv(payload)
         if df.empty:
-            return (df, {'provider': 'alphavantage', 'url': url, 'params': {k: v for k, v in params.items() if k != 'apikey'}}) if return_metadata else df
-        df = df.sort_values('date')
-        df = df.set_index('date')
-        return (df, {'provider': 'alphavantage', 'url': url, 'params': {k: v for k, v in params.items() if k != 'apikey'}}) if return_metadata else df
+            LOG.error('AlphaVantage unexpected CSV response: %s', payload[:200])
+            meta['raw_keys'] = payload.splitlines()[:1]
+        return df, meta
 
-    raise RuntimeError(f'Unsupported DATA_PROVIDER: {provider}')
+    df = _series_from_payload(payload)
+    if df.empty:
+        LOG.error('AlphaVantage unexpected response: %s', payload)
+        meta['raw_keys'] = list(payload.keys())
+    return df, meta
 
 
-def fetch_fundamentals_av(ticker: str, api_key: Optional[str] = None) -> dict:
+def _series_from_payload(payload) -> pd.DataFrame:
+    """Parse a TIME_SERIES_* response body (decoded JSON dict or CSV text) into OHLCV."""
+    if isinstance(payload, str):
+        return _parse_av_csv(payload)
+    # Match non-adjusted keys only
+    ts = (
+        payload.get('Time Series (Daily)')
+        or payload.get('Weekly Time Series')
+        or payload.get('Monthly Time Series')
+    )
+    return _parse_av_series(ts) if ts else pd.DataFrame()
+
+
+def _finish_ohlcv(frame: pd.DataFrame) -> pd.DataFrame:
+    """Coerce parsed provider columns to float OHLCV with a sorted DatetimeIndex named 'date'."""
+    cols = [c for c in OHLCV_COLUMNS if c in frame.columns]
+    if 'close' not in cols:
+        return pd.DataFrame()
+    frame = frame[cols]
+    if not all(dt.kind == 'f' for dt in frame.dtypes):
+        frame = frame.apply(pd.to_numeric, errors='coerce').astype(float)
+    frame.index = pd.to_datetime(frame.index, errors='coerce')
+    frame = frame.loc[frame.index.notna() & frame['close'].notna()]
+    frame.index.name = 'date'
+    return frame.sort_index()
+
+
+def _parse_av_series(ts: dict) -> pd.DataFrame:
+    """Columnar parse of an Alpha Vantage time-series mapping {date: {'1. open': '..', ...}}.
+
+    Every bar normally carries the same keys in the same order, so all values are
+    converted to float64 in one np.fromiter pass; ragged or non-numeric payloads
+    fall back to a generic record parse.
+    """
+    if not ts:
+        return pd.DataFrame()
+    dates = list(ts)
+    rows = list(ts.values())
+    keys = list(rows[0])
+    try:
+        if len({tuple(r) for r in rows}) != 1:
+            raise ValueError('bars do not share one key layout')
+        values = np.fromiter(
+            chain.from_iterable(r.values() for r in rows), dtype=float, count=len(rows) * len(keys)
+        ).reshape(len(rows), len(keys))
+        frame = pd.DataFrame(values, index=dates, columns=keys)
+    except (ValueError, TypeError):
+        frame = pd.DataFrame.from_records(rows, index=dates)
+    # '1. open' -> 'open'; plain keys pass through unchanged
+    frame.columns = [str(c).split('. ', 1)[-1].strip().lower() for c in frame.columns]
+    return _finish_ohlcv(frame)
+
+
+def _parse_av_csv(text: str) -> pd.DataFrame:
+    """Parse a datatype=csv time series (timestamp,open,high,low,close,volume)."""
+    try:
+        frame = pd.read_csv(io.StringIO(text), index_col=0)
+    except Exception:
+        return pd.DataFrame()
+    frame.columns = [str(c).strip().lower() for c in frame.columns]
+    return _finish_ohlcv(frame)
+
+
+def _fetch_fundamentals_av(ticker: str, api_key: Optional[str] = None) -> dict:
     """Fetch Alpha Vantage OVERVIEW fundamentals (EPS, PE, PEG, PB)."""
+    local = get_provider() == 'local'
     key = api_key or os.environ.get('ALPHA_VANTAGE_API_KEY')
-    if not key:
+    if not key and not local:
         return {}
     symbol = ticker.strip().upper()
-    url = 'https://www.alphavantage.co/query'
     params = {
         'function': 'OVERVIEW',
         'symbol': symbol,
         'apikey': key,
     }
     try:
-        r = requests.get(url, params=params, timeout=15)
-        r.raise_for_status()
-        j = r.json()
+        j = get_local_provider().overview(symbol) if local else _av_get(params)
     except Exception as e:
         LOG.exception('AlphaVantage OVERVIEW failed: %s', e)
         return {}
@@ -178,22 +588,21 @@ def fetch_fundamentals_av(ticker: str, api_key: Optional[str] = None) -> dict:
     return out
 
 
-def fetch_global_quote_av(ticker: str, api_key: Optional[str] = None) -> dict:
+def _fetch_global_quote_av(ticker: str, api_key: Optional[str] = None) -> dict:
     """Fetch Alpha Vantage GLOBAL_QUOTE for the given symbol and normalize fields."""
+    local = get_provider() == 'local'
     key = api_key or os.environ.get('ALPHA_VANTAGE_API_KEY')
-    if not key:
+    if not key and not local:
         return {"error": "ALPHA_VANTAGE_API_KEY is not set"}
     symbol = ticker.strip().upper()
-    url = 'https://www.alphavantage.co/query'
+    url = None if local else AV_URL
     params = {
         'function': 'GLOBAL_QUOTE',
         'symbol': symbol,
         'apikey': key,
     }
     try:
-        r = requests.get(url, params=params, timeout=15)
-        r.raise_for_status()
-        j = r.json()
+        j = get_local_provider().global_quote(symbol) if local else _av_get(params)
     except Exception as e:
         LOG.exception('AlphaVantage GLOBAL_QUOTE failed: %s', e)
         return {"error": str(e)}
@@ -230,6 +639,6 @@ def fetch_global_quote_av(ticker: str, api_key: Optional[str] = None) -> dict:
         'change_percent': gq.get('10. change percent'),
         'url': url,
         'request': {k: v for k, v in params.items() if k != 'apikey'},
-        'provider': 'alphavantage',
+        'provider': 'local' if local else 'alphavantage',
     }
     return out
@@ -0,0 +1,175 @@
+"""Memoized indicator and feature frames.
+
+/api/indicators, the indicators_latest snapshot of /api/predict,
+/api/features-columns and train_and_predict_ml all turn the same history into
+features. Routes bind the ticker and frequency for the duration of a request:
+
+    with feature_scope(ticker, frequency):
+        feats = cached_features(hist, fundamentals)
+
+cached_indicators()/cached_features() then memoize their frames in
+FEATURE_CACHE. Entries are keyed by (kind, ticker, frequency, last bar,
+fundamentals hash, columns), and least recently used entries are evicted once
+the frames exceed FEATURE_CACHE_MB. Outside a scope (process-pool workers,
+scripts) both helpers compute directly. Frames are handed out as shallow
+copies, so callers may add columns but must not write into existing ones.
+
+When a history grows by a bar (or its last bar is revised), the previous
+indicator frame for the same ticker is extended with
+update_technical_indicators() instead of being recomputed, and replaces the
+old entry. cached_features() builds on cached_indicators(), so feature frames
+get the same treatment.
+
+Cached frames are compact (FEATURE_COMPACT, on by default): no alias columns,
+int8 flags, no defensive copies, and float32 storage with FEATURE_DTYPE=float32.
+"""
+import os
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+try:
+    from .cache import TTLCache
+    from .features import assemble_features, compute_technical_indicators, update_technical_indicators
+    from .market import MarketIndices
+except Exception:
+    from cache import TTLCache  # type: ignore
+    from features import assemble_features, compute_technical_indicators, update_technical_indicators  # type: ignore
+    from market import MarketIndices  # type: ignore
+
+_SCOPE: ContextVar[Optional[tuple]] = ContextVar('feature_scope', default=None)
+# (kind, ticker, frequency, params) -> key of the most recent entry, for incremental extension
+_LATEST: Dict[tuple, tuple] = {}
+_EXTENDED = 0
+
+FEATURE_COMPACT = os.environ.get('FEATURE_COMPACT', '1').lower() not in ('0', 'false', 'no')
+FEATURE_DTYPE = np.dtype(os.environ.get('FEATURE_DTYPE', 'float64'))
+
+
+def frame_nbytes(df: pd.DataFrame) -> int:
+    return int(df.memory_usage(index=True, deep=False).sum())
+
+
+FEATURE_CACHE = TTLCache(
+    maxsize=int(os.environ.get('FEATURE_CACHE_MAXSIZE', 1024)),
+    name='features',
+    maxbytes=int(float(os.environ.get('FEATURE_CACHE_MB', 256)) * 2 ** 20),
+    sizeof=frame_nbytes,
+)
+
+
+@contextmanager
+def feature_scope(ticker: str, frequency: str = 'daily'):
+    """Let cached_indicators()/cached_features() below this block memoize under (ticker, frequency)."""
+    token = _SCOPE.set((str(ticker).strip().upper(), str(frequency).lower()))
+    try:
+        yield
+    finally:
+        _SCOPE.reset(token)
+
+
+def current_scope() -> Optional[tuple]:
+    """(ticker, frequency) of the enclosing feature_scope, or None."""
+    return _SCOPE.get()
+
+
+def bar_key(df: pd.DataFrame) -> tuple:
+    """Identity of a history: first/last timestamp, bar count and the last close.
+
+    The close is part of it because today's daily bar keeps changing until the
+    session ends, while its timestamp does not.
+    """
+    cols = {str(c).lower(): c for c in df.columns}
+    close = df[cols['close']].iloc[-1] if 'close' in cols else None
+    return df.index[0], df.index[-1], len(df), repr(close)
+
+
+def fundamentals_key(fundamentals: Optional[dict]) -> tuple:
+    """Hashable digest of a fundamentals dict; Series values (market closes) are hashed by content,
+    MarketIndices by the key it computed once."""
+    if not fundamentals:
+        return ()
+    parts = []
+    for k in sorted(fundamentals, key=str):
+        parts.append((str(k), _digest(fundamentals[k])))
+    return tuple(parts)
+
+
+def _digest(v):
+    if isinstance(v, MarketIndices):
+        return v.key
+    if isinstance(v, (pd.Series, pd.DataFrame)):
+        return len(v), int(pd.util.hash_pandas_object(v, index=True).sum())
+    if isinstance(v, dict):
+        return tuple((str(k), _digest(v[k])) for k in sorted(v, key=str))
+    return repr(v)
+
+
+def _close(df: pd.DataFrame) -> np.ndarray:
+    col = next((c for c in df.columns if str(c).lower() == 'close'), None)
+    return pd.to_numeric(df[col], errors='coerce').to_numpy(dtype=float) if col is not None else None
+
+
+def _extends(prev: pd.DataFrame, df: pd.DataFrame) -> bool:
+    """True if df is prev's history with bars appended and/or prev's last bar revised."""
+    n = len(prev)
+    if n < 2 or len(df) < n or not df.index[:n - 1].equals(prev.index[:n - 1]):
+        return False
+    old, new = _close(prev), _close(df)
+    return old is not None and new is not None and np.array_equal(old[:n - 1], new[:n - 1], equal_nan=True)
+
+
+def _memoize(key_parts: tuple, df: pd.DataFrame, compute, extend=None):
+    scope = _SCOPE.get()
+    if scope is None or df is None or df.empty or FEATURE_CACHE.maxbytes == 0:
+        return compute()
+    series = (*key_parts[:1], *scope, *key_parts[1:])
+    key = (*key_parts[:1], *scope, bar_key(df), *key_parts[1:])
+
+    def load():
+        global _EXTENDED
+        prev_key = _LATEST.get(series)
+        prev = FEATURE_CACHE.peek(prev_key) if extend is not None and prev_key is not None else None
+        if isinstance(prev, pd.DataFrame) and _extends(prev, df):
+            out = extend(prev)
+            FEATURE_CACHE.invalidate(prev_key)
+            _EXTENDED += 1
+            return out
+        return compute()
+
+    value = FEATURE_CACHE.get_or_load(key, load, cache_if=lambda out: isinstance(out, pd.DataFrame))
+    _LATEST[series] = key
+    return value.copy(deep=False) if isinstance(value, pd.DataFrame) else value
+
+
+def cached_indicators(df: pd.DataFrame, columns: Optional[Iterable[str]] = None) -> pd.DataFrame:
+    """compute_technical_indicators(df, columns=columns) in the cache's layout, memoized inside a feature_scope."""
+    columns = None if columns is None else tuple(columns)
+    return _memoize(('indicators', columns), df,
+                    lambda: compute_technical_indicators(df, columns=columns, compact=FEATURE_COMPACT,
+                                                         dtype=FEATURE_DTYPE),
+                    extend=lambda prev: update_technical_indicators(prev, df.iloc[len(prev) - 1:]))
+
+
+def cached_features(df: pd.DataFrame, fundamentals: Optional[dict] = None) -> pd.DataFrame:
+    """assemble_features(df, fundamentals), memoized inside a feature_scope."""
+    return _memoize(('features', fundamentals_key(fundamentals)), df,
+                    lambda: assemble_features(df, fundamentals, indicators=cached_indicators(df),
+                                              compact=FEATURE_COMPACT))
+
+
+def feature_cache_stats() -> dict:
+    """FEATURE_CACHE counters, plus incremental extensions and the memory footprint per ticker."""
+    per_ticker: Dict[str, int] = {}
+    for key, size in FEATURE_CACHE.sizes().items():
+        per_ticker[key[1]] = per_ticker.get(key[1], 0) + size
+    return {
+        **FEATURE_CACHE.stats(),
+        'extended': _EXTENDED,
+        'tickers': len(per_ticker),
+        'bytes_per_ticker': sum(per_ticker.values()) / len(per_ticker) if per_ticker else 0,
+        'max_ticker_bytes': max(per_ticker.values(), default=0),
+    }
@@ -1,192 +1,684 @@
+import math
+import os
 import pandas as pd
 import numpy as np
-from typing import Optional
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
 from ta.trend import SMAIndicator, EMAIndicator, MACD, ADXIndicator
 from ta.momentum import RSIIndicator, StochasticOscillator
 from ta.volatility import BollingerBands
 from ta.volume import OnBalanceVolumeIndicator, MFIIndicator
 
+try:
+    from . import features_jit, market
+except Exception:
+    import features_jit  # type: ignore
+    import market  # type: ignore
 
-def compute_technical_indicators(df: pd.DataFrame) -> pd.DataFrame:
-    """Compute full feature set from raw OHLCV data (spec)."""
-    out = df.copy()
-    out = out.rename(columns={c: c.lower() for c in out.columns})
-    close = pd.to_numeric(out.get('close'), errors='coerce')
-    open_ = pd.to_numeric(out.get('open', close), errors='coerce')
-    high = pd.to_numeric(out.get('high', close), errors='coerce')
-    low = pd.to_numeric(out.get('low', close), errors='coerce')
-    volume = pd.to_numeric(out.get('volume', pd.Series(0, index=out.index)), errors='coerce')
-    prev_close = close.shift(1)
-
-    # Trend MAs
-    for w, name in [(5,'sma_5'),(10,'sma_10'),(20,'sma_20'),(50,'sma_50')]:
-        out[name] = close.rolling(w, min_periods=w).mean()
-    for w, name in [(12,'ema_12'),(20,'ema_20'),(26,'ema_26'),(50,'ema_50')]:
-        out[name] = close.ewm(span=w, adjust=False, min_periods=w).mean()
-
-    # MACD
-    out['macd'] = out['ema_12'] - out['ema_26']
-    out['macd_signal'] = out['macd'].ewm(span=9, adjust=False).mean()
-    out['macd_hist'] = out['macd'] - out['macd_signal']
-
-    # RSI
-    out['rsi_14'] = RSIIndicator(close, window=14, fillna=False).rsi()
-
-    # Bollinger Bands
-    bb_mid = out['sma_20']
-    std20 = close.rolling(20, min_periods=20).std(ddof=0)
-    out['bb_mid'] = bb_mid
-    out['bb_upper'] = bb_mid + 2 * std20
-    out['bb_lower'] = bb_mid - 2 * std20
-    out['bb_width'] = (out['bb_upper'] - out['bb_lower']) / bb_mid.replace(0, np.nan)
-
-    # Stochastic
-    lowest_low_14 = low.rolling(14, min_periods=14).min()
-    highest_high_14 = high.rolling(14, min_periods=14).max()
-    stoch_k = (close - lowest_low_14) / (highest_high_14 - lowest_low_14).replace(0, np.nan) * 100.0
-    out['stoch_k_14'] = stoch_k
-    out['stoch_d_3'] = stoch_k.rolling(3, min_periods=3).mean()
-    out['stoch_k'] = out['stoch_k_14']
-    out['stoch_d'] = out['stoch_d_3']
-
-    # ADX & DI
+
+# Indicator columns in the order compute_technical_indicators adds them
+INDICATOR_COLUMNS = (
+    'sma_5', 'sma_10', 'sma_20', 'sma_50', 'ema_12', 'ema_20', 'ema_26', 'ema_50',
+    'macd', 'macd_signal', 'macd_hist', 'rsi_14', 'bb_mid', 'bb_upper', 'bb_lower', 'bb_width',
+    'stoch_k_14', 'stoch_d_3', 'stoch_k', 'stoch_d', 'adx_14', 'plus_di_14', 'minus_di_14',
+    'di_pos_14', 'di_neg_14', 'tr', 'atr_14', 'vol_sma_20', 'volume_spike', 'vol_spike', 'obv',
+    'mfi_14', 'support_20', 'resistance_20', 'breakout', 'breakdown', 'close_lag_1',
+    'close_lag_3', 'close_lag_5', 'close_lag_10', 'ret_1', 'ret_5', 'lag_1', 'lag_3', 'lag_5',
+    'lag_10', 'hl_pct', 'co_pct', 'cp_pct', 'rolling_std_10', 'rolling_std_20',
+    'rolling_skew_10', 'rolling_kurt_10', 'rolling_zscore_10', 'doji', 'bull_engulf',
+    'bear_engulf', 'corr_with_index_20', 'regime_trend',
+)
+INT_INDICATOR_COLUMNS = ('breakout', 'breakdown', 'doji', 'bull_engulf', 'bear_engulf', 'regime_trend')
+# legacy column -> the column it duplicates; compact frames store only the latter
+INDICATOR_ALIASES = {
+    'stoch_k': 'stoch_k_14', 'stoch_d': 'stoch_d_3', 'di_pos_14': 'plus_di_14', 'di_neg_14': 'minus_di_14',
+    'vol_spike': 'volume_spike', 'lag_1': 'close_lag_1', 'lag_3': 'close_lag_3', 'lag_5': 'close_lag_5',
+    'lag_10': 'close_lag_10',
+}
+COMPACT_INDICATOR_COLUMNS = tuple(c for c in INDICATOR_COLUMNS if c not in INDICATOR_ALIASES)
+
+ENGINES = ('pandas', 'numpy')
+
+
+class _Indicator(NamedTuple):
+    outputs: Tuple[str, ...]
+    deps: Tuple[str, ...]
+    fn: Callable
+    window: int
+    decay: Tuple[float, ...]
+    cumulative: bool
+    warmup: Tuple[int, ...]  # per output
+    sparse: bool
+
+
+# column -> the registered node that produces it; nodes are registered in INDICATOR_COLUMNS order,
+# which is also a valid evaluation order (every node only depends on earlier ones)
+INDICATORS: Dict[str, _Indicator] = {}
+_NODES: List[_Indicator] = []
+# column -> leading rows that are NaN by construction on gap-free input (its first valid row)
+WARMUP: Dict[str, int] = {}
+
+
+def indicator(*outputs: str, deps: Sequence[str] = (), window: int = 1, decay: Sequence[float] = (),
+              cumulative: bool = False, warmup=None, sparse: bool = False):
+    """Register fn(bars, cols) as the producer of `outputs`; it may read the `deps` columns from cols.
+
+    window: bars of input (raw bars or dep rows) behind one output row, e.g. 20 for a 20-bar mean.
+    decay: the per-bar factor (1 - alpha) of every exponential recursion in fn; such outputs depend
+           on all of history, with weight decay ** age.
+    cumulative: outputs are running totals over the whole history (obv).
+    warmup: first valid row of each output on gap-free input (an int for all of them); by default
+            the latest first valid row among the deps.
+    sparse: outputs can also be NaN after the warm-up on valid input (a flat window's 0/0).
+    """
+    if warmup is None:
+        warmup = max((WARMUP[d] for d in deps), default=0)
+    if isinstance(warmup, int):
+        warmup = (warmup,) * len(outputs)
+
+    def register(fn):
+        node = _Indicator(tuple(outputs), tuple(deps), fn, int(window), tuple(decay), bool(cumulative),
+                          tuple(warmup), bool(sparse))
+        _NODES.append(node)
+        for name, rows in zip(outputs, warmup):
+            INDICATORS[name] = node
+            WARMUP[name] = rows
+        return fn
+    return register
+
+
+def indicator_dependencies(columns: Iterable[str]) -> Tuple[str, ...]:
+    """Every indicator column needed to produce `columns`, in INDICATOR_COLUMNS order."""
+    needed, stack = set(), list(columns)
+    while stack:
+        name = stack.pop()
+        if name in needed:
+            continue
+        node = INDICATORS.get(name)
+        if node is None:
+            raise ValueError(f"unknown indicator column {name!r}")
+        needed.update(node.outputs)
+        stack.extend(node.deps)
+    return tuple(c for c in INDICATOR_COLUMNS if c in needed)
+
+
+def indicator_lookback(columns: Optional[Iterable[str]] = None, tolerance: float = 1e-10) -> int:
+    """Bars of prior history needed to recompute the latest rows of `columns` as a full pass would.
+
+    Windowed indicators need their window (minus the current bar) behind them, stacked along the
+    dependency chain. Exponential recursions (EMA, RSI, ATR, ADX) never forget their seed; they get
+    enough extra bars for the seed's weight to fall below `tolerance`. Cumulative columns (obv) cannot
+    be recomputed from a window at all and are carried forward by update_technical_indicators().
+    """
+    names = INDICATOR_COLUMNS if columns is None else indicator_dependencies(columns)
+    memo: Dict[str, int] = {}
+
+    def bars_for(name):
+        node = INDICATORS[name]
+        key = node.outputs[0]
+        if key not in memo:
+            own = node.window - 1 + sum(int(math.ceil(math.log(tolerance) / math.log(d))) for d in node.decay)
+            memo[key] = own + max((bars_for(dep) for dep in node.deps), default=0)
+        return memo[key]
+
+    return max((bars_for(name) for name in names), default=0)
+
+
+def feature_warmup(columns: Optional[Iterable[str]] = None) -> int:
+    """Leading rows before every indicator in `columns` (default: all) is defined, on gap-free input.
+
+    A model trained on `rows` complete feature rows needs feature_warmup() + rows bars of history.
+    Columns that stay NaN throughout (no volume or market_index input, ADX below 28 bars) have no
+    first valid row and are not covered.
+    """
+    names = INDICATOR_COLUMNS if columns is None else [c for c in columns if c in WARMUP]
+    return max((WARMUP[c] for c in names), default=0)
+
+
+def valid_rows(frame: pd.DataFrame, columns: Optional[Iterable[str]] = None) -> np.ndarray:
+    """Boolean mask of the rows where none of `columns` (default: all) is NaN, as frame.dropna() keeps.
+
+    Rows before the warm-up of the indicator columns are invalid by construction and are not
+    scanned; after it only the columns that can still be NaN are (inputs, columns added on top of
+    the indicators, and sparse indicators such as stoch on a flat range). Frames with missing
+    OHLCV values, or an indicator that never became valid, get a plain full scan.
+    """
+    cols = list(frame.columns) if columns is None else list(columns)
+    dense = [c for c in cols if c in INDICATORS and not INDICATORS[c].sparse]
+    others = [c for c in cols if c not in INDICATORS or INDICATORS[c].sparse]
+    start = feature_warmup(dense)
+    mask = np.zeros(len(frame), dtype=bool)
+    if start >= len(frame):
+        return mask
+    inputs = [c for c in ('open', 'high', 'low', 'close', 'volume') if c in frame.columns]
+    if (not inputs or frame[inputs].isna().to_numpy().any()
+            or (dense and frame[dense].iloc[start].isna().any())):
+        return frame[cols].notna().all(axis=1).to_numpy()
+    mask[start:] = frame[others].iloc[start:].notna().all(axis=1).to_numpy() if others else True
+    return mask
+
+
+class _Bars(NamedTuple):
+    frame: pd.DataFrame  # input with lower-cased column names
+    close: pd.Series
+    open_: pd.Series
+    high: pd.Series
+    low: pd.Series
+    volume: pd.Series
+    prev_close: pd.Series
+    jit: bool  # gap-free input and features_jit kernels available
+
+    def nan(self) -> pd.Series:
+        return pd.Series(np.nan, index=self.frame.index)
+
+    def series(self, values: np.ndarray) -> pd.Series:
+        return pd.Series(values, index=self.frame.index)
+
+
+@indicator('sma_5', window=5, warmup=4)
+def _sma_5(b, cols):
+    cols['sma_5'] = b.close.rolling(5, min_periods=5).mean()
+
+
+@indicator('sma_10', window=10, warmup=9)
+def _sma_10(b, cols):
+    cols['sma_10'] = b.close.rolling(10, min_periods=10).mean()
+
+
+@indicator('sma_20', window=20, warmup=19)
+def _sma_20(b, cols):
+    cols['sma_20'] = b.close.rolling(20, min_periods=20).mean()
+
+
+@indicator('sma_50', window=50, warmup=49)
+def _sma_50(b, cols):
+    cols['sma_50'] = b.close.rolling(50, min_periods=50).mean()
+
+
+def _register_ema(w):
+    name = f'ema_{w}'
+
+    @indicator(name, window=w, decay=((w - 1) / (w + 1),), warmup=w - 1)
+    def _ema(b, cols):
+        cols[name] = b.close.ewm(span=w, adjust=False, min_periods=w).mean()
+
+
+for _w in (12, 20, 26, 50):
+    _register_ema(_w)
+
+
+@indicator('macd', deps=('ema_12', 'ema_26'))
+def _macd(b, cols):
+    cols['macd'] = cols['ema_12'] - cols['ema_26']
+
+
+@indicator('macd_signal', deps=('macd',), decay=(8 / 10,))
+def _macd_signal(b, cols):
+    cols['macd_signal'] = cols['macd'].ewm(span=9, adjust=False).mean()
+
+
+@indicator('macd_hist', deps=('macd', 'macd_signal'))
+def _macd_hist(b, cols):
+    cols['macd_hist'] = cols['macd'] - cols['macd_signal']
+
+
+@indicator('rsi_14', window=15, decay=(13 / 14,), warmup=13, sparse=True)
+def _rsi(b, cols):
+    cols['rsi_14'] = RSIIndicator(b.close, window=14, fillna=False).rsi()
+
+
+@indicator('bb_mid', 'bb_upper', 'bb_lower', 'bb_width', deps=('sma_20',), window=20)
+def _bollinger(b, cols):
+    bb_mid = cols['sma_20']
+    std20 = b.close.rolling(20, min_periods=20).std(ddof=0)
+    cols['bb_mid'] = bb_mid
+    cols['bb_upper'] = bb_mid + 2 * std20
+    cols['bb_lower'] = bb_mid - 2 * std20
+    cols['bb_width'] = (cols['bb_upper'] - cols['bb_lower']) / bb_mid.replace(0, np.nan)
+
+
+@indicator('stoch_k_14', 'stoch_d_3', 'stoch_k', 'stoch_d', window=16, warmup=(13, 15, 13, 15), sparse=True)
+def _stochastic(b, cols):
+    if b.jit:
+        k, d = features_jit.stochastic(b.high.to_numpy(float), b.low.to_numpy(float), b.close.to_numpy(float), 14, 3)
+        cols['stoch_k_14'], cols['stoch_d_3'] = b.series(k), b.series(d)
+        cols['stoch_k'] = cols['stoch_k_14']
+        cols['stoch_d'] = cols['stoch_d_3']
+        return
+    lowest_low_14 = b.low.rolling(14, min_periods=14).min()
+    highest_high_14 = b.high.rolling(14, min_periods=14).max()
+    stoch_k = (b.close - lowest_low_14) / (highest_high_14 - lowest_low_14).replace(0, np.nan) * 100.0
+    cols['stoch_k_14'] = stoch_k
+    cols['stoch_d_3'] = stoch_k.rolling(3, min_periods=3).mean()
+    cols['stoch_k'] = cols['stoch_k_14']
+    cols['stoch_d'] = cols['stoch_d_3']
+
+
+@indicator('adx_14', 'plus_di_14', 'minus_di_14', 'di_pos_14', 'di_neg_14', window=28, decay=(13 / 14, 13 / 14))
+def _adx(b, cols):
+    if b.jit:
+        adx, plus, minus = features_jit.adx(b.high.to_numpy(float), b.low.to_numpy(float), b.close.to_numpy(float), 14)
+        cols['adx_14'], cols['plus_di_14'], cols['minus_di_14'] = b.series(adx), b.series(plus), b.series(minus)
+        cols['di_pos_14'] = cols['plus_di_14']
+        cols['di_neg_14'] = cols['minus_di_14']
+        return
     try:
-        adx_ind = ADXIndicator(high=high, low=low, close=close, window=14, fillna=False)
-        out['adx_14'] = adx_ind.adx()
-        out['plus_di_14'] = adx_ind.adx_pos()
-        out['minus_di_14'] = adx_ind.adx_neg()
+        adx_ind = ADXIndicator(high=b.high, low=b.low, close=b.close, window=14, fillna=False)
+        cols['adx_14'] = adx_ind.adx()
+        cols['plus_di_14'] = adx_ind.adx_pos()
+        cols['minus_di_14'] = adx_ind.adx_neg()
     except Exception:
-        out['adx_14'] = np.nan
-        out['plus_di_14'] = np.nan
-        out['minus_di_14'] = np.nan
-    out['di_pos_14'] = out['plus_di_14']
-    out['di_neg_14'] = out['minus_di_14']
+        cols['adx_14'] = b.nan()
+        cols['plus_di_14'] = b.nan()
+        cols['minus_di_14'] = b.nan()
+    cols['di_pos_14'] = cols['plus_di_14']
+    cols['di_neg_14'] = cols['minus_di_14']
+
 
-    # True Range & ATR
+@indicator('tr', window=2)
+def _true_range(b, cols):
     tr_components = pd.concat([
-        high - low,
-        (high - prev_close).abs(),
-        (low - prev_close).abs()
+        b.high - b.low,
+        (b.high - b.prev_close).abs(),
+        (b.low - b.prev_close).abs()
     ], axis=1)
-    out['tr'] = tr_components.max(axis=1)
-    out['atr_14'] = out['tr'].ewm(span=14, adjust=False, min_periods=14).mean()
+    cols['tr'] = tr_components.max(axis=1)
 
-    # Volume features
-    if 'volume' in out.columns:
-        out['vol_sma_20'] = volume.rolling(20, min_periods=20).mean()
-        with np.errstate(divide='ignore', invalid='ignore'):
-            out['volume_spike'] = volume / out['vol_sma_20']
-        out['vol_spike'] = out['volume_spike']
-        direction = np.sign(close - prev_close).replace(0, 0)
-        out['obv'] = (direction * volume).cumsum()
-        tp = (high + low + close) / 3.0
-        mf = tp * volume
-        tp_prev = tp.shift(1)
-        pos_flow = mf.where(tp > tp_prev, 0.0)
-        neg_flow = mf.where(tp < tp_prev, 0.0)
-        pos_sum = pos_flow.rolling(14, min_periods=14).sum()
-        neg_sum = neg_flow.rolling(14, min_periods=14).sum()
+
+@indicator('atr_14', deps=('tr',), window=14, decay=(13 / 15,), warmup=13)
+def _atr(b, cols):
+    cols['atr_14'] = cols['tr'].ewm(span=14, adjust=False, min_periods=14).mean()
+
+
+@indicator('vol_sma_20', window=20, warmup=19)
+def _vol_sma(b, cols):
+    has_volume = 'volume' in b.frame.columns
+    cols['vol_sma_20'] = b.volume.rolling(20, min_periods=20).mean() if has_volume else b.nan()
+
+
+@indicator('volume_spike', 'vol_spike', deps=('vol_sma_20',), sparse=True)
+def _volume_spike(b, cols):
+    if 'volume' in b.frame.columns:
         with np.errstate(divide='ignore', invalid='ignore'):
-            ratio = pos_sum / neg_sum
-            out['mfi_14'] = 100 - (100 / (1 + ratio))
+            cols['volume_spike'] = b.volume / cols['vol_sma_20']
     else:
-        out['vol_sma_20'] = np.nan
-        out['volume_spike'] = np.nan
-        out['vol_spike'] = np.nan
-        out['obv'] = np.nan
-        out['mfi_14'] = np.nan
-
-    # Support / Resistance & breakouts
-    out['support_20'] = close.rolling(20, min_periods=1).min()
-    out['resistance_20'] = close.rolling(20, min_periods=1).max()
-    out['breakout'] = (close > out['resistance_20'].shift(1)).astype(int)
-    out['breakdown'] = (close < out['support_20'].shift(1)).astype(int)
-
-    # Lags & returns
-    out['close_lag_1'] = close.shift(1)
-    out['close_lag_3'] = close.shift(3)
-    out['close_lag_5'] = close.shift(5)
-    out['close_lag_10'] = close.shift(10)
-    out['ret_1'] = close / out['close_lag_1'] - 1.0
-    out['ret_5'] = close / out['close_lag_5'] - 1.0
-    out['lag_1'] = out['close_lag_1']
-    out['lag_3'] = out['close_lag_3']
-    out['lag_5'] = out['close_lag_5']
-    out['lag_10'] = out['close_lag_10']
-
-    # Price action
+        cols['volume_spike'] = b.nan()
+    cols['vol_spike'] = cols['volume_spike']
+
+
+@indicator('obv', window=2, cumulative=True, warmup=1)
+def _obv(b, cols):
+    if 'volume' not in b.frame.columns:
+        cols['obv'] = b.nan()
+        return
+    direction = np.sign(b.close - b.prev_close).replace(0, 0)
+    cols['obv'] = (direction * b.volume).cumsum()
+
+
+@indicator('mfi_14', window=15, warmup=13, sparse=True)
+def _mfi(b, cols):
+    if 'volume' not in b.frame.columns:
+        cols['mfi_14'] = b.nan()
+        return
+    if b.jit:
+        cols['mfi_14'] = b.series(features_jit.mfi(b.high.to_numpy(float), b.low.to_numpy(float),
+                                                   b.close.to_numpy(float), b.volume.to_numpy(float), 14))
+        return
+    tp = (b.high + b.low + b.close) / 3.0
+    mf = tp * b.volume
+    tp_prev = tp.shift(1)
+    pos_flow = mf.where(tp > tp_prev, 0.0)
+    neg_flow = mf.where(tp < tp_prev, 0.0)
+    pos_sum = pos_flow.rolling(14, min_periods=14).sum()
+    neg_sum = neg_flow.rolling(14, min_periods=14).sum()
     with np.errstate(divide='ignore', invalid='ignore'):
-        out['hl_pct'] = (high - low) / open_ * 100.0
-        out['co_pct'] = (close - open_) / open_ * 100.0
-        out['cp_pct'] = (close - prev_close) / prev_close * 100.0
-
-    # Rolling stats
-    out['rolling_std_10'] = close.rolling(10, min_periods=5).std(ddof=0)
-    out['rolling_std_20'] = close.rolling(20, min_periods=10).std(ddof=0)
-    out['rolling_skew_10'] = close.rolling(10, min_periods=10).skew()
-    out['rolling_kurt_10'] = close.rolling(10, min_periods=10).kurt()
-    mu10 = close.rolling(10, min_periods=10).mean()
-    std10 = out['rolling_std_10']
-    out['rolling_zscore_10'] = (close - mu10) / std10.replace(0, np.nan)
-
-    # Candle patterns
-    if all(k in out.columns for k in ['open','close','high','low']):
-        body = (out['close'] - out['open']).abs()
-        rng = (out['high'] - out['low']).replace(0, np.nan)
-        out['doji'] = (body / rng < 0.1).astype(int)
-        prev_open = out['open'].shift(1)
-        prev_cls = out['close'].shift(1)
-        prev_body_low = np.minimum(prev_open, prev_cls)
-        prev_body_high = np.maximum(prev_open, prev_cls)
-        curr_body_low = np.minimum(out['open'], out['close'])
-        curr_body_high = np.maximum(out['open'], out['close'])
-        out['bull_engulf'] = ((out['close'] > out['open']) & (curr_body_low <= prev_body_low) & (curr_body_high >= prev_body_high)).astype(int)
-        out['bear_engulf'] = ((out['close'] < out['open']) & (curr_body_low <= prev_body_low) & (curr_body_high >= prev_body_high)).astype(int)
-    else:
-        out['doji'] = 0
-        out['bull_engulf'] = 0
-        out['bear_engulf'] = 0
+        ratio = pos_sum / neg_sum
+        cols['mfi_14'] = 100 - (100 / (1 + ratio))
+
+
+@indicator('support_20', 'resistance_20', window=20)
+def _support_resistance(b, cols):
+    cols['support_20'] = b.close.rolling(20, min_periods=1).min()
+    cols['resistance_20'] = b.close.rolling(20, min_periods=1).max()
 
+
+@indicator('breakout', deps=('resistance_20',), window=2)
+def _breakout(b, cols):
+    cols['breakout'] = (b.close > cols['resistance_20'].shift(1)).astype(int)
+
+
+@indicator('breakdown', deps=('support_20',), window=2)
+def _breakdown(b, cols):
+    cols['breakdown'] = (b.close < cols['support_20'].shift(1)).astype(int)
+
+
+def _register_lag(k):
+    @indicator(f'close_lag_{k}', window=k + 1, warmup=k)
+    def _close_lag(b, cols):
+        cols[f'close_lag_{k}'] = b.close.shift(k)
+
+
+def _register_lag_alias(k):
+    @indicator(f'lag_{k}', deps=(f'close_lag_{k}',))
+    def _lag(b, cols):
+        cols[f'lag_{k}'] = cols[f'close_lag_{k}']
+
+
+for _k in (1, 3, 5, 10):
+    _register_lag(_k)
+
+
+@indicator('ret_1', deps=('close_lag_1',))
+def _ret_1(b, cols):
+    cols['ret_1'] = b.close / cols['close_lag_1'] - 1.0
+
+
+@indicator('ret_5', deps=('close_lag_5',))
+def _ret_5(b, cols):
+    cols['ret_5'] = b.close / cols['close_lag_5'] - 1.0
+
+
+for _k in (1, 3, 5, 10):
+    _register_lag_alias(_k)
+
+
+@indicator('hl_pct', 'co_pct', 'cp_pct', window=2, warmup=(0, 0, 1))
+def _price_action(b, cols):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cols['hl_pct'] = (b.high - b.low) / b.open_ * 100.0
+        cols['co_pct'] = (b.close - b.open_) / b.open_ * 100.0
+        cols['cp_pct'] = (b.close - b.prev_close) / b.prev_close * 100.0
+
+
+@indicator('rolling_std_10', window=10, warmup=4)
+def _rolling_std_10(b, cols):
+    cols['rolling_std_10'] = b.close.rolling(10, min_periods=5).std(ddof=0)
+
+
+@indicator('rolling_std_20', window=20, warmup=9)
+def _rolling_std_20(b, cols):
+    cols['rolling_std_20'] = b.close.rolling(20, min_periods=10).std(ddof=0)
+
+
+@indicator('rolling_skew_10', window=10, warmup=9)
+def _rolling_skew(b, cols):
+    if b.jit:
+        cols['rolling_skew_10'] = b.series(features_jit.rolling_skew(b.close.to_numpy(float), 10))
+        return
+    cols['rolling_skew_10'] = b.close.rolling(10, min_periods=10).skew()
+
+
+@indicator('rolling_kurt_10', window=10, warmup=9)
+def _rolling_kurt(b, cols):
+    if b.jit:
+        cols['rolling_kurt_10'] = b.series(features_jit.rolling_kurt(b.close.to_numpy(float), 10))
+        return
+    cols['rolling_kurt_10'] = b.close.rolling(10, min_periods=10).kurt()
+
+
+@indicator('rolling_zscore_10', deps=('rolling_std_10',), window=10, warmup=9, sparse=True)
+def _rolling_zscore(b, cols):
+    mu10 = b.close.rolling(10, min_periods=10).mean()
+    cols['rolling_zscore_10'] = (b.close - mu10) / cols['rolling_std_10'].replace(0, np.nan)
+
+
+@indicator('doji', 'bull_engulf', 'bear_engulf', window=2)
+def _candles(b, cols):
+    out = b.frame
+    if not all(k in out.columns for k in ['open','close','high','low']):
+        cols['doji'] = cols['bull_engulf'] = cols['bear_engulf'] = pd.Series(0, index=out.index)
+        return
+    if b.jit:
+        flags = features_jit.candles(b.open_.to_numpy(float), b.high.to_numpy(float), b.low.to_numpy(float),
+                                     b.close.to_numpy(float))
+        cols['doji'], cols['bull_engulf'], cols['bear_engulf'] = (b.series(f) for f in flags)
+        return
+    body = (out['close'] - out['open']).abs()
+    rng = (out['high'] - out['low']).replace(0, np.nan)
+    cols['doji'] = (body / rng < 0.1).astype(int)
+    prev_open = out['open'].shift(1)
+    prev_cls = out['close'].shift(1)
+    prev_body_low = np.minimum(prev_open, prev_cls)
+    prev_body_high = np.maximum(prev_open, prev_cls)
+    curr_body_low = np.minimum(out['open'], out['close'])
+    curr_body_high = np.maximum(out['open'], out['close'])
+    cols['bull_engulf'] = ((out['close'] > out['open']) & (curr_body_low <= prev_body_low) & (curr_body_high >= prev_body_high)).astype(int)
+    cols['bear_engulf'] = ((out['close'] < out['open']) & (curr_body_low <= prev_body_low) & (curr_body_high >= prev_body_high)).astype(int)
+
+
+@indicator('corr_with_index_20', window=21, warmup=10, sparse=True)
+def _corr_with_index(b, cols):
     # Correlation with market index if present
-    if 'market_index' in out.columns:
-        idx_vals = pd.to_numeric(out['market_index'], errors='coerce')
-        r_asset = close.pct_change(1)
-        r_index = idx_vals.pct_change(1)
-        out['corr_with_index_20'] = r_asset.rolling(20, min_periods=10).corr(r_index)
+    if 'market_index' not in b.frame.columns:
+        cols['corr_with_index_20'] = b.nan()
+        return
+    idx_vals = pd.to_numeric(b.frame['market_index'], errors='coerce')
+    r_asset = b.close.pct_change(1).to_numpy(float)
+    r_index = idx_vals.pct_change(1).to_numpy(float)
+    cols['corr_with_index_20'] = b.series(market.rolling_corr_beta(r_asset, r_index, 20, min_periods=10)[0])
+
+
+@indicator('regime_trend', deps=('adx_14',))
+def _regime(b, cols):
+    cols['regime_trend'] = (cols['adx_14'] >= 25).astype(int)
+
+
+assert tuple(c for node in _NODES for c in node.outputs) == INDICATOR_COLUMNS
+
+
+def _compute_numpy(df: pd.DataFrame, dtype, wanted, keep):
+    """engine='numpy': one pass over contiguous arrays, returns (lower-cased frame, {column: array})."""
+    try:
+        from .features_numpy import indicator_arrays
+    except Exception:
+        from features_numpy import indicator_arrays  # type: ignore
+    lower = {c: str(c).lower() for c in df.columns}
+    cols = {lower[c]: c for c in df.columns}
+
+    def arr(name, default=None):
+        if name not in cols:
+            return default
+        return pd.to_numeric(df[cols[name]], errors='coerce').to_numpy(dtype=dtype)
+
+    close = arr('close')
+    arrays = indicator_arrays(
+        arr('open', close), arr('high', close), arr('low', close), close,
+        volume=arr('volume'), market_index=arr('market_index'),
+        candles={'open', 'high', 'low', 'close'} <= set(cols), dtype=dtype,
+        columns=None if wanted is INDICATOR_COLUMNS else set(wanted),
+    )
+    if keep is not INDICATOR_COLUMNS:
+        arrays = {c: arrays[c] for c in keep}
+    return df.rename(columns=lower), arrays
+
+
+def _with_base(frame: pd.DataFrame, arrays: dict, copy: bool = True) -> pd.DataFrame:
+    """Input columns followed by the indicator columns; indicators replace same-named inputs.
+
+    copy=False wraps the arrays as they are instead of consolidating them into one 2-D block.
+    """
+    overlap = [c for c in frame.columns if c in arrays]
+    base = frame.drop(columns=overlap) if overlap else frame
+    return pd.concat([base, pd.DataFrame(arrays, index=frame.index, copy=copy)], axis=1)
+
+
+def _stored(name: str, values: np.ndarray, dtype, compact: bool) -> np.ndarray:
+    if name in INT_INDICATOR_COLUMNS:
+        return values.astype(np.int8, copy=False) if compact else values
+    return values.astype(dtype, copy=False)
+
+
+def indicator_column(frame: pd.DataFrame, name: str) -> pd.Series:
+    """frame[name], resolving legacy alias names (see INDICATOR_ALIASES) on compact frames."""
+    if name not in frame.columns and name in INDICATOR_ALIASES:
+        name = INDICATOR_ALIASES[name]
+    return frame[name]
+
+
+def memory_footprint(frame: pd.DataFrame) -> dict:
+    """Bytes held by a feature frame: total, indicator columns only, and per bar."""
+    usage = frame.memory_usage(index=True, deep=False)
+    indicators = int(usage[[c for c in usage.index if c in INDICATORS]].sum())
+    total = int(usage.sum())
+    return {'bytes': total, 'indicator_bytes': indicators, 'bars': len(frame),
+            'bytes_per_bar': total / len(frame) if len(frame) else 0.0}
+
+
+def _use_jit() -> bool:
+    """features_jit kernels for the loop-heavy indicators: on when Numba is installed, unless INDICATOR_JIT=0."""
+    return features_jit.AVAILABLE and os.environ.get('INDICATOR_JIT', '1').lower() not in ('0', 'false', 'no')
+
+
+def _gap_free(df: pd.DataFrame) -> bool:
+    cols = [c for c in df.columns if str(c).lower() in ('open', 'high', 'low', 'close', 'volume')]
+    if not any(str(c).lower() == 'close' for c in cols):
+        return False
+    vals = df[cols].apply(pd.to_numeric, errors='coerce').to_numpy(dtype=float)
+    return bool(np.isfinite(vals).all())
+
+
+def compute_technical_indicators(df: pd.DataFrame, engine: Optional[str] = None, as_arrays: bool = False,
+                                 dtype=np.float64, columns: Optional[Iterable[str]] = None, compact: bool = False):
+    """Compute full feature set from raw OHLCV data (spec).
+
+    columns: indicator columns to return (default: all of INDICATOR_COLUMNS). Only the indicators
+             they depend on are evaluated, see indicator_dependencies().
+
+    engine: 'pandas' (default, pandas/ta) or 'numpy' (features_numpy; same columns and values
+            within floating-point tolerance, several times faster on long histories). The
+            INDICATOR_ENGINE env var sets the default. Frames with missing OHLCV values always
+            use the pandas engine. With Numba installed, the pandas engine runs its loop-heavy
+            indicators on gap-free frames as features_jit kernels (INDICATOR_JIT=0 turns that off).
+    as_arrays: return {column: ndarray} for the indicator columns instead of a DataFrame.
+    dtype: float dtype of the indicator columns (np.float64 or np.float32). The numpy engine also
+           computes in it; the pandas engine computes in float64 and casts.
+    compact: memory-lean frame for caches and models. Alias columns (INDICATOR_ALIASES) are left
+             out (asking for one returns the column it duplicates), flags are stored as int8, and
+             the indicator arrays are wrapped without copying them into one block.
+    """
+    engine = (engine or os.environ.get('INDICATOR_ENGINE') or 'pandas').lower()
+    if engine not in ENGINES:
+        raise ValueError(f"unknown indicator engine {engine!r}; expected one of {ENGINES}")
+    if columns is None:
+        wanted = keep = INDICATOR_COLUMNS
     else:
-        out['corr_with_index_20'] = np.nan
+        wanted = indicator_dependencies(columns)
+        requested = set(columns)
+        keep = tuple(c for c in INDICATOR_COLUMNS if c in requested)
+    if compact:
+        canonical = {INDICATOR_ALIASES.get(c, c) for c in keep}
+        keep = tuple(c for c in COMPACT_INDICATOR_COLUMNS if c in canonical)
+    if engine == 'numpy' and _gap_free(df):
+        frame, arrays = _compute_numpy(df, dtype, wanted, keep)
+        return _finish(frame, arrays, as_arrays, dtype, compact)
+
+    frame = df.rename(columns={c: c.lower() for c in df.columns})
+    close = pd.to_numeric(frame.get('close'), errors='coerce')
+    bars = _Bars(
+        frame=frame,
+        close=close,
+        open_=pd.to_numeric(frame.get('open', close), errors='coerce'),
+        high=pd.to_numeric(frame.get('high', close), errors='coerce'),
+        low=pd.to_numeric(frame.get('low', close), errors='coerce'),
+        volume=pd.to_numeric(frame.get('volume', pd.Series(0, index=frame.index)), errors='coerce'),
+        prev_close=close.shift(1),
+        jit=_use_jit() and _gap_free(df),
+    )
+    needed = set(wanted)
+    cols = {}
+    for node in _NODES:
+        if node.outputs[0] in needed:
+            node.fn(bars, cols)
+
+    return _finish(frame, {c: cols[c].to_numpy() for c in keep}, as_arrays, dtype, compact)
 
-    # Regime
-    out['regime_trend'] = (out['adx_14'] >= 25).astype(int)
 
-    return out
+def _finish(frame: pd.DataFrame, arrays: dict, as_arrays: bool, dtype, compact: bool):
+    arrays = {c: _stored(c, a, dtype, compact) for c, a in arrays.items()}
+    if as_arrays:
+        return arrays
+    return _with_base(frame, arrays, copy=not compact)
 
 
-def assemble_features(df: pd.DataFrame, include_fundamentals: bool = False, fundamentals: Optional[dict] = None) -> pd.DataFrame:
+def update_technical_indicators(prev: pd.DataFrame, bars: pd.DataFrame, engine: Optional[str] = None,
+                                tolerance: float = 1e-10) -> pd.DataFrame:
+    """Extend a compute_technical_indicators() frame with new bars, recomputing only the tail.
+
+    prev: an earlier compute_technical_indicators() result (any column subset), time-sorted.
+    bars: the new raw bars, with the same input columns. Bars at or before prev's last timestamp
+          replace prev's rows from there on, so a revised last bar can be passed again.
+    Only the last indicator_lookback() bars of prev are recomputed along with the new bars; when that
+    is half the history or more, the tail costs as much as a full pass and everything is recomputed. The
+    result matches a full recomputation to within `tolerance` (relative to the seed error of the
+    exponential indicators); cumulative columns like obv continue from prev's last value. The
+    new rows keep prev's layout (compact or not, float dtype).
+    """
+    if bars is None or bars.empty:
+        return prev
+    computed = [c for c in INDICATOR_COLUMNS if c in prev.columns]
+    base = [c for c in prev.columns if c not in INDICATOR_COLUMNS]
+    layout = {
+        'compact': any(prev[c].dtype == np.int8 for c in computed if c in INT_INDICATOR_COLUMNS),
+        'dtype': next((prev[c].dtype for c in computed if c not in INT_INDICATOR_COLUMNS), np.float64),
+    }
+    bars = bars.rename(columns={c: c.lower() for c in bars.columns})
+    kept = prev.loc[prev.index < bars.index[0]]
+    raw = pd.concat([kept[base], bars.reindex(columns=base)])
+    columns = None if len(computed) == len(INDICATOR_COLUMNS) else computed
+    lookback = indicator_lookback(computed, tolerance)
+    # a tail pass has a fixed cost of its own; on short histories the full pass is as cheap
+    if len(kept) <= lookback or 2 * lookback >= len(raw):
+        return compute_technical_indicators(raw, engine=engine, columns=columns, **layout)
+
+    start = len(kept) - lookback
+    tail = compute_technical_indicators(raw.iloc[start:], engine=engine, columns=columns, **layout)
+    new = tail.iloc[lookback:].copy()
+    for name in computed:
+        if INDICATORS[name].cumulative:
+            # the tail's running total restarts at its first bar; re-base it on prev's total
+            anchor = tail[name].iloc[lookback - 1]
+            new[name] += kept[name].iloc[-1] - (0.0 if pd.isna(anchor) else anchor)
+    return pd.concat([kept, new])
+
+
+def assemble_features(df: pd.DataFrame, include_fundamentals: bool = False, fundamentals: Optional[dict] = None,
+                      indicators: Optional[pd.DataFrame] = None, compact: bool = False) -> pd.DataFrame:
     """Return feature matrix.
 
     include_fundamentals: if True and fundamentals dict provided, append f_eps,f_pe,f_peg,f_pb.
     fundamentals: optional dict. For backward compatibility, if a dict is passed as second argument
                   (older signature assemble_features(df, fundamentals)), treat it as fundamentals.
+                  Benchmark index closes in it add the market-relative columns, see market.py.
+    indicators: compute_technical_indicators(df) when the caller already has it (it is not modified).
+    compact: build on compute_technical_indicators(df, compact=True) and skip the row filtering
+             below (and its copies): every bar is returned, and callers select complete rows with
+             valid_rows(), whose warm-up is known up front (feature_warmup()).
     """
     # Backwards compatibility: if include_fundamentals is actually a dict
     if isinstance(include_fundamentals, dict) and fundamentals is None:
         fundamentals = include_fundamentals
         include_fundamentals = True
-    feats = compute_technical_indicators(df)
+    if indicators is None:
+        feats = compute_technical_indicators(df, compact=compact)
+    else:
+        feats = indicators.copy(deep=False)
     if include_fundamentals and fundamentals:
         for k in ['eps', 'pe', 'peg', 'pb']:
             val = fundamentals.get(k)
             feats[f'f_{k}'] = float(val) if val is not None else np.nan
-    # Optional market index passed inside fundamentals as 'market_index' Series
-    if fundamentals and isinstance(fundamentals.get('market_index'), pd.Series):
-        feats['market_index'] = fundamentals['market_index'].reindex(feats.index).astype(float)
+    # Market-relative stage: benchmark closes passed in fundamentals as a market.MarketIndices under
+    # 'market_indices', or as a bare 'market_index'/'market_close' Series
+    bench = market.MarketIndices.from_fundamentals(fundamentals)
+    if bench is not None and 'close' in feats.columns:
+        feats = market.add_market_features(feats, bench)
     
     # Drop rows with insufficient data, but be less aggressive about NaNs
     # Only require basic OHLCV data and some key indicators to be present
     required_cols = ['open', 'high', 'low', 'close']
     available_required = [col for col in required_cols if col in feats.columns]
-    
+
+    if compact:
+        return feats
+
     if available_required:
         # Drop rows where basic OHLCV data is missing
         feats = feats.dropna(subset=available_required).copy()
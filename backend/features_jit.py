@@ -0,0 +1,201 @@
+"""Single-pass loop kernels for the loop-heavy indicators of the pandas engine.
+
+Rolling skew/kurtosis, the stochastic min/max, ADX/DI Wilder smoothing, MFI
+flow sums and the candle patterns each take several pandas passes and
+temporaries. Here each one is a single plain loop over contiguous float64
+arrays, compiled with Numba when it is installed (optional: `pip install
+numba`). Without Numba, AVAILABLE is False and features.py keeps its pandas
+implementations, so the loops never run interpreted in production.
+
+The kernels assume gap-free input (no NaN in OHLCV); features.py only routes
+such frames here, as it does for the NumPy engine. They reproduce
+compute_technical_indicators to floating-point tolerance, including its
+edge cases: flat windows, zero ranges, and ta's all-NaN ADX below 2 * 14 bars.
+"""
+import math
+
+import numpy as np
+
+try:
+    from numba import njit
+except ImportError:  # optional dependency
+    njit = None
+
+AVAILABLE = njit is not None
+
+
+def _jit(fn):
+    return njit(cache=True, nogil=True)(fn) if AVAILABLE else fn
+
+
+@_jit
+def rolling_skew(x, w):
+    """Series.rolling(w).skew(): bias-corrected sample skewness of each full window."""
+    n = len(x)
+    out = np.full(n, np.nan)
+    for i in range(w - 1, n):
+        mean = 0.0
+        for j in range(i - w + 1, i + 1):
+            mean += x[j]
+        mean /= w
+        m2 = 0.0
+        m3 = 0.0
+        for j in range(i - w + 1, i + 1):
+            d = x[j] - mean
+            m2 += d * d
+            m3 += d * d * d
+        m2 /= w
+        m3 /= w
+        if m2 == 0.0:
+            out[i] = 0.0
+        else:
+            out[i] = math.sqrt(w * (w - 1.0)) * m3 / ((w - 2.0) * m2 ** 1.5)
+    return out
+
+
+@_jit
+def rolling_kurt(x, w):
+    """Series.rolling(w).kurt(): bias-corrected excess kurtosis of each full window."""
+    n = len(x)
+    out = np.full(n, np.nan)
+    for i in range(w - 1, n):
+        mean = 0.0
+        for j in range(i - w + 1, i + 1):
+            mean += x[j]
+        mean /= w
+        m2 = 0.0
+        m4 = 0.0
+        for j in range(i - w + 1, i + 1):
+            d2 = (x[j] - mean) * (x[j] - mean)
+            m2 += d2
+            m4 += d2 * d2
+        m2 /= w
+        m4 /= w
+        if m2 == 0.0:
+            out[i] = -3.0
+        else:
+            out[i] = ((w * w - 1.0) * m4 / (m2 * m2) - 3.0 * (w - 1.0) ** 2) / ((w - 2.0) * (w - 3.0))
+    return out
+
+
+@_jit
+def stochastic(high, low, close, w, d):
+    """(%K over w bars, its d-bar mean); NaN where the high-low range is zero."""
+    n = len(close)
+    k = np.full(n, np.nan)
+    sd = np.full(n, np.nan)
+    for i in range(w - 1, n):
+        lo = low[i]
+        hi = high[i]
+        for j in range(i - w + 1, i):
+            lo = min(lo, low[j])
+            hi = max(hi, high[j])
+        if hi != lo:
+            k[i] = (close[i] - lo) / (hi - lo) * 100.0
+        if i >= w + d - 2:
+            s = 0.0
+            for j in range(i - d + 1, i + 1):
+                s += k[j]
+            sd[i] = s / d
+    return k, sd
+
+
+@_jit
+def adx(high, low, close, w):
+    """ta.trend.ADXIndicator(fillna=False): (adx, +DI, -DI), all NaN below 2 * w bars."""
+    n = len(close)
+    if n < 2 * w:
+        return np.full(n, np.nan), np.full(n, np.nan), np.full(n, np.nan)
+    out = np.zeros(n)
+    plus = np.zeros(n)
+    minus = np.zeros(n)
+    trs = 0.0
+    dip = 0.0
+    din = 0.0
+    dx_sum = 0.0
+    value = 0.0
+    decay = 1.0 - 1.0 / w
+    for i in range(1, n):
+        tr = max(high[i], close[i - 1]) - min(low[i], close[i - 1])
+        up = high[i] - high[i - 1]
+        down = low[i - 1] - low[i]
+        pos = up if up > down and up > 0 else 0.0
+        neg = down if down > up and down > 0 else 0.0
+        # Seed with the plain sum of bars 1..w, then Wilder-smooth
+        if i <= w:
+            trs += tr
+            dip += pos
+            din += neg
+            if i < w:
+                continue
+        else:
+            trs = trs * decay + tr
+            dip = dip * decay + pos
+            din = din * decay + neg
+        di_pos = 100.0 * dip / trs if trs != 0 else 0.0
+        di_neg = 100.0 * din / trs if trs != 0 else 0.0
+        dx = 100.0 * abs((di_pos - di_neg) / (di_pos + di_neg)) if di_pos + di_neg != 0 else 0.0
+        if i > w:  # ta leaves the seed bar at 0
+            plus[i] = di_pos
+            minus[i] = di_neg
+        if i < 2 * w:
+            dx_sum += dx
+            if i == 2 * w - 1:
+                value = dx_sum / w
+                out[i] = value
+        else:
+            value = (value * (w - 1) + dx) / w
+            out[i] = value
+    return out, plus, minus
+
+
+@_jit
+def mfi(high, low, close, volume, w):
+    """Money flow index over w bars of typical-price flows."""
+    n = len(close)
+    out = np.full(n, np.nan)
+    pos = np.zeros(n)
+    neg = np.zeros(n)
+    tp_prev = np.nan
+    for i in range(n):
+        tp = (high[i] + low[i] + close[i]) / 3.0
+        if tp > tp_prev:
+            pos[i] = tp * volume[i]
+        elif tp < tp_prev:
+            neg[i] = tp * volume[i]
+        tp_prev = tp
+        if i >= w - 1:
+            p = 0.0
+            q = 0.0
+            for j in range(i - w + 1, i + 1):
+                p += pos[j]
+                q += neg[j]
+            if q != 0.0:
+                out[i] = 100.0 - 100.0 / (1.0 + p / q)
+            elif p != 0.0:
+                out[i] = 100.0
+    return out
+
+
+@_jit
+def candles(open_, high, low, close):
+    """(doji, bull_engulf, bear_engulf) as 0/1 int64 flags."""
+    n = len(close)
+    doji = np.zeros(n, dtype=np.int64)
+    bull = np.zeros(n, dtype=np.int64)
+    bear = np.zeros(n, dtype=np.int64)
+    for i in range(n):
+        rng = high[i] - low[i]
+        if rng != 0 and abs(close[i] - open_[i]) / rng < 0.1:
+            doji[i] = 1
+        if i == 0:
+            continue
+        body_low = min(open_[i], close[i])
+        body_high = max(open_[i], close[i])
+        engulfs = (body_low <= min(open_[i - 1], close[i - 1])
+                   and body_high >= max(open_[i - 1], close[i - 1]))
+        if engulfs and close[i] > open_[i]:
+            bull[i] = 1
+        elif engulfs and close[i] < open_[i]:
+            bear[i] = 1
+    return doji, bull, bear
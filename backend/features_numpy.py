@@ -0,0 +1,311 @@
+"""NumPy engine for compute_technical_indicators (engine='numpy').
+
+Works on contiguous float64 or float32 arrays end to end. Rolling windows use
+sliding_window_view reductions, and the EMA/Wilder recursions run through
+scipy.signal.lfilter. Nothing touches pandas until the optional single
+DataFrame is assembled at the end. Outputs match the pandas/ta engine to
+floating-point tolerance on gap-free input; features.compute_technical_indicators
+sends frames with missing OHLCV values to the pandas engine, whose rolling
+windows skip NaNs.
+"""
+from typing import Optional
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from scipy.signal import lfilter
+
+try:
+    from .market import rolling_corr_beta
+except Exception:
+    from market import rolling_corr_beta  # type: ignore
+
+
+def _alpha(span=None, alpha=None) -> float:
+    # pandas derives alpha via the center of mass; do the same so recursions agree
+    com = (span - 1) / 2.0 if span is not None else 1.0 / alpha - 1.0
+    return 1.0 / (1.0 + com)
+
+
+def _full(n, dtype, value=np.nan):
+    return np.full(n, value, dtype=dtype)
+
+
+def ewm(x: np.ndarray, span=None, alpha=None, min_periods: int = 0) -> np.ndarray:
+    """ewm(adjust=False).mean() of a gap-free series as a first-order IIR filter."""
+    a = _alpha(span, alpha)
+    if len(x) == 0:
+        return x.copy()
+    b_, a_ = np.array([a], dtype=x.dtype), np.array([1.0, a - 1.0], dtype=x.dtype)
+    y = lfilter(b_, a_, x, axis=0, zi=((1.0 - a) * x[:1]).astype(x.dtype))[0].astype(x.dtype, copy=False)
+    if min_periods > 1:
+        y[:min_periods - 1] = np.nan
+    return y
+
+
+def _smooth(x: np.ndarray, seed: float, decay: float, gain: float = 1.0) -> np.ndarray:
+    """y[i] = decay * y[i-1] + gain * x[i] with y[-1] = seed."""
+    if len(x) == 0:
+        return x.copy()
+    b_, a_ = np.array([gain], dtype=x.dtype), np.array([1.0, -decay], dtype=x.dtype)
+    zi = np.reshape(decay * np.asarray(seed, dtype=x.dtype), (1,) + x.shape[1:])
+    return lfilter(b_, a_, x, axis=0, zi=zi)[0].astype(x.dtype, copy=False)
+
+
+def rolling(x: np.ndarray, window: int, reducer, min_periods: int = None, nan_reducer=None) -> np.ndarray:
+    """Apply reducer(windows, axis=-1) over full windows, and nan_reducer to the partial head when
+    min_periods < window. Full-window reducers propagate NaN, which matches pandas when
+    min_periods == window. Windows run along axis 0, so x may be (time,) or (time, ticker)."""
+    n = len(x)
+    min_periods = window if min_periods is None else min_periods
+    out = _full(x.shape, x.dtype)
+    if n >= window:
+        out[window - 1:] = reducer(sliding_window_view(x, window, axis=0), axis=-1)
+    if min_periods < window and n:
+        k = min(window - 1, n)
+        padded = np.concatenate([_full((window - 1,) + x.shape[1:], x.dtype), x[:k]])
+        with np.errstate(invalid='ignore', divide='ignore'):
+            vals = nan_reducer(sliding_window_view(padded, window, axis=0), axis=-1)
+        counts = np.arange(1, k + 1).reshape((k,) + (1,) * (x.ndim - 1))
+        out[:k] = np.where(counts >= min_periods, vals, np.nan)
+    return out
+
+
+def _nanvar0(w, axis):
+    counts = np.sum(~np.isnan(w), axis=axis)
+    mean = np.nansum(w, axis=axis) / counts
+    return np.nansum((w - np.expand_dims(mean, axis)) ** 2, axis=axis) / counts
+
+
+def rolling_std0(x: np.ndarray, window: int, min_periods: int = None) -> np.ndarray:
+    """Population std (ddof=0); exactly 0 on constant windows, as pandas reports them."""
+    var = rolling(x, window, np.var, min_periods, _nanvar0)
+    flat = rolling(x, window, np.ptp, min_periods, lambda w, axis: np.nanmax(w, axis) - np.nanmin(w, axis)) == 0
+    var[flat] = 0.0
+    return np.sqrt(var)
+
+
+def shift(x: np.ndarray, k: int) -> np.ndarray:
+    out = _full(x.shape, x.dtype)
+    if k < len(x):
+        out[k:] = x[:len(x) - k]
+    return out
+
+
+def _skew_kurt(x: np.ndarray, window: int = 10):
+    n = len(x)
+    skew, kurt = _full(x.shape, x.dtype), _full(x.shape, x.dtype)
+    if n < window:
+        return skew, kurt
+    win = sliding_window_view(x, window, axis=0)
+    d = win - win.mean(axis=-1, keepdims=True)
+    d2 = d * d
+    m2, m3, m4 = d2.mean(axis=-1), (d2 * d).mean(axis=-1), (d2 * d2).mean(axis=-1)
+    w = window
+    with np.errstate(invalid='ignore', divide='ignore'):
+        s = np.sqrt(w * (w - 1)) * m3 / ((w - 2) * m2 ** 1.5)
+        k = ((w * w - 1) * m4 / (m2 * m2) - 3 * (w - 1) ** 2) / ((w - 2) * (w - 3))
+    flat = np.ptp(win, axis=-1) == 0
+    s[flat], k[flat] = 0.0, -3.0
+    skew[w - 1:], kurt[w - 1:] = s, k
+    return skew, kurt
+
+
+def _adx(high, low, close, w: int = 14):
+    """ta.trend.ADXIndicator (fillna=False): (adx, +DI, -DI), NaN throughout below 2*w bars like ta."""
+    n = len(close)
+    dtype = close.dtype
+    if n < 2 * w:
+        return _full(close.shape, dtype), _full(close.shape, dtype), _full(close.shape, dtype)
+    tr = np.maximum(high[1:], close[:-1]) - np.minimum(low[1:], close[:-1])  # bars 1..n-1
+    up, down = high[1:] - high[:-1], low[:-1] - low[1:]
+    pos = np.where((up > down) & (up > 0), up, 0.0).astype(dtype)
+    neg = np.where((down > up) & (down > 0), down, 0.0).astype(dtype)
+    decay = 1.0 - 1.0 / w
+    # Seed with the plain sum of bars 1..w, then Wilder-smooth bars w+1..n-1
+    def wilder(x):
+        seed = x[:w].sum(axis=0, keepdims=True)
+        return np.concatenate([seed, _smooth(x[w:], seed[0], decay)])
+
+    trs, dip, din = wilder(tr), wilder(pos), wilder(neg)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        di_pos = np.where(trs != 0, 100 * (dip / trs), 0.0)
+        di_neg = np.where(trs != 0, 100 * (din / trs), 0.0)
+        dx = np.where(di_pos + di_neg != 0, 100 * np.abs((di_pos - di_neg) / (di_pos + di_neg)), 0.0)
+    adx = np.zeros(close.shape, dtype=dtype)
+    seed = dx[:w].mean(axis=0)
+    adx[2 * w - 1] = seed
+    adx[2 * w:] = _smooth(dx[w:], seed, (w - 1) / w, 1.0 / w)
+    plus, minus = np.zeros(close.shape, dtype=dtype), np.zeros(close.shape, dtype=dtype)
+    plus[w + 1:], minus[w + 1:] = di_pos[1:], di_neg[1:]  # ta leaves the seed bar at 0
+    return adx, plus, minus
+
+
+def _rolling_corr(x: np.ndarray, y: np.ndarray, window: int = 20, min_periods: int = 10) -> np.ndarray:
+    """rolling(window, min_periods).corr() over pairwise-complete observations, from running sums."""
+    return rolling_corr_beta(x, y, window, min_periods)[0].astype(x.dtype, copy=False)
+
+
+def indicator_arrays(open_, high, low, close, volume=None, market_index=None, candles: bool = True,
+                     dtype=np.float64, columns: Optional[set] = None) -> dict:
+    """All compute_technical_indicators columns as arrays, keyed and ordered like the pandas engine.
+
+    volume / market_index may be None (the frame has no such column); candles=False mirrors a frame
+    missing any of open/high/low. Flag columns come back as int64. columns, a dependency-closed set
+    (features.indicator_dependencies), restricts the result to those columns and skips the rest.
+    """
+    c = np.ascontiguousarray(close, dtype=dtype)
+    o = np.ascontiguousarray(open_, dtype=dtype)
+    h = np.ascontiguousarray(high, dtype=dtype)
+    lo = np.ascontiguousarray(low, dtype=dtype)
+    n = len(c)
+    nan = _full(c.shape, dtype)
+    pc = shift(c, 1)
+    r = {}
+
+    def need(*names):
+        return columns is None or not columns.isdisjoint(names)
+
+    mean = lambda w: rolling(c, w, np.mean)  # noqa: E731
+    for w in (5, 10, 20, 50):
+        if need(f'sma_{w}'):
+            r[f'sma_{w}'] = mean(w)
+    for w in (12, 20, 26, 50):
+        if need(f'ema_{w}'):
+            r[f'ema_{w}'] = ewm(c, span=w, min_periods=w)
+    if need('macd'):
+        macd = r['ema_12'] - r['ema_26']
+        signal = nan.copy()
+        if n > 25:
+            signal[25:] = ewm(macd[25:], span=9)
+        r['macd'], r['macd_signal'], r['macd_hist'] = macd, signal, macd - signal
+
+    if need('rsi_14'):
+        r['rsi_14'] = _rsi(c, dtype)
+    if need('bb_mid'):
+        std20 = rolling_std0(c, 20)
+        mid = r['sma_20']
+        r['bb_mid'], r['bb_upper'], r['bb_lower'] = mid, mid + 2 * std20, mid - 2 * std20
+        with np.errstate(invalid='ignore', divide='ignore'):
+            r['bb_width'] = (r['bb_upper'] - r['bb_lower']) / np.where(mid == 0, np.nan, mid)
+    if need('stoch_k_14'):
+        ll, hh = rolling(lo, 14, np.min), rolling(h, 14, np.max)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            k = (c - ll) / np.where(hh - ll == 0, np.nan, hh - ll) * 100.0
+        d = rolling(k, 3, np.mean)
+        r['stoch_k_14'], r['stoch_d_3'], r['stoch_k'], r['stoch_d'] = k, d, k, d
+    if need('adx_14'):
+        adx, plus, minus = _adx(h, lo, c)
+        r['adx_14'], r['plus_di_14'], r['minus_di_14'] = adx, plus, minus
+        r['di_pos_14'], r['di_neg_14'] = plus, minus
+    if need('tr'):
+        tr = np.fmax(np.fmax(h - lo, np.abs(h - pc)), np.abs(lo - pc))
+        r['tr'] = tr
+        if need('atr_14'):
+            r['atr_14'] = ewm(tr, span=14, min_periods=14)
+
+    if need('vol_sma_20', 'obv', 'mfi_14'):
+        _volume_arrays(r, need, volume, h, lo, c, nan, dtype)
+    if need('support_20'):
+        support = rolling(c, 20, np.min, 1, np.nanmin)
+        resistance = rolling(c, 20, np.max, 1, np.nanmax)
+        r['support_20'], r['resistance_20'] = support, resistance
+        r['breakout'] = (c > shift(resistance, 1)).astype(np.int64)
+        r['breakdown'] = (c < shift(support, 1)).astype(np.int64)
+
+    lags = {k_: shift(c, k_) for k_ in (1, 3, 5, 10) if need(f'close_lag_{k_}')}
+    for k_, lag in lags.items():
+        r[f'close_lag_{k_}'] = lag
+    with np.errstate(invalid='ignore', divide='ignore'):
+        if need('ret_1'):
+            r['ret_1'] = c / lags[1] - 1.0
+        if need('ret_5'):
+            r['ret_5'] = c / lags[5] - 1.0
+    for k_, lag in lags.items():
+        if need(f'lag_{k_}'):
+            r[f'lag_{k_}'] = lag
+    if need('hl_pct'):
+        with np.errstate(invalid='ignore', divide='ignore'):
+            r['hl_pct'] = (h - lo) / o * 100.0
+            r['co_pct'] = (c - o) / o * 100.0
+            r['cp_pct'] = (c - pc) / pc * 100.0
+
+    if need('rolling_std_10'):
+        r['rolling_std_10'] = rolling_std0(c, 10, 5)
+    if need('rolling_std_20'):
+        r['rolling_std_20'] = rolling_std0(c, 20, 10)
+    if need('rolling_skew_10', 'rolling_kurt_10'):
+        skew, kurt = _skew_kurt(c, 10)
+        for name, arr in (('rolling_skew_10', skew), ('rolling_kurt_10', kurt)):
+            if need(name):
+                r[name] = arr
+    if need('rolling_zscore_10'):
+        std10 = r['rolling_std_10']
+        mu10 = r['sma_10'] if 'sma_10' in r else mean(10)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            r['rolling_zscore_10'] = (c - mu10) / np.where(std10 == 0, np.nan, std10)
+
+    if need('doji'):
+        if candles:
+            body = np.abs(c - o)
+            rng = h - lo
+            with np.errstate(invalid='ignore', divide='ignore'):
+                r['doji'] = (body / np.where(rng == 0, np.nan, rng) < 0.1).astype(np.int64)
+            po, pcl = shift(o, 1), pc
+            engulf = (np.minimum(o, c) <= np.minimum(po, pcl)) & (np.maximum(o, c) >= np.maximum(po, pcl))
+            r['bull_engulf'] = ((c > o) & engulf).astype(np.int64)
+            r['bear_engulf'] = ((c < o) & engulf).astype(np.int64)
+        else:
+            r['doji'] = r['bull_engulf'] = r['bear_engulf'] = np.zeros(c.shape, dtype=np.int64)
+
+    if need('corr_with_index_20'):
+        if market_index is not None:
+            mi = np.ascontiguousarray(market_index, dtype=dtype)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                r['corr_with_index_20'] = _rolling_corr(c / pc - 1.0, mi / shift(mi, 1) - 1.0)
+        else:
+            r['corr_with_index_20'] = nan.copy()
+
+    if need('regime_trend'):
+        r['regime_trend'] = (r['adx_14'] >= 25).astype(np.int64)
+    for name, arr in r.items():
+        if arr.dtype != np.int64 and arr.dtype != dtype:
+            r[name] = arr.astype(dtype)
+    if columns is not None:
+        r = {name: r[name] for name in r if name in columns}
+    return r
+
+
+def _rsi(c, dtype):
+    diff = np.concatenate([np.zeros((min(len(c), 1),) + c.shape[1:], dtype=dtype), np.diff(c, axis=0)])
+    up = ewm(np.where(diff > 0, diff, 0.0).astype(dtype), alpha=1 / 14, min_periods=14)
+    dn = ewm(np.where(diff < 0, -diff, 0.0).astype(dtype), alpha=1 / 14, min_periods=14)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(dn == 0, 100.0, 100 - (100 / (1 + up / dn))).astype(dtype)
+
+
+def _volume_arrays(r, need, volume, h, lo, c, nan, dtype):
+    """vol_sma_20, volume_spike/vol_spike, obv and mfi_14 into r (NaN without a volume column)."""
+    if volume is None:
+        for name in ('vol_sma_20', 'volume_spike', 'vol_spike', 'obv', 'mfi_14'):
+            if need(name):
+                r[name] = nan.copy()
+        return
+    v = np.ascontiguousarray(volume, dtype=dtype)
+    if need('vol_sma_20'):
+        vs = rolling(v, 20, np.mean)
+        r['vol_sma_20'] = vs
+        if need('volume_spike'):
+            with np.errstate(invalid='ignore', divide='ignore'):
+                r['volume_spike'] = r['vol_spike'] = v / vs
+    if need('obv'):
+        obv = nan.copy()
+        obv[1:] = np.cumsum(np.sign(c[1:] - c[:-1]) * v[1:], axis=0)
+        r['obv'] = obv
+    if need('mfi_14'):
+        tp = (h + lo + c) / 3.0
+        mf = tp * v
+        tp_prev = shift(tp, 1)
+        pos_sum = rolling(np.where(tp > tp_prev, mf, 0.0).astype(dtype), 14, np.sum)
+        neg_sum = rolling(np.where(tp < tp_prev, mf, 0.0).astype(dtype), 14, np.sum)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            r['mfi_14'] = 100 - (100 / (1 + pos_sum / neg_sum))
@@ -0,0 +1,152 @@
+import os
+import logging
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Optional
+
+import pandas as pd
+
+LOG = logging.getLogger(__name__)
+
+OHLCV_COLUMNS = ['open', 'high', 'low', 'close', 'volume']
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS bars (
+    symbol TEXT NOT NULL,
+    frequency TEXT NOT NULL,
+    date TEXT NOT NULL,
+    open REAL,
+    high REAL,
+    low REAL,
+    close REAL,
+    volume REAL,
+    PRIMARY KEY (symbol, frequency, date)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS coverage (
+    symbol TEXT NOT NULL,
+    frequency TEXT NOT NULL,
+    full INTEGER NOT NULL,
+    PRIMARY KEY (symbol, frequency)
+) WITHOUT ROWID
+"""
+
+
+class HistoryStore:
+    """SQLite-backed OHLCV store keyed by (symbol, frequency, date).
+
+    One database file holds every ticker/frequency. WAL mode lets several
+    gunicorn workers read while one of them writes a top-up.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(str(self.path), timeout=30)
+
+    def load(self, symbol: str, frequency: str) -> pd.DataFrame:
+        """Return stored bars sorted by date (empty frame when nothing is stored)."""
+        with self._connect() as conn:
+            df = pd.read_sql_query(
+                'SELECT date, open, high, low, close, volume FROM bars '
+                'WHERE symbol = ? AND frequency = ? ORDER BY date',
+                conn,
+                params=(symbol, frequency),
+            )
+        if df.empty:
+            return pd.DataFrame()
+        df['date'] = pd.to_datetime(df['date'])
+        df = df.set_index('date')
+        # Columns the provider never returned are stored as NULL; drop them again
+        return df.dropna(axis=1, how='all')
+
+    def is_full(self, symbol: str, frequency: str) -> bool:
+        """True once a full series (not just a compact window) has been saved for symbol/frequency."""
+        with self._connect() as conn:
+            row = conn.execute('SELECT full FROM coverage WHERE symbol = ? AND frequency = ?',
+                               (symbol, frequency)).fetchone()
+        return bool(row and row[0])
+
+    def save(self, symbol: str, frequency: str, df: pd.DataFrame, full: bool = False) -> int:
+        """Upsert bars from df (DatetimeIndex, OHLCV columns). Returns rows written.
+
+        full=True records that df is the provider's whole series, so later fetches may top it up.
+        """
+        if df is None or df.empty:
+            return 0
+        cols = [c for c in OHLCV_COLUMNS if c in df.columns]
+        frame = df[cols].reindex(columns=OHLCV_COLUMNS)
+        frame = frame.astype(object).where(frame.notna(), None)
+        dates = pd.DatetimeIndex(df.index).strftime('%Y-%m-%d')
+        rows = [
+            (symbol, frequency, d, *vals)
+            for d, vals in zip(dates, frame.itertuples(index=False, name=None))
+        ]
+        with self._connect() as conn:
+            conn.executemany(
+                'INSERT OR REPLACE INTO bars (symbol, frequency, date, open, high, low, close, volume) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                rows,
+            )
+            if full:
+                conn.execute('INSERT OR REPLACE INTO coverage (symbol, frequency, full) VALUES (?, ?, 1)',
+                             (symbol, frequency))
+        return len(rows)
+
+    def clear(self, symbol: Optional[str] = None, frequency: Optional[str] = None) -> None:
+        """Delete stored bars, optionally restricted to one symbol/frequency."""
+        sql, params = 'DELETE FROM bars', []
+        clauses = []
+        if symbol is not None:
+            clauses.append('symbol = ?')
+            params.append(symbol)
+        if frequency is not None:
+            clauses.append('frequency = ?')
+            params.append(frequency)
+        if clauses:
+            sql += ' WHERE ' + ' AND '.join(clauses)
+        with self._connect() as conn:
+            conn.execute(sql, params)
+            conn.execute(sql.replace('DELETE FROM bars', 'DELETE FROM coverage'), params)
+
+
+def merge_history(cached: pd.DataFrame, delta: pd.DataFrame) -> pd.DataFrame:
+    """Splice a newer delta onto cached bars; delta wins on overlapping dates."""
+    if cached is None or cached.empty:
+        return delta
+    if delta is None or delta.empty:
+        return cached
+    head = cached.loc[cached.index < delta.index[0]]
+    out = pd.concat([head, delta])
+    out.index.name = 'date'
+    return out
+
+
+_STORE: Optional[HistoryStore] = None
+_STORE_LOCK = threading.Lock()
+
+
+def get_history_store() -> Optional[HistoryStore]:
+    """Return the process-wide store, or None when disabled via HISTORY_CACHE=0.
+
+    Location defaults to backend/.cache/history.sqlite and can be moved with
+    HISTORY_CACHE_DIR.
+    """
+    global _STORE
+    if os.environ.get('HISTORY_CACHE', '1').lower() in ('0', 'false', 'no', 'off'):
+        return None
+    cache_dir = Path(os.environ.get('HISTORY_CACHE_DIR') or Path(__file__).with_name('.cache'))
+    path = cache_dir / 'history.sqlite'
+    with _STORE_LOCK:
+        if _STORE is None or _STORE.path != path:
+            try:
+                _STORE = HistoryStore(path)
+            except Exception:
+                LOG.exception('history store unavailable at %s', path)
+                return None
+        return _STORE
@@ -0,0 +1,204 @@
+"""Offline data provider (DATA_PROVIDER=local) for reproducible benchmarks and load tests.
+
+Serves history, OVERVIEW and GLOBAL_QUOTE from a directory instead of the
+network. For a symbol such as TCS.BSE it looks for, in order:
+
+    TCS.BSE_daily.parquet | TCS.BSE_daily.csv      plain OHLCV (date,open,high,low,close,volume)
+    TCS.BSE_TIME_SERIES_DAILY.json | .csv          recorded Alpha Vantage responses (AV_RECORD_DIR)
+    TCS.BSE_OVERVIEW.json, TCS.BSE_GLOBAL_QUOTE.json
+
+Weekly/monthly series fall back to resampling the daily file, and a missing
+GLOBAL_QUOTE is synthesized from the last two daily bars. Latency and errors
+can be injected per call to mimic a real provider.
+"""
+import json
+import logging
+import random
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Optional
+
+import numpy as np
+import pandas as pd
+
+LOG = logging.getLogger(__name__)
+
+_AV_FUNCTIONS = {
+    'daily': 'TIME_SERIES_DAILY',
+    'weekly': 'TIME_SERIES_WEEKLY',
+    'monthly': 'TIME_SERIES_MONTHLY',
+}
+
+
+class InjectedProviderError(RuntimeError):
+    """Failure raised on purpose by LocalProvider (see error_rate)."""
+
+
+class LocalProvider:
+    def __init__(
+        self,
+        root,
+        latency_ms: float = 0.0,
+        jitter_ms: float = 0.0,
+        error_rate: float = 0.0,
+        seed: Optional[int] = None,
+        series_parser: Optional[Callable] = None,
+        normalize: Optional[Callable[[pd.DataFrame], pd.DataFrame]] = None,
+    ):
+        self.root = Path(root)
+        self.latency_ms = float(latency_ms or 0.0)
+        self.jitter_ms = float(jitter_ms or 0.0)
+        self.error_rate = float(error_rate or 0.0)
+        self._series_parser = series_parser
+        self._normalize = normalize or (lambda df: df)
+        self._rng = random.Random(seed)
+        self._rng_lock = threading.Lock()
+        self._index: dict = {}
+        self.calls = 0
+
+    # --- simulation -------------------------------------------------------
+
+    def _simulate(self, what: str) -> None:
+        with self._rng_lock:
+            self.calls += 1
+            delay = self.latency_ms + (self._rng.uniform(0, self.jitter_ms) if self.jitter_ms else 0.0)
+            fail = self.error_rate > 0 and self._rng.random() < self.error_rate
+        if delay > 0:
+            time.sleep(delay / 1000.0)
+        if fail:
+            raise InjectedProviderError(f'injected provider error ({what})')
+
+    # --- file lookup ------------------------------------------------------
+
+    def _find(self, *stems: str) -> Optional[Path]:
+        """Case-insensitive lookup of the first existing <stem>.<ext>; rescans the directory on a miss."""
+        for attempt in range(2):
+            for stem in stems:
+                path = self._index.get(stem.upper())
+                if path is not None and path.exists():
+                    return path
+            if attempt == 0:
+                self._reindex()
+        return None
+
+    def _reindex(self) -> None:
+        index = {}
+        if self.root.is_dir():
+            # Preference per stem: parquet > csv > json
+            rank = {'.parquet': 0, '.csv': 1, '.json': 2}
+            for p in sorted(self.root.iterdir(), key=lambda p: rank.get(p.suffix.lower(), 9)):
+                if p.suffix.lower() in rank:
+                    index.setdefault(p.stem.upper(), p)
+        self._index = index
+
+    def _read_frame(self, path: Path) -> pd.DataFrame:
+        suffix = path.suffix.lower()
+        if suffix == '.parquet':
+            df = pd.read_parquet(path)
+            if not isinstance(df.index, pd.DatetimeIndex):
+                first = df.columns[0]
+                df = df.set_index(first)
+            df.columns = [str(c).lower() for c in df.columns]
+            return self._normalize(df)
+        text = path.read_text()
+        if suffix == '.json':
+            text = json.loads(text)
+        if self._series_parser is None:
+            raise RuntimeError('LocalProvider needs a series_parser to read provider payloads')
+        return self._series_parser(text)
+
+    def _daily(self, symbol: str) -> pd.DataFrame:
+        path = self._find(f'{symbol}_daily', f'{symbol}_{_AV_FUNCTIONS["daily"]}')
+        return self._read_frame(path) if path is not None else pd.DataFrame()
+
+    # --- provider API -----------------------------------------------------
+
+    def history(self, symbol: str, frequency: str = 'daily') -> pd.DataFrame:
+        """OHLCV bars for symbol; empty frame when no data is available (like the real provider)."""
+        self._simulate(f'history {symbol}')
+        frequency = (frequency or 'daily').lower()
+        if frequency == 'daily':
+            return self._daily(symbol)
+        path = self._find(f'{symbol}_{frequency}', f'{symbol}_{_AV_FUNCTIONS.get(frequency, "")}')
+        if path is not None:
+            return self._read_frame(path)
+        return resample_ohlcv(self._daily(symbol), frequency)
+
+    def overview(self, symbol: str) -> dict:
+        """Recorded OVERVIEW payload (raw Alpha Vantage shape) or {}."""
+        self._simulate(f'overview {symbol}')
+        path = self._find(f'{symbol}_OVERVIEW')
+        return json.loads(path.read_text()) if path is not None else {}
+
+    def global_quote(self, symbol: str) -> dict:
+        """Recorded GLOBAL_QUOTE payload, or one synthesized from the last two daily bars."""
+        self._simulate(f'quote {symbol}')
+        path = self._find(f'{symbol}_GLOBAL_QUOTE')
+        if path is not None:
+            return json.loads(path.read_text())
+        df = self._daily(symbol)
+        if df.empty:
+            return {'Global Quote': {}}
+        last = df.iloc[-1]
+        prev_close = float(df['close'].iloc[-2]) if len(df) > 1 else float(last['close'])
+        change = float(last['close']) - prev_close
+        return {'Global Quote': {
+            '01. symbol': symbol,
+            '02. open': str(last.get('open', last['close'])),
+            '03. high': str(last.get('high', last['close'])),
+            '04. low': str(last.get('low', last['close'])),
+            '05. price': str(last['close']),
+            '06. volume': str(last.get('volume', 0)),
+            '07. latest trading day': df.index[-1].strftime('%Y-%m-%d'),
+            '08. previous close': str(prev_close),
+            '09. change': str(change),
+            '10. change percent': f'{(change / prev_close * 100.0) if prev_close else 0.0:.4f}%',
+        }}
+
+
+def resample_ohlcv(df: pd.DataFrame, frequency: str) -> pd.DataFrame:
+    """Aggregate daily bars into weekly (Friday) or monthly (month-end) bars."""
+    if df is None or df.empty:
+        return pd.DataFrame()
+    rules = {'weekly': ['W-FRI'], 'monthly': ['ME', 'M']}.get(frequency)
+    if not rules:
+        return df
+    agg = {c: f for c, f in [('open', 'first'), ('high', 'max'), ('low', 'min'), ('close', 'last'), ('volume', 'sum')]
+           if c in df.columns}
+    for rule in rules:
+        try:
+            out = df.resample(rule).agg(agg)
+            break
+        except ValueError:
+            # pandas < 2.2 spells month-end 'M'
+            continue
+    out = out.dropna(subset=['close'])
+    out.index.name = df.index.name
+    return out
+
+
+def synthetic_ohlcv(bars: int = 1000, seed: int = 0, end: str = '2024-12-31') -> pd.DataFrame:
+    """Random-walk business-day OHLCV frame indexed by 'date'."""
+    dates = pd.bdate_range(end=end, periods=bars)
+    rng = np.random.default_rng(seed)
+    rets = rng.normal(0.0003, 0.015, bars)
+    close = 100.0 * np.exp(np.cumsum(rets))
+    open_ = close * (1 + rng.normal(0, 0.003, bars))
+    spread = np.abs(rng.normal(0, 0.01, bars)) * close
+    return pd.DataFrame({
+        'open': open_,
+        'high': np.maximum(open_, close) + spread,
+        'low': np.minimum(open_, close) - spread,
+        'close': close,
+        'volume': rng.integers(100_000, 5_000_000, bars).astype(float),
+    }, index=pd.Index(dates, name='date'))
+
+
+def write_synthetic_dataset(root, tickers, bars: int = 1000, seed: int = 0, end: str = '2024-12-31') -> Path:
+    """Write <TICKER>_daily.csv random-walk OHLCV files for benchmarks and load tests."""
+    root = Path(root)
+    root.mkdir(parents=True, exist_ok=True)
+    for i, t in enumerate(tickers):
+        synthetic_ohlcv(bars, seed=seed + i, end=end).round(4).to_csv(root / f'{t.upper()}_daily.csv')
+    return root
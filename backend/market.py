@@ -0,0 +1,219 @@
+"""Market-relative features: correlation, beta and relative strength against benchmark indices.
+
+A ticker's history is compared with one or more index close series (NIFTY,
+SENSEX, sector indices). The primary index fills the legacy `market_index` and
+`corr_with_index_20` columns and adds `beta_index_{w}` and `rs_index_{w}`.
+Named indices add `corr_{name}_{w}`, `beta_{name}_{w}` and `rs_{name}_{w}`.
+
+Every statistic comes from running sums: rolling correlation and beta from
+windowed differences of cumulative sums of x, y, x*x, y*y and x*y, and relative
+strength from the difference of log price ratios. Each window is therefore one
+O(n) vectorized pass whatever its length. Windows use pairwise-complete
+observations like pandas' rolling().corr().
+
+MarketIndices holds the index series for a whole request or batch. Aligning
+them on a ticker's dates is done once per distinct calendar, and the content
+hash used in cache keys is computed once.
+"""
+import re
+import threading
+from typing import Dict, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+MARKET_WINDOWS = (20,)
+_ALIGNED_MAX = 8  # calendars kept per MarketIndices
+
+
+def index_name(ticker: str) -> str:
+    """Column-safe name for an index ticker: '^NSEI' -> 'nsei', 'NIFTY BANK' -> 'nifty_bank'."""
+    return re.sub(r'[^a-z0-9]+', '_', str(ticker).lower()).strip('_') or 'index'
+
+
+def _window_sums(a: np.ndarray, window: int) -> np.ndarray:
+    """Sum over the trailing `window` rows along axis 0 (fewer at the head)."""
+    c = np.cumsum(a, axis=0)
+    out = c.copy()
+    out[window:] -= c[:-window]
+    return out
+
+
+def rolling_corr_beta(x: np.ndarray, y: np.ndarray, window: int = 20,
+                      min_periods: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """Rolling correlation of x with y and beta of x on y, over pairwise-complete observations.
+
+    Works along axis 0 of 1-D or (time x column) arrays. Windows with fewer than min_periods
+    (default: window) complete pairs, or with no variance, are NaN.
+    """
+    min_periods = window if min_periods is None else min_periods
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    valid = np.isfinite(x) & np.isfinite(y)
+    count = np.maximum(valid.sum(axis=0), 1)
+    # centering first keeps the running sums of squares small, so their differences stay accurate
+    cx = np.where(valid, x - np.where(valid, x, 0.0).sum(axis=0) / count, 0.0)
+    cy = np.where(valid, y - np.where(valid, y, 0.0).sum(axis=0) / count, 0.0)
+    n = _window_sums(valid.astype(np.float64), window)
+    sx, sy = _window_sums(cx, window), _window_sums(cy, window)
+    sxx, syy, sxy = _window_sums(cx * cx, window), _window_sums(cy * cy, window), _window_sums(cx * cy, window)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        cov = sxy - sx * sy / n
+        vx = sxx - sx * sx / n
+        vy = syy - sy * sy / n
+        # running-sum roundoff can leave a flat window with a tiny variance of either sign
+        eps = 1e-12 * np.maximum(sxx, syy)
+        flat = (vx <= eps) | (vy <= eps)
+        corr = np.clip(cov / np.sqrt(vx * vy), -1.0, 1.0)
+        beta = cov / vy
+    bad = (n < min_periods) | flat
+    corr[bad] = np.nan
+    beta[bad] = np.nan
+    return corr, beta
+
+
+def relative_strength(close: np.ndarray, index: np.ndarray, window: int = 20) -> np.ndarray:
+    """log(close_t / close_{t-w}) - log(index_t / index_{t-w}): outperformance over the window."""
+    with np.errstate(invalid='ignore', divide='ignore'):
+        ratio = np.log(np.asarray(close, dtype=np.float64)) - np.log(np.asarray(index, dtype=np.float64))
+    out = np.full(ratio.shape, np.nan)
+    out[window:] = ratio[window:] - ratio[:-window]
+    return out
+
+
+def _returns(x: np.ndarray) -> np.ndarray:
+    out = np.full(x.shape, np.nan)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        out[1:] = x[1:] / x[:-1] - 1.0
+    return out
+
+
+def market_features(close: np.ndarray, indices: Mapping[str, np.ndarray], windows: Sequence[int] = MARKET_WINDOWS,
+                    min_periods: Optional[int] = None) -> Dict[str, np.ndarray]:
+    """{corr_/beta_/rs_{name}_{w}: array} for close against each aligned index series."""
+    close = np.asarray(close, dtype=np.float64)
+    r_asset = _returns(close)
+    out = {}
+    for name, level in indices.items():
+        level = np.asarray(level, dtype=np.float64)
+        r_index = _returns(level)
+        for w in windows:
+            mp = min_periods if min_periods is not None else max(2, w // 2)
+            out[f'corr_{name}_{w}'], out[f'beta_{name}_{w}'] = rolling_corr_beta(r_asset, r_index, w, mp)
+            out[f'rs_{name}_{w}'] = relative_strength(close, level, w)
+    return out
+
+
+class MarketIndices:
+    """Benchmark close series shared by every ticker of a request or batch.
+
+    primary: the series behind market_index / corr_with_index_20 (the request's market_ticker).
+    indices: further {name: close series}, see index_name().
+    """
+
+    def __init__(self, indices: Optional[Mapping[str, pd.Series]] = None, primary: Optional[pd.Series] = None,
+                 windows: Sequence[int] = MARKET_WINDOWS):
+        self.primary = None if primary is None else pd.to_numeric(primary, errors='coerce').astype(float)
+        self.indices = {index_name(k): pd.to_numeric(v, errors='coerce').astype(float)
+                        for k, v in (indices or {}).items() if v is not None}
+        self.windows = tuple(windows)
+        parts = [('index', self.primary)] + sorted(self.indices.items())
+        self.key = (self.windows,) + tuple(
+            (name, len(s), int(pd.util.hash_pandas_object(s, index=True).sum())) for name, s in parts if s is not None)
+        self._aligned = []  # [(dates, {name: array})], most recent last
+        self._lock = threading.Lock()
+
+    def __bool__(self):
+        return self.primary is not None or bool(self.indices)
+
+    def __getstate__(self):
+        # process-pool fits get the series; the alignment memo stays behind
+        state = self.__dict__.copy()
+        state['_aligned'] = []
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    @property
+    def lookback(self) -> int:
+        """Bars behind the latest row of add_market_features (returns plus the longest window)."""
+        return max(20, *self.windows) + 1
+
+    def aligned(self, dates: pd.Index, remember: bool = True) -> Dict[str, np.ndarray]:
+        """Each series reindexed on `dates` (NaN where the index has no bar); '' is the primary."""
+        with self._lock:
+            for known, arrays in self._aligned:
+                if known is dates or known.equals(dates):
+                    return arrays
+        series = dict(self.indices)
+        if self.primary is not None:
+            series[''] = self.primary
+        arrays = {name: s.reindex(dates).to_numpy(dtype=np.float64) for name, s in series.items()}
+        if not remember:
+            return arrays
+        with self._lock:
+            self._aligned = (self._aligned + [(dates, arrays)])[-_ALIGNED_MAX:]
+        return arrays
+
+    def carried_to(self, dates: pd.Index) -> 'MarketIndices':
+        """A copy whose series also cover the `dates` after their last bar, at their last level.
+
+        The benchmark for the synthetic future bars of a recursive forecast: without it they align
+        to NaN and every market-relative column of those bars is undefined.
+        """
+        def carry(s: pd.Series) -> pd.Series:
+            known = s.dropna()
+            later = dates[dates > s.index[-1]] if len(known) else dates[:0]
+            return pd.concat([s, pd.Series(known.iloc[-1], index=later)]) if len(later) else s
+
+        return MarketIndices({name: carry(s) for name, s in self.indices.items()},
+                             primary=None if self.primary is None else carry(self.primary), windows=self.windows)
+
+    @classmethod
+    def from_fundamentals(cls, fundamentals: Optional[dict]) -> Optional['MarketIndices']:
+        """The MarketIndices in fundamentals['market_indices'], or one built from a bare
+        'market_index'/'market_close' Series (and a {name: Series} 'market_indices' dict)."""
+        if not fundamentals:
+            return None
+        given = fundamentals.get('market_indices')
+        if isinstance(given, MarketIndices):
+            return given if given else None
+        primary = next((fundamentals[k] for k in ('market_index', 'market_close')
+                        if isinstance(fundamentals.get(k), pd.Series)), None)
+        market = cls(given if isinstance(given, Mapping) else None, primary=primary)
+        return market if market else None
+
+
+def add_market_features(frame: pd.DataFrame, market: MarketIndices, remember: bool = True) -> pd.DataFrame:
+    """frame (with a close column) plus the market-relative columns for every index in `market`.
+
+    remember=False skips the alignment memo, for one-off calendars.
+    """
+    arrays = market.aligned(frame.index, remember)
+    close = pd.to_numeric(frame['close'], errors='coerce').to_numpy(dtype=np.float64)
+    cols = {}
+    primary = arrays.get('')
+    if primary is not None:
+        cols['market_index'] = primary
+        stats = market_features(close, {'index': primary}, sorted({20, *market.windows}))
+        # the 20-bar correlation is the legacy corr_with_index_20 column
+        stats['corr_with_index_20'] = stats.pop('corr_index_20')
+        if 20 not in market.windows:
+            del stats['beta_index_20'], stats['rs_index_20']
+        cols.update(stats)
+    cols.update(market_features(close, {name: a for name, a in arrays.items() if name}, market.windows))
+    out = frame.copy(deep=False)
+    existing = [c for c in cols if c in out.columns]
+    for name in existing:  # keep their position
+        out[name] = cols.pop(name)
+    return pd.concat([out, pd.DataFrame(cols, index=frame.index)], axis=1) if cols else out
+
+
+def latest_market_features(close: Sequence[float], dates: pd.Index, market: MarketIndices) -> dict:
+    """add_market_features' values for the last of `dates`, from the last market.lookback closes."""
+    n = market.lookback
+    frame = pd.DataFrame({'close': np.asarray(close, dtype=np.float64)[-n:]}, index=dates[-n:])
+    return add_market_features(frame, market, remember=False).iloc[-1].drop('close').to_dict()
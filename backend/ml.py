@@ -2,19 +2,63 @@ from __future__ import annotations
 
 import pandas as pd
 import numpy as np
-from sklearn.linear_model import Ridge
 from sklearn.ensemble import RandomForestRegressor
 from typing import List, Dict, Literal
 
 try:
-    from .features import assemble_features
+    from .features import assemble_features, valid_rows
 except Exception:
     try:
         import features  # type: ignore
         assemble_features = features.assemble_features  # type: ignore[attr-defined]
+        valid_rows = features.valid_rows  # type: ignore[attr-defined]
     except Exception as e:
         raise
 
+try:
+    from .feature_cache import FEATURE_COMPACT, cached_features
+except Exception:
+    import feature_cache  # type: ignore
+    cached_features = feature_cache.cached_features  # type: ignore[attr-defined]
+    FEATURE_COMPACT = feature_cache.FEATURE_COMPACT  # type: ignore[attr-defined]
+
+try:
+    from .timing import span
+except Exception:
+    import timing  # type: ignore
+    span = timing.span  # type: ignore[attr-defined]
+
+try:
+    from .streaming import StreamingIndicators
+except Exception:
+    import streaming  # type: ignore
+    StreamingIndicators = streaming.StreamingIndicators  # type: ignore[attr-defined]
+
+try:
+    from .online_ridge import OnlineRidge
+except Exception:
+    import online_ridge  # type: ignore
+    OnlineRidge = online_ridge.OnlineRidge  # type: ignore[attr-defined]
+
+try:
+    from .model_registry import registered_model
+except Exception:
+    import model_registry  # type: ignore
+    registered_model = model_registry.registered_model  # type: ignore[attr-defined]
+
+try:
+    from .training import job_threads
+except Exception:
+    import training  # type: ignore
+    job_threads = training.job_threads  # type: ignore[attr-defined]
+
+try:
+    from .market import MarketIndices, latest_market_features
+except Exception:
+    import market as _market  # type: ignore
+    MarketIndices = _market.MarketIndices  # type: ignore[attr-defined]
+    latest_market_features = _market.latest_market_features  # type: ignore[attr-defined]
+
 
 def _ensure_ohlcv(df: pd.DataFrame) -> pd.DataFrame:
     out = df.copy()
@@ -30,6 +74,94 @@ def _ensure_ohlcv(df: pd.DataFrame) -> pd.DataFrame:
     return out
 
 
+def _next_bar(sim_index, close: float, volume: float):
+    """Synthetic next bar for the recursive forecast: open=high=low=close=pred, volume carried forward."""
+    last_idx = sim_index[-1]
+    next_idx = last_idx + (sim_index[-1] - sim_index[-2] if len(sim_index) > 1 else pd.Timedelta(days=1))
+    return next_idx, {'open': close, 'high': close, 'low': close, 'close': close, 'volume': volume}
+
+
+def _future_index(index: pd.Index, steps: int) -> pd.Index:
+    """Timestamps of the next `steps` synthetic bars, as _next_bar() appends them."""
+    dates = index[-2:]
+    for _ in range(steps):
+        dates = dates.append(pd.Index([_next_bar(dates, 0.0, 0.0)[0]]))
+    return dates[len(index[-2:]):]
+
+
+def _forecast_market(fundamentals, index: pd.Index, steps: int):
+    """fundamentals' benchmarks with their last level carried over the forecast's synthetic bars."""
+    market = MarketIndices.from_fundamentals(fundamentals)
+    return market.carried_to(_future_index(index, steps)) if market is not None else None
+
+
+def _last_valid(feats: pd.DataFrame, columns) -> pd.DataFrame:
+    """The last complete row of feats[columns], as a one-row frame."""
+    rows = np.flatnonzero(valid_rows(feats, columns))
+    if not len(rows):
+        raise ValueError("no complete feature row to predict from")
+    return feats[list(columns)].iloc[rows[-1:]]
+
+
+def _forecast_recompute(model, hist: pd.DataFrame, fundamentals, steps: int) -> List[float]:
+    """Recursive forecast that re-assembles features over the whole history each step."""
+    preds: List[float] = []
+    sim = hist.copy()
+    market = _forecast_market(fundamentals, hist.index, steps)
+    if market is not None:
+        fundamentals = {**fundamentals, 'market_indices': market}
+    for _ in range(steps):
+        # same layout as the cached training features
+        feats_sim = assemble_features(sim, fundamentals, compact=FEATURE_COMPACT)
+        X_last = _last_valid(feats_sim, [c for c in feats_sim.columns if c != 'target'])
+        next_close = float(model.predict(X_last)[0])
+        preds.append(next_close)
+        next_idx, new_row = _next_bar(sim.index, next_close, float(sim['volume'].iloc[-1]) if 'volume' in sim.columns else 0.0)
+        sim = pd.concat([sim, pd.DataFrame([new_row], index=[next_idx])])
+    return preds
+
+
+def _forecast_streaming(model, hist: pd.DataFrame, feats: pd.DataFrame, columns, fundamentals, steps: int) -> List[float]:
+    """Same forecast as _forecast_recompute, advancing the indicators in O(1) per appended bar.
+
+    Like `_last_valid(assemble_features(sim))`, each step predicts from the
+    latest bar whose feature row is complete. Both paths carry the benchmark
+    levels forward over the synthetic bars, so their market-relative columns
+    stay defined.
+    """
+    with span('ml.forecast_warmup'):
+        engine = StreamingIndicators.from_frame(hist)
+    columns = list(columns)
+    # Columns assemble_features adds on top of the indicators
+    constants = {c: feats[c].iloc[-1] for c in columns if c.startswith('f_')}
+    market = _forecast_market(fundamentals, hist.index, steps)
+    X_last = _last_valid(feats, columns)
+    index = hist.index
+    closes = list(pd.to_numeric(hist['close'], errors='coerce').iloc[-market.lookback:]) if market else []
+    volume = float(hist['volume'].iloc[-1]) if 'volume' in hist.columns else 0.0
+    preds: List[float] = []
+    for step in range(steps):
+        with span('ml.predict'):
+            next_close = float(model.predict(X_last)[0])
+        preds.append(next_close)
+        if step == steps - 1:
+            break
+        next_idx, bar = _next_bar(index, next_close, volume)
+        index = index.append(pd.Index([next_idx]))
+        row = dict.fromkeys(hist.columns, np.nan)
+        row.update(bar)
+        row.update(engine.update(next_close, next_close, next_close, next_close, volume))
+        row.update(constants)
+        if market is not None:
+            # market-relative columns only need the last few closes
+            closes.append(next_close)
+            row.update(latest_market_features(closes, index, market))
+        values = [row.get(c, np.nan) for c in columns]
+        if all(v == v for v in values):
+            X_last = pd.DataFrame([values], columns=columns, index=[next_idx])
+    return preds
+
+
 def train_and_predict_ml(
     df: pd.DataFrame,
     fundamentals: Dict | None,
@@ -38,63 +170,87 @@ def train_and_predict_ml(
     model_type: Literal['ridge', 'rf'] = 'ridge',
     window: int | None = None,
     ridge_alpha: float = 1.0,
+    strategy: Literal['recursive', 'direct'] = 'recursive',
+    scope: tuple | None = None,
 ) -> List[float]:
     """
     Train a lightweight ML model on historical features to predict next-step close.
     Iteratively predict multiple future steps by appending predictions and recomputing features.
     Returns list of predicted close prices (floats) of length `steps`.
+
+    strategy='direct' instead trains one multi-output model on the closes 1..steps bars ahead and
+    predicts every horizon from the last feature row in one call, with no feature loop.
+
+    `window` trains on the last `window` complete rows of the features, which are computed over the
+    whole history.
+
+    The fitted model is reused from the model registry for the same (ticker, frequency), parameters,
+    bars and feature schema; a ridge model is updated with the new bars' rows instead of refitted.
+    `scope` names the (ticker, frequency), for fits outside a feature_scope.
     """
     if df is None or df.empty:
         raise ValueError("empty history")
+    if strategy not in ('recursive', 'direct'):
+        raise ValueError(f"unknown forecast strategy {strategy!r}")
 
     hist = _ensure_ohlcv(df)
-    if window is not None and window > 0 and len(hist) > window:
-        hist = hist.iloc[-window:].copy()
 
     # Build features and target (next close)
-    feats = assemble_features(hist, fundamentals)
+    with span('ml.features'):
+        feats = cached_features(hist, fundamentals)
     if 'close' not in feats.columns:
         # ensure close is available as target
         raise ValueError("history missing 'close' column after feature assembly")
 
-    feats['target'] = feats['close'].shift(-1)
-    feats_model = feats.dropna().copy()
-    if len(feats_model) < 60:
+    columns = list(feats.columns)
+    if strategy == 'direct':
+        targets = [f'target_{h}' for h in range(1, steps + 1)]
+        for h, name in enumerate(targets, 1):
+            feats[name] = feats['close'].shift(-h)
+    else:
+        targets = 'target'
+        feats['target'] = feats['close'].shift(-1)
+    rows = valid_rows(feats)
+    if window is not None and window > 0:
+        # the same rows keep the same feature values as the window slides, so ridge can be updated
+        rows[np.flatnonzero(rows)[:-window]] = False
+    if rows.sum() < 60:
         # need enough history to be meaningful
         raise ValueError("insufficient data for ML (need >= 60 rows after features)")
 
-    y = feats_model['target']
-    X = feats_model.drop(columns=['target'])
+    y = feats.loc[rows, targets]
+    X = feats.loc[rows, columns]
 
-    # Simple regularized linear model
-    if model_type == 'rf':
-        model = RandomForestRegressor(n_estimators=200, random_state=42, n_jobs=-1)
-    else:
-        model = Ridge(alpha=float(ridge_alpha), random_state=42)
-    model.fit(X, y)
+    def fit():
+        # Simple regularized linear model
+        if model_type == 'rf':
+            model = RandomForestRegressor(n_estimators=200, random_state=42, n_jobs=job_threads())
+        else:
+            # sklearn's Ridge, kept as running sums that later bars can update
+            model = OnlineRidge(alpha=float(ridge_alpha))
+        with span('ml.fit'):
+            return model.fit(X, y)
 
-    # Iterative multi-step forecasting
-    preds: List[float] = []
-    sim = hist.copy()
-    for _ in range(steps):
-        feats_sim = assemble_features(sim, fundamentals).dropna().copy()
-        X_last = feats_sim.iloc[[-1]].copy()
-        # Remove any accidental target if present
-        if 'target' in X_last.columns:
-            X_last = X_last.drop(columns=['target'])
-        next_close = float(model.predict(X_last)[0])
-        preds.append(next_close)
+    def extend(prev):
+        if not isinstance(prev, OnlineRidge):
+            return None
+        model = prev.copy()
+        with span('ml.update'):
+            # a revised last bar changes the target of one row per horizon
+            return model if model.slide(X, y, feats[columns], max_revised=steps if strategy == 'direct' else 1) else None
 
-        # Append new row assuming close=open=high=low=pred; volume carry-forward
-        last_idx = sim.index[-1]
-        next_idx = last_idx + (sim.index[-1] - sim.index[-2] if len(sim) > 1 else pd.Timedelta(days=1))
-        new_row = {
-            'open': next_close,
-            'high': next_close,
-            'low': next_close,
-            'close': next_close,
-            'volume': float(sim['volume'].iloc[-1]) if 'volume' in sim.columns else 0.0,
-        }
-        sim = pd.concat([sim, pd.DataFrame([new_row], index=[next_idx])])
+    spec = ('rf', window) if model_type == 'rf' else ('ridge', window, float(ridge_alpha))
+    if strategy == 'direct':
+        spec += ('direct', steps)
+    model = registered_model(spec, hist, fundamentals, X, fit, scope, extend)
 
-    return preds
+    if strategy == 'direct':
+        with span('ml.forecast_direct'):
+            return [float(p) for p in model.predict(_last_valid(feats, columns))[0]]
+
+    # Iterative multi-step forecasting: append each prediction as a bar and update the features.
+    # The streaming engine needs a finite close on every bar; gappy histories take the full recompute.
+    if pd.to_numeric(hist['close'], errors='coerce').notna().all():
+        return _forecast_streaming(model, hist, feats, X.columns, fundamentals, steps)
+    with span('ml.forecast_recompute'):
+        return _forecast_recompute(model, hist, fundamentals, steps)
@@ -0,0 +1,186 @@
+"""Fitted models, reused across predictions of the same history.
+
+train_and_predict_ml fits a Ridge or a 200-tree forest on every call, although
+repeated /api/predict requests for a ticker usually see the same bars. Fitted
+models are registered under:
+- the ticker and frequency (the request's feature_scope)
+- the model type, window and alpha
+- the last bar, as in the feature cache
+- a hash of the fundamentals
+- a hash of the feature schema (column names and dtypes)
+
+A repeat prediction then skips training. Hot models are kept in an in-memory
+LRU. Every fit is also written to MODEL_CACHE_DIR with joblib, so other
+workers, process-pool fits and restarts load it instead of training. Loads
+memory-map the stored arrays (mmap_mode='r'). Reloading a 200-tree forest
+takes tens of milliseconds, against seconds of training.
+
+A fit for a new bar of the same (ticker, frequency, model) replaces the
+previous entry, both in memory and on disk. With an `extend` callback the
+previous model is updated instead of refitted (OnlineRidge), as long as the
+scalar fundamentals and the feature schema are unchanged. Outside a scope
+models are fitted directly.
+"""
+import hashlib
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Callable, Dict, Optional, Sequence
+
+import pandas as pd
+
+try:
+    from .cache import TTLCache
+    from .feature_cache import bar_key, current_scope, fundamentals_key
+    from .market import MarketIndices
+except Exception:
+    from cache import TTLCache  # type: ignore
+    from feature_cache import bar_key, current_scope, fundamentals_key  # type: ignore
+    from market import MarketIndices  # type: ignore
+
+try:
+    import joblib
+    import sklearn
+except ImportError:  # persistence is optional
+    joblib = None
+    sklearn = None
+
+LOG = logging.getLogger(__name__)
+
+
+def _sha(*parts) -> str:
+    return hashlib.sha1(repr(parts).encode()).hexdigest()[:20]
+
+
+def schema_hash(X: pd.DataFrame) -> str:
+    """Digest of the training columns and their dtypes."""
+    return _sha(tuple((str(c), str(t)) for c, t in X.dtypes.items()))
+
+
+def _static(fundamentals: Optional[dict]) -> dict:
+    """fundamentals without the benchmark series, which grow a bar at a time like the history."""
+    return {k: v for k, v in (fundamentals or {}).items() if not isinstance(v, (pd.Series, MarketIndices))}
+
+
+class ModelRegistry:
+    """In-memory LRU of fitted models in front of a directory of joblib files.
+
+    Entries are keyed by (series, version): the series is (ticker, frequency, model spec) and the
+    version covers the bars, fundamentals and feature schema the model was trained on. Each series
+    keeps only its latest version.
+    """
+
+    def __init__(self, path: Optional[os.PathLike] = None, maxsize: int = 32):
+        self.path = None if path is None or joblib is None else Path(path)
+        self.models = TTLCache(maxsize=maxsize, name='models')
+        self._latest: Dict[str, tuple] = {}  # series -> (version, context) held in memory
+        self._lock = threading.Lock()
+        self.fits = 0
+        self.loads = 0
+        self.extended = 0
+
+    def _file(self, series: str, version: str) -> Optional[Path]:
+        return None if self.path is None else self.path / f'{series}-{version}.joblib'
+
+    def get_or_fit(self, scope: Sequence[str], spec: tuple, hist: pd.DataFrame, fundamentals: Optional[dict],
+                   X: pd.DataFrame, fit: Callable[[], object], extend: Optional[Callable[[object], object]] = None):
+        """The model registered for these inputs, or fit() registered for them.
+
+        extend(previous model) may return the series' previous model brought up to date (without
+        modifying it), or None to fall back to fit().
+        """
+        # sklearn's version is part of the series: a pickle from another version is not loaded
+        series = _sha(tuple(scope), spec, getattr(sklearn, '__version__', None))
+        context = _sha(fundamentals_key(_static(fundamentals)), schema_hash(X))
+        version = _sha(bar_key(hist), fundamentals_key(fundamentals), context)
+        key = (series, version)
+
+        def load():
+            path = self._file(series, version)
+            if path is not None and path.exists():
+                try:
+                    model = joblib.load(path, mmap_mode='r')
+                    self.loads += 1
+                    return model
+                except Exception:
+                    LOG.exception('unreadable model file %s, refitting', path)
+            model = self._extend(series, context, extend)
+            if model is None:
+                model = fit()
+                self.fits += 1
+            self._save(series, version, model)
+            return model
+
+        model = self.models.get_or_load(key, load)
+        with self._lock:
+            old = self._latest.get(series)
+            self._latest[series] = (version, context)
+        if old is not None and old[0] != version:
+            self.models.invalidate((series, old[0]))
+        return model
+
+    def _extend(self, series: str, context: str, extend):
+        with self._lock:
+            old = self._latest.get(series)
+        if extend is None or old is None or old[1] != context:
+            return None
+        prev = self.models.peek((series, old[0]))
+        model = extend(prev) if prev is not None else None
+        if model is not None:
+            self.extended += 1
+        return model
+
+    def _save(self, series: str, version: str, model) -> None:
+        path = self._file(series, version)
+        if path is None:
+            return
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_suffix(f'.{os.getpid()}.{threading.get_ident()}.tmp')
+            joblib.dump(model, tmp)
+            os.replace(tmp, path)
+            # the new bar supersedes the series' older models
+            for stale in path.parent.glob(f'{series}-*.joblib'):
+                if stale != path:
+                    stale.unlink(missing_ok=True)
+        except Exception:
+            LOG.exception('could not persist model to %s', path)
+
+    def clear(self) -> None:
+        """Drop every model, in memory and on disk."""
+        self.models.clear()
+        with self._lock:
+            self._latest.clear()
+        if self.path is not None and self.path.exists():
+            for path in self.path.glob('*.joblib'):
+                path.unlink(missing_ok=True)
+
+    def stats(self) -> dict:
+        return {**self.models.stats(), 'fits': self.fits, 'extended': self.extended, 'disk_loads': self.loads,
+                'path': None if self.path is None else str(self.path)}
+
+
+def _from_env() -> Optional[ModelRegistry]:
+    if os.environ.get('MODEL_CACHE', '1').lower() in ('0', 'false', 'no', 'off'):
+        return None
+    path = os.environ.get('MODEL_CACHE_DIR') or Path(__file__).with_name('.cache') / 'models'
+    if os.environ.get('MODEL_CACHE_PERSIST', '1').lower() in ('0', 'false', 'no', 'off'):
+        path = None
+    return ModelRegistry(path, maxsize=int(os.environ.get('MODEL_CACHE_MAXSIZE', 32)))
+
+
+MODEL_REGISTRY = _from_env()
+
+
+def registered_model(spec: tuple, hist: pd.DataFrame, fundamentals: Optional[dict], X: pd.DataFrame,
+                     fit: Callable[[], object], scope: Optional[Sequence[str]] = None, extend=None):
+    """fit()'s model, reused through MODEL_REGISTRY under `scope` (default: the current feature_scope)."""
+    scope = scope or current_scope()
+    if MODEL_REGISTRY is None or scope is None:
+        return fit()
+    return MODEL_REGISTRY.get_or_fit(scope, spec, hist, fundamentals, X, fit, extend)
+
+
+def model_registry_stats() -> Optional[dict]:
+    return None if MODEL_REGISTRY is None else MODEL_REGISTRY.stats()
@@ -0,0 +1,158 @@
+"""Ridge regression kept up to date from running sufficient statistics.
+
+The training set of a ticker's ridge model gains one row per bar (and, with
+`window`, loses its oldest one). OnlineRidge keeps the sums of X, y, X^T X and
+X^T y instead of the rows, so adding or removing a row costs O(p^2) and the p x p
+system is solved only when coefficients are needed. The result is sklearn's
+Ridge(alpha, fit_intercept=True) on the same rows.
+
+The sums are taken over shifted and scaled features, z = (x - shift) / scale,
+with the shift and scale fixed at the first fit. Centering on a row of the data
+keeps the running sums small, so their differences stay accurate, and the
+solve runs on the scaled system (the penalty becomes alpha / scale^2), which is
+far better conditioned than X^T X on raw columns such as obv and volume.
+"""
+import numpy as np
+import pandas as pd
+
+
+def _matrix(X) -> np.ndarray:
+    a = np.asarray(X, dtype=np.float64)
+    return a.reshape(-1, 1) if a.ndim == 1 else a
+
+
+def _take(frame: pd.DataFrame, positions: np.ndarray, columns) -> np.ndarray:
+    """frame[columns] at row positions, as floats; column by column, since compact feature frames
+    keep one block per column and a row take over the whole frame visits every block."""
+    if not len(positions):
+        return np.empty((0, len(columns)))
+    return np.column_stack([frame[c].to_numpy(dtype=np.float64)[positions] for c in columns])
+
+
+class OnlineRidge:
+    """sklearn-compatible ridge regression with update()/downdate() of single rows or row blocks.
+
+    With DataFrame inputs the fitted rows' targets are remembered by index label, which lets
+    slide() move the model to another window of the same feature frame.
+    """
+
+    def __init__(self, alpha: float = 1.0):
+        self.alpha = float(alpha)
+
+    def fit(self, X, y) -> 'OnlineRidge':
+        x = _matrix(X)
+        Y = _matrix(y)
+        scale = x.std(axis=0)
+        self.shift_ = x[0].copy()
+        self.scale_ = np.where(scale > 0, scale, 1.0)
+        self.y_shift_ = Y[0].copy()
+        self.n_features_in_ = x.shape[1]
+        if isinstance(X, pd.DataFrame):
+            self.feature_names_in_ = np.asarray(X.columns, dtype=object)
+        self._single = np.ndim(y) == 1
+        self.n_samples_ = 0
+        p, k = x.shape[1], Y.shape[1]
+        self._sz, self._szz = np.zeros(p), np.zeros((p, p))
+        self._sy, self._szy = np.zeros(k), np.zeros((p, k))
+        # index labels and targets of the fitted rows, for slide()
+        self.index_ = X.index[:0] if isinstance(X, pd.DataFrame) else None
+        self._targets = np.empty((0, k))
+        return self.update(X, y)
+
+    def _add(self, x: np.ndarray, Y: np.ndarray, sign: float) -> None:
+        z = (x - self.shift_) / self.scale_
+        t = Y - self.y_shift_
+        self.n_samples_ += int(sign) * len(z)
+        self._sz += sign * z.sum(axis=0)
+        self._szz += sign * (z.T @ z)
+        self._sy += sign * t.sum(axis=0)
+        self._szy += sign * (z.T @ t)
+        self._coef = None
+
+    def update(self, X, y) -> 'OnlineRidge':
+        """Add rows to the training set."""
+        Y = _matrix(y)
+        self._add(_matrix(X), Y, 1.0)
+        if self.index_ is not None:
+            self.index_ = self.index_.append(X.index)
+            self._targets = np.vstack([self._targets, Y])
+        return self
+
+    def downdate(self, X, y) -> 'OnlineRidge':
+        """Remove rows (with the values they were added with) from the training set."""
+        self._add(_matrix(X), _matrix(y), -1.0)
+        if self.index_ is not None:
+            keep = ~self.index_.isin(X.index)
+            self.index_, self._targets = self.index_[keep], self._targets[keep]
+        return self
+
+    def slide(self, X: pd.DataFrame, y, history: pd.DataFrame, max_revised: int = 1) -> bool:
+        """Move the model to the rows of X, as if fit(X, y) had been called.
+
+        Rows no longer in X are downdated with their features from `history` (a frame holding
+        them, e.g. the full feature frame X was cut from). New rows are added, and a row whose
+        target changed (its next bar was revised) is replaced. Returns False, leaving the model
+        unchanged, when that is not possible: unknown rows, or more than `max_revised` changed
+        targets, which means the price history itself was revised.
+        """
+        if self.index_ is None or self.n_samples_ == 0:
+            return False
+        Y = _matrix(y)
+        pos = X.index.get_indexer(self.index_)  # where each fitted row is in X, -1 if gone
+        kept = pos >= 0
+        changed = np.zeros(len(pos), dtype=bool)
+        changed[kept] = ~np.isclose(self._targets[kept], Y[pos[kept]], rtol=1e-12, atol=0.0).all(axis=1)
+        src = history.index.get_indexer(self.index_[~kept])
+        if changed.sum() > max_revised or (src < 0).any():
+            return False
+        if len(src) or changed.any():
+            x_old = np.vstack([_take(history, src, X.columns), _take(X, pos[changed], X.columns)])
+            self._add(x_old, np.vstack([self._targets[~kept], self._targets[changed]]), -1.0)
+        add = np.ones(len(X), dtype=bool)
+        add[pos[kept & ~changed]] = False
+        if add.any():
+            self._add(_take(X, np.flatnonzero(add), X.columns), Y[add], 1.0)
+        self.index_, self._targets = X.index, Y
+        return True
+
+    def _solve(self) -> None:
+        n = self.n_samples_
+        zbar = self._sz / n
+        tbar = self._sy / n
+        S = self._szz - n * np.outer(zbar, zbar)
+        b = self._szy - n * np.outer(zbar, tbar)
+        S[np.diag_indices_from(S)] += self.alpha / self.scale_ ** 2
+        v = np.linalg.solve(S, b)
+        coef = v / self.scale_[:, None]
+        self._coef = coef
+        self._intercept = self.y_shift_ + tbar - (self.shift_ + zbar * self.scale_) @ coef
+
+    @property
+    def coef_(self) -> np.ndarray:
+        if self._coef is None:
+            self._solve()
+        return self._coef[:, 0] if self._single else self._coef.T
+
+    @property
+    def intercept_(self):
+        if self._coef is None:
+            self._solve()
+        return float(self._intercept[0]) if self._single else self._intercept
+
+    def predict(self, X) -> np.ndarray:
+        if self._coef is None:
+            self._solve()
+        out = _matrix(X) @ self._coef + self._intercept
+        return out[:, 0] if self._single else out
+
+    def copy(self) -> 'OnlineRidge':
+        out = OnlineRidge.__new__(OnlineRidge)
+        out.__dict__.update({k: v.copy() if isinstance(v, np.ndarray) else v for k, v in self.__dict__.items()})
+        return out
+
+    def get_params(self, deep: bool = True) -> dict:
+        return {'alpha': self.alpha}
+
+    def set_params(self, **params) -> 'OnlineRidge':
+        self.alpha = float(params.pop('alpha', self.alpha))
+        return self
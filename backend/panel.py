@@ -0,0 +1,193 @@
+"""Indicators for a whole universe at once, on (time x ticker) arrays.
+
+Calling compute_technical_indicators once per ticker pays pandas' fixed
+overhead N times. compute_panel aligns every ticker on one time axis and runs
+the NumPy kernel (features_numpy) column-wise over the 2-D arrays, so a scan of
+1,000 tickers is a handful of vectorized passes.
+
+Ragged histories (late listings, delistings, missing days) are handled with a
+validity mask. Each ticker's bars are packed to the top of its column with a
+stable argsort, the kernel runs on the packed block, and the results are
+scattered back. Every indicator is causal, so each ticker's values equal
+compute_technical_indicators on that ticker's own history. Cells where a
+ticker has no bar are NaN (0 for the flag columns).
+"""
+from typing import Iterable, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+try:
+    from .features import INDICATOR_COLUMNS, INT_INDICATOR_COLUMNS, indicator_dependencies
+    from .features_numpy import indicator_arrays
+except Exception:
+    from features import INDICATOR_COLUMNS, INT_INDICATOR_COLUMNS, indicator_dependencies  # type: ignore
+    from features_numpy import indicator_arrays  # type: ignore
+
+FIELDS = ('open', 'high', 'low', 'close', 'volume', 'market_index')
+# ta returns NaN for the whole ADX/DI columns below 2 * 14 bars
+_ADX_COLUMNS = ('adx_14', 'plus_di_14', 'minus_di_14', 'di_pos_14', 'di_neg_14')
+_ADX_MIN_BARS = 28
+
+
+class IndicatorPanel:
+    """(time x ticker) arrays per field and indicator column, plus the mask of cells holding a bar."""
+
+    def __init__(self, index: pd.Index, tickers: Sequence[str], mask: np.ndarray, fields: dict, data: dict):
+        self.index = index
+        self.tickers = list(tickers)
+        self.mask = mask
+        self.fields = fields
+        self.data = data
+        self._pos = {t: i for i, t in enumerate(self.tickers)}
+
+    @property
+    def columns(self):
+        return tuple(self.data)
+
+    def __getitem__(self, column: str) -> pd.DataFrame:
+        """One field or indicator as a (time x ticker) DataFrame."""
+        values = self.data[column] if column in self.data else self.fields[column]
+        return pd.DataFrame(values, index=self.index, columns=self.tickers)
+
+    def ticker(self, ticker: str) -> pd.DataFrame:
+        """The ticker's bars with their indicators, laid out like compute_technical_indicators output."""
+        j = self._pos[ticker]
+        rows = self.mask[:, j]
+        cols = {name: arr[rows, j] for name, arr in self.fields.items()}
+        cols.update((name, arr[rows, j]) for name, arr in self.data.items())
+        return pd.DataFrame(cols, index=self.index[rows])
+
+    def latest(self, columns: Optional[Iterable[str]] = None) -> pd.DataFrame:
+        """Screening view: one row per ticker with its last bar's date, close and indicators."""
+        names = list(self.data) if columns is None else list(columns)
+        has = self.mask.any(axis=0)
+        last = len(self.index) - 1 - np.argmax(self.mask[::-1], axis=0)
+        rows, cols = last[has], np.flatnonzero(has)
+        out = {'date': self.index[rows], 'close': self.fields['close'][rows, cols]}
+        out.update((name, self.data[name][rows, cols]) for name in names)
+        return pd.DataFrame(out, index=pd.Index([self.tickers[j] for j in cols], name='ticker'))
+
+    @property
+    def nbytes(self) -> int:
+        return sum(a.nbytes for a in (*self.fields.values(), *self.data.values())) + self.mask.nbytes
+
+
+def _numeric(obj, dtype) -> np.ndarray:
+    if isinstance(obj, pd.Series):
+        if not pd.api.types.is_numeric_dtype(obj.dtype):
+            obj = pd.to_numeric(obj, errors='coerce')
+    elif not all(pd.api.types.is_numeric_dtype(t) for t in obj.dtypes):
+        obj = obj.apply(pd.to_numeric, errors='coerce')
+    return obj.to_numpy(dtype=dtype, na_value=np.nan)
+
+
+def _field_arrays(data, dtype):
+    """(dates, tickers, {field: (time x ticker) array}) from a {ticker: frame} mapping or 2-level columns."""
+    if isinstance(data, pd.DataFrame):
+        if data.columns.nlevels != 2:
+            raise ValueError('panel frames need 2-level columns: (field, ticker) or (ticker, field)')
+        levels = [{str(v).lower() for v in data.columns.get_level_values(i)} for i in (0, 1)]
+        level = next((i for i in (0, 1) if 'close' in levels[i]), None)
+        if level is None:
+            raise ValueError("panel frame has no 'close' field")
+        lowered = data.rename(columns=lambda c: str(c).lower(), level=level).sort_index()
+        tickers = list(dict.fromkeys(lowered.columns.get_level_values(1 - level)))
+        arrays = {f: _numeric(lowered.xs(f, axis=1, level=level).reindex(columns=tickers), dtype)
+                  for f in FIELDS if f in levels[level]}
+        return lowered.index, [str(t) for t in tickers], arrays
+
+    frames = {str(t): df.rename(columns=lambda c: str(c).lower())
+              for t, df in data.items() if df is not None and not df.empty}
+    frames = {t: df for t, df in frames.items() if 'close' in df.columns}
+    if not frames:
+        return pd.Index([]), [], {'close': np.empty((0, 0), dtype=dtype)}
+    first, *rest = frames.values()
+    dates = first.index.append([df.index for df in rest]).unique().sort_values()
+    fields = [f for f in FIELDS if any(f in df.columns for df in frames.values())]
+    arrays = {f: np.full((len(dates), len(frames)), np.nan, dtype=dtype) for f in fields}
+    for j, df in enumerate(frames.values()):
+        rows = dates.get_indexer(df.index)
+        for f in fields:
+            if f in df.columns:
+                arrays[f][rows, j] = _numeric(df[f], dtype)
+    return dates, list(frames), arrays
+
+
+def compute_panel(data, columns: Optional[Iterable[str]] = None, market_index=None,
+                  dtype=np.float64) -> IndicatorPanel:
+    """Indicators for every ticker in one vectorized pass.
+
+    data: {ticker: OHLCV DataFrame}, or a DataFrame with (field, ticker) or (ticker, field) columns.
+          Histories are aligned on the union of their dates.
+    columns: indicator subset (default: all of INDICATOR_COLUMNS), see features.indicator_dependencies().
+    market_index: optional Series (or array over the aligned dates) shared by all tickers; a per-ticker
+                  'market_index' field in data takes precedence.
+    """
+    dates, tickers, arrays = _field_arrays(data, dtype)
+    if 'market_index' not in arrays and market_index is not None:
+        if isinstance(market_index, pd.Series):
+            market_index = pd.to_numeric(market_index, errors='coerce').reindex(dates).to_numpy()
+        series = np.asarray(market_index, dtype=dtype)
+        arrays['market_index'] = np.repeat(series[:, None], len(tickers), axis=1)
+    return panel_from_arrays(**arrays, index=dates, tickers=tickers, columns=columns, dtype=dtype)
+
+
+def panel_from_arrays(close, open=None, high=None, low=None, volume=None, market_index=None,
+                      index=None, tickers=None, columns: Optional[Iterable[str]] = None,
+                      dtype=np.float64) -> IndicatorPanel:
+    """compute_panel on aligned (time x ticker) arrays; NaN close/open/high/low marks a missing bar."""
+    c = np.asarray(close, dtype=dtype)
+    if c.ndim != 2:
+        raise ValueError('panel arrays must be 2-D (time x ticker)')
+    fields = {name: np.asarray(arr, dtype=dtype) for name, arr in
+              (('open', open), ('high', high), ('low', low), ('close', c), ('volume', volume),
+               ('market_index', market_index)) if arr is not None}
+    index = pd.RangeIndex(c.shape[0]) if index is None else pd.Index(index)
+    tickers = list(range(c.shape[1])) if tickers is None else list(tickers)
+
+    valid = np.ones(c.shape, dtype=bool)
+    for name in ('open', 'high', 'low', 'close'):
+        if name in fields:
+            valid &= np.isfinite(fields[name])
+    lengths = valid.sum(axis=0)
+    # Pack every ticker's bars to the top of its column, keeping their order. src holds the flat
+    # positions of the packed cells, dst the positions of the bars they came from.
+    n_rows, n_cols = c.shape
+    order = np.argsort(~valid, axis=0, kind='stable')
+    filled = np.arange(n_rows)[:, None] < lengths[None, :]
+    src = np.flatnonzero(filled)
+    dst = (order * n_cols + np.arange(n_cols))[filled]
+
+    def pack(arr):
+        out = np.full(arr.shape, np.nan, dtype=dtype)
+        out.ravel()[src] = arr.ravel()[dst]
+        return out
+
+    packed = {name: pack(arr) for name, arr in fields.items()}
+    wanted = None if columns is None else set(indicator_dependencies(columns))
+    pc = packed['close']
+    result = indicator_arrays(
+        packed.get('open', pc), packed.get('high', pc), packed.get('low', pc), pc,
+        volume=packed.get('volume'), market_index=packed.get('market_index'),
+        candles={'open', 'high', 'low'} <= set(fields), dtype=dtype, columns=wanted,
+    )
+    short = lengths < _ADX_MIN_BARS
+    if short.any():
+        for name in _ADX_COLUMNS:
+            if name in result:
+                result[name][:, short] = np.nan
+        if 'regime_trend' in result:
+            result['regime_trend'][:, short] = 0
+
+    keep = INDICATOR_COLUMNS if columns is None else tuple(c_ for c_ in INDICATOR_COLUMNS if c_ in set(columns))
+    data = {}
+    for name in keep:
+        arr = result[name]
+        out = np.full(arr.shape, 0 if name in INT_INDICATOR_COLUMNS else np.nan, dtype=arr.dtype)
+        out.ravel()[dst] = arr.ravel()[src]
+        data[name] = out
+    base = {}
+    for name, arr in fields.items():
+        base[name] = np.where(valid, arr, np.nan).astype(dtype, copy=False)
+    return IndicatorPanel(index, tickers, valid, base, data)
@@ -0,0 +1,249 @@
+"""Watchlist forecasts computed ahead of the requests that ask for them.
+
+Users look at the same few hundred tickers every morning. The scheduler
+refreshes every watchlist ticker after each market close: history, features,
+model and forecast, through the same pipeline as /api/predict. It runs at
+background provider priority, so its calls queue behind interactive requests
+within the shared Alpha Vantage budget. Results go to a SQLite table shared by
+every worker. /api/predict answers a matching request from it and computes on
+demand otherwise.
+
+Run it inside the web process (PRECOMPUTE=1; one gunicorn worker takes a lock
+file and runs the loop) or as a separate worker:
+
+    python precompute.py                   # loop: refresh after every close
+    python precompute.py --once TCS.BSE    # one refresh of the given tickers
+"""
+import argparse
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional
+from zoneinfo import ZoneInfo
+
+try:
+    from .ratelimit import BACKGROUND, provider_priority
+except Exception:
+    from ratelimit import BACKGROUND, provider_priority  # type: ignore
+
+LOG = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS forecasts (
+    key TEXT PRIMARY KEY,
+    ticker TEXT NOT NULL,
+    computed_at REAL NOT NULL,
+    expires_at REAL NOT NULL,
+    payload TEXT NOT NULL
+) WITHOUT ROWID
+"""
+
+
+def watchlist_from_env() -> List[str]:
+    """PRECOMPUTE_WATCHLIST: comma-separated tickers, or the path of a file with one per line."""
+    raw = os.environ.get('PRECOMPUTE_WATCHLIST', '').strip()
+    if raw and ',' not in raw and Path(raw).is_file():
+        raw = Path(raw).read_text().replace('\n', ',')
+    return list(dict.fromkeys(t.strip().upper() for t in raw.split(',') if t.strip() and not t.strip().startswith('#')))
+
+
+def request_from_env() -> dict:
+    """PRECOMPUTE_REQUEST: the /api/predict body (without ticker) to precompute, as JSON (default: {})."""
+    return json.loads(os.environ.get('PRECOMPUTE_REQUEST') or '{}')
+
+
+def next_run(now: float, close: str = '15:30', tz: str = 'Asia/Kolkata', delay_minutes: float = 30) -> float:
+    """Epoch seconds of the first weekday market close (plus the delay) after `now`."""
+    zone = ZoneInfo(tz)
+    hour, minute = (int(p) for p in close.split(':'))
+    day = datetime.fromtimestamp(now, zone).replace(hour=hour, minute=minute, second=0, microsecond=0)
+    run = day + timedelta(minutes=delay_minutes)
+    while run.timestamp() <= now or run.weekday() >= 5:
+        day += timedelta(days=1)
+        run = day + timedelta(minutes=delay_minutes)
+    return run.timestamp()
+
+
+class ForecastStore:
+    """SQLite table of precomputed /api/predict responses, keyed by the normalized request."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(str(self.path), timeout=30)
+
+    def get(self, key: str, now: Optional[float] = None) -> Optional[dict]:
+        """The stored response for key, unless it has expired."""
+        with self._connect() as conn:
+            row = conn.execute('SELECT payload FROM forecasts WHERE key = ? AND expires_at > ?',
+                               (key, time.time() if now is None else now)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, key: str, ticker: str, payload: dict, expires_at: float) -> None:
+        with self._connect() as conn:
+            conn.execute('INSERT OR REPLACE INTO forecasts (key, ticker, computed_at, expires_at, payload) '
+                         'VALUES (?, ?, ?, ?, ?)', (key, ticker, time.time(), expires_at, json.dumps(payload)))
+
+    def fresh(self, keys: Iterable[str], now: Optional[float] = None) -> set:
+        """The keys that have an unexpired response."""
+        keys = list(keys)
+        if not keys:
+            return set()
+        with self._connect() as conn:
+            rows = conn.execute(f'SELECT key FROM forecasts WHERE expires_at > ? AND key IN ({",".join("?" * len(keys))})',
+                                (time.time() if now is None else now, *keys)).fetchall()
+        return {r[0] for r in rows}
+
+
+class Scheduler:
+    """Refreshes the watchlist's forecasts after every market close.
+
+    compute(ticker, request) returns the /api/predict response for the request body plus ticker;
+    key(ticker, request) is the store key that /api/predict looks the same request up under.
+    Responses carrying an error are not stored, so those tickers stay on demand.
+    """
+
+    def __init__(self, tickers: Iterable[str], compute: Callable[[str, dict], dict], key: Callable[[str, dict], str],
+                 store: ForecastStore, request: Optional[dict] = None, workers: int = 2,
+                 close: str = '15:30', tz: str = 'Asia/Kolkata', delay_minutes: float = 30, grace_minutes: float = 60,
+                 clock: Callable[[], float] = time.time):
+        self.tickers = list(tickers)
+        self.compute = compute
+        self.key = key
+        self.store = store
+        self.request = dict(request or {})
+        self.workers = max(1, int(workers))
+        self.close, self.tz, self.delay_minutes = close, tz, delay_minutes
+        self.grace = grace_minutes * 60
+        self.clock = clock
+        self.last_run: Dict[str, object] = {}
+
+    def next_run(self) -> float:
+        return next_run(self.clock(), self.close, self.tz, self.delay_minutes)
+
+    def _refresh_one(self, ticker: str, expires_at: float) -> bool:
+        try:
+            with provider_priority(BACKGROUND):
+                result = self.compute(ticker, self.request)
+        except Exception:
+            LOG.exception('precompute failed for %s', ticker)
+            return False
+        if not isinstance(result, dict) or result.get('error') is not None:
+            LOG.warning('precompute for %s returned an error: %s', ticker, (result or {}).get('error'))
+            return False
+        self.store.put(self.key(ticker, self.request), ticker, result, expires_at)
+        return True
+
+    def run_once(self, tickers: Optional[Iterable[str]] = None) -> dict:
+        """Refresh the given tickers (default: the watchlist); results stay valid until the next run is due."""
+        tickers = self.tickers if tickers is None else list(tickers)
+        started = self.clock()
+        # until the next close's refresh has had time to finish
+        expires_at = self.next_run() + self.grace
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='precompute') as pool:
+            ok = sum(pool.map(lambda t: self._refresh_one(t, expires_at), tickers))
+        self.last_run = {'at': started, 'seconds': self.clock() - started, 'tickers': len(tickers),
+                         'stored': ok, 'failed': len(tickers) - ok}
+        LOG.info('precompute refreshed %d/%d tickers in %.1fs', ok, len(tickers), self.last_run['seconds'])
+        return self.last_run
+
+    def stale(self) -> List[str]:
+        """Watchlist tickers without an unexpired forecast."""
+        keys = {self.key(t, self.request): t for t in self.tickers}
+        fresh = self.store.fresh(keys, now=self.clock())
+        return [t for k, t in keys.items() if k not in fresh]
+
+    def run_forever(self, stop: Optional[threading.Event] = None) -> None:
+        """Catch up on stale tickers, then refresh after every close until `stop` is set."""
+        stop = stop or threading.Event()
+        missing = self.stale()
+        if missing:
+            self.run_once(missing)
+        while not stop.is_set():
+            if stop.wait(max(0.0, self.next_run() - self.clock())):
+                break
+            self.run_once()
+
+    def start(self) -> threading.Event:
+        """run_forever() on a daemon thread; set the returned event to stop it."""
+        stop = threading.Event()
+        threading.Thread(target=self.run_forever, args=(stop,), name='precompute', daemon=True).start()
+        return stop
+
+
+def _env_float(name: str, default: float) -> float:
+    return float(os.environ.get(name) or default)
+
+
+def store_from_env() -> ForecastStore:
+    cache_dir = Path(os.environ.get('PRECOMPUTE_DIR') or Path(__file__).with_name('.cache'))
+    return ForecastStore(cache_dir / 'forecasts.sqlite')
+
+
+def scheduler_from_env(compute, key, tickers: Optional[Iterable[str]] = None) -> Scheduler:
+    """A Scheduler configured from the PRECOMPUTE_* and MARKET_* environment variables."""
+    return Scheduler(
+        watchlist_from_env() if tickers is None else tickers, compute, key, store_from_env(),
+        request=request_from_env(),
+        workers=int(os.environ.get('PRECOMPUTE_WORKERS', 2)),
+        close=os.environ.get('MARKET_CLOSE', '15:30'),
+        tz=os.environ.get('MARKET_TZ', 'Asia/Kolkata'),
+        delay_minutes=_env_float('PRECOMPUTE_DELAY_MINUTES', 30),
+        grace_minutes=_env_float('PRECOMPUTE_GRACE_MINUTES', 60),
+    )
+
+
+_LOCK_FILE = None
+
+
+def start_in_process(compute, key) -> Optional[threading.Event]:
+    """Start the scheduler thread in this process unless another process holds the lock file."""
+    global _LOCK_FILE
+    if not watchlist_from_env():
+        return None
+    try:
+        import fcntl
+        store = store_from_env()
+        handle = open(store.path.with_suffix('.lock'), 'w')
+        fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except (ImportError, OSError):
+        return None  # another worker runs it (or no flock on this platform)
+    _LOCK_FILE = handle  # held for the life of the process
+    LOG.info('precompute scheduler running in pid %d', os.getpid())
+    return scheduler_from_env(compute, key).start()
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument('tickers', nargs='*', help='tickers to refresh (default: PRECOMPUTE_WATCHLIST)')
+    ap.add_argument('--once', action='store_true', help='refresh once and exit')
+    args = ap.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+    try:
+        from . import app as _app
+    except ImportError:
+        import app as _app  # type: ignore
+    scheduler = scheduler_from_env(_app.precompute_forecast, _app.precompute_key, args.tickers or None)
+    if not scheduler.tickers:
+        ap.error('no tickers: pass them or set PRECOMPUTE_WATCHLIST')
+    if args.once:
+        summary = scheduler.run_once()
+        print(json.dumps(summary))
+        return 0 if summary['failed'] == 0 else 1
+    scheduler.run_forever()
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
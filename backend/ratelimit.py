@@ -0,0 +1,151 @@
+import heapq
+import itertools
+import logging
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Optional
+
+LOG = logging.getLogger(__name__)
+
+INTERACTIVE = 0
+BACKGROUND = 10
+
+_PRIORITY: ContextVar[int] = ContextVar('provider_priority', default=INTERACTIVE)
+
+
+@contextmanager
+def provider_priority(priority: int):
+    """Run provider calls in this context at the given priority (INTERACTIVE/BACKGROUND)."""
+    token = _PRIORITY.set(priority)
+    try:
+        yield
+    finally:
+        _PRIORITY.reset(token)
+
+
+def current_priority() -> int:
+    return _PRIORITY.get()
+
+
+class RateLimitTimeout(RuntimeError):
+    """Raised when a queued provider call cannot get a token within its deadline."""
+
+
+class RateLimiter:
+    """Token bucket persisted in SQLite so every worker process draws from one quota.
+
+    Each acquisition is a short BEGIN IMMEDIATE transaction, which serializes
+    refill-and-take across processes without a separate lock server.
+    """
+
+    def __init__(self, path, rate_per_minute: float, burst: Optional[float] = None, name: str = 'default'):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.rate = float(rate_per_minute) / 60.0
+        self.capacity = float(burst if burst is not None else rate_per_minute)
+        self.name = name
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS buckets (name TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)'
+            )
+            conn.execute(
+                'INSERT OR IGNORE INTO buckets (name, tokens, updated) VALUES (?, ?, ?)',
+                (self.name, self.capacity, time.time()),
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(str(self.path), timeout=30, isolation_level=None)
+
+    def _update(self, fn):
+        conn = self._connect()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            tokens, updated = conn.execute(
+                'SELECT tokens, updated FROM buckets WHERE name = ?', (self.name,)
+            ).fetchone()
+            now = time.time()
+            tokens = min(self.capacity, tokens + max(0.0, now - updated) * self.rate)
+            tokens, result = fn(tokens)
+            conn.execute('UPDATE buckets SET tokens = ?, updated = ? WHERE name = ?', (tokens, now, self.name))
+            conn.execute('COMMIT')
+            return result
+        except BaseException:
+            if conn.in_transaction:
+                conn.execute('ROLLBACK')
+            raise
+        finally:
+            conn.close()
+
+    def try_acquire(self) -> float:
+        """Take one token. Returns 0.0 on success, else seconds until one is available."""
+        def take(tokens):
+            if tokens >= 1.0:
+                return tokens - 1.0, 0.0
+            return tokens, (1.0 - tokens) / self.rate
+        return self._update(take)
+
+    def penalize(self) -> None:
+        """Empty the bucket after the provider reported its quota exhausted."""
+        self._update(lambda tokens: (min(tokens, 0.0), None))
+
+
+class RequestScheduler:
+    """Per-process queue in front of a RateLimiter.
+
+    Waiting calls are served strictly by (priority, arrival), so interactive
+    requests overtake queued background refreshes. Only the head of the queue
+    polls the shared bucket; everyone else sleeps on the condition.
+    """
+
+    def __init__(self, limiter: RateLimiter, max_wait: Optional[float] = None):
+        self.limiter = limiter
+        self.max_wait = max_wait
+        self._cond = threading.Condition()
+        self._heap: list = []
+        self._seq = itertools.count()
+        self.granted = 0
+        self.waited = 0.0
+
+    def acquire(self, priority: Optional[int] = None, timeout: Optional[float] = None) -> float:
+        """Block until this call may hit the provider. Returns seconds spent queued."""
+        prio = current_priority() if priority is None else priority
+        timeout = self.max_wait if timeout is None else timeout
+        ticket = (prio, next(self._seq))
+        start = time.monotonic()
+        with self._cond:
+            heapq.heappush(self._heap, ticket)
+            try:
+                while True:
+                    remaining = None if timeout is None else timeout - (time.monotonic() - start)
+                    if remaining is not None and remaining <= 0:
+                        raise RateLimitTimeout(f'provider rate limit: no token within {timeout:.0f}s')
+                    if self._heap[0] == ticket:
+                        wait = self.limiter.try_acquire()
+                        if wait <= 0:
+                            waited = time.monotonic() - start
+                            self.granted += 1
+                            self.waited += waited
+                            return waited
+                        # Re-check at least every 0.5s: another process may refill first,
+                        # and a higher-priority caller may arrive meanwhile.
+                        wait = min(wait, 0.5)
+                    else:
+                        wait = 0.5
+                    self._cond.wait(wait if remaining is None else min(wait, remaining))
+            finally:
+                self._heap.remove(ticket)
+                heapq.heapify(self._heap)
+                self._cond.notify_all()
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                'queued': len(self._heap),
+                'granted': self.granted,
+                'avg_wait_s': (self.waited / self.granted) if self.granted else None,
+            }
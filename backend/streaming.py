@@ -0,0 +1,538 @@
+"""Incremental (streaming) version of features.compute_technical_indicators.
+
+StreamingIndicators keeps per-indicator state (running window sums, Welford
+moments, EMA accumulators, Wilder smoothing, monotonic min/max deques) and
+produces the indicator row for a new bar in constant time, independent of how
+much history it has seen:
+
+    engine = StreamingIndicators.from_frame(hist)      # replay history once
+    row = engine.update(open=..., high=..., low=..., close=..., volume=...)
+
+Rows match compute_technical_indicators on the same bars to floating-point
+tolerance (see tests/test_streaming.py). The one deliberate difference is in
+ADX/DI: `ta` returns NaN for the whole column when a series has fewer than 28
+bars, whereas the engine always follows the long-series convention (0.0
+during warm-up). Bars must have a finite close; the NaN-skipping window
+semantics pandas applies to gaps are not reproduced.
+"""
+import copy
+import math
+from collections import deque
+from typing import Mapping, Optional
+
+import numpy as np
+import pandas as pd
+
+NAN = float('nan')
+INF = float('inf')
+
+try:
+    from .features import INDICATOR_COLUMNS as COLUMNS, INT_INDICATOR_COLUMNS as INT_COLUMNS
+except Exception:
+    from features import INDICATOR_COLUMNS as COLUMNS, INT_INDICATOR_COLUMNS as INT_COLUMNS  # type: ignore
+
+
+def _div(a: float, b: float) -> float:
+    """a / b with NumPy semantics (x/0 -> ±inf, 0/0 -> nan) instead of ZeroDivisionError."""
+    try:
+        return a / b
+    except ZeroDivisionError:
+        if a != a or a == 0:
+            return NAN
+        return math.copysign(INF, a) * math.copysign(1.0, b)
+
+
+def _ewm_alpha(span: Optional[float] = None, alpha: Optional[float] = None) -> float:
+    # Derive alpha the way pandas does (via center of mass) so the recursion agrees bit for bit
+    com = (span - 1) / 2.0 if span is not None else 1.0 / alpha - 1.0
+    return 1.0 / (1.0 + com)
+
+
+class _Ewm:
+    """pandas ewm(adjust=False).mean() over a stream with no gaps."""
+
+    __slots__ = ('_old', '_new', '_norm', 'min_periods', 'n', 'value')
+
+    def __init__(self, span=None, alpha=None, min_periods: int = 0):
+        a = _ewm_alpha(span, alpha)
+        self._old, self._new = 1.0 - a, a
+        self._norm = self._old + a
+        self.min_periods = min_periods
+        self.n = 0
+        self.value = NAN
+
+    def add(self, x: float) -> float:
+        self.value = x if self.n == 0 else (self._old * self.value + self._new * x) / self._norm
+        self.n += 1
+        return self.value if self.n >= self.min_periods else NAN
+
+
+class _RollingSum:
+    """Fixed-window sum; exact 0.0 when every value in the window is zero."""
+
+    __slots__ = ('window', '_buf', 'total', '_nonzero', '_since_refresh')
+
+    def __init__(self, window: int):
+        self.window = window
+        self._buf = deque(maxlen=window)
+        self.total = 0.0
+        self._nonzero = 0
+        self._since_refresh = 0
+
+    def add(self, x: float) -> None:
+        buf = self._buf
+        if len(buf) == self.window:
+            old = buf[0]
+            self.total -= old
+            if old != 0:
+                self._nonzero -= 1
+        buf.append(x)
+        self.total += x
+        if x != 0:
+            self._nonzero += 1
+        # Re-sum once per window length so rounding error cannot accumulate (amortized O(1))
+        self._since_refresh += 1
+        if self._since_refresh >= self.window:
+            self.total = math.fsum(buf)
+            self._since_refresh = 0
+
+    @property
+    def count(self) -> int:
+        return len(self._buf)
+
+    def sum(self) -> float:
+        return self.total if self._nonzero else 0.0
+
+
+class _RollingMoments:
+    """Fixed-window mean and population variance via Welford add/remove (as pandas roll_var)."""
+
+    __slots__ = ('window', 'buf', 'mean', '_ssqdm', '_same', '_since_refresh')
+
+    def __init__(self, window: int):
+        self.window = window
+        self.buf = deque(maxlen=window)
+        self.mean = 0.0
+        self._ssqdm = 0.0
+        self._same = 0
+        self._since_refresh = 0
+
+    def add(self, x: float) -> None:
+        buf = self.buf
+        self._same = self._same + 1 if buf and buf[-1] == x else 1
+        if len(buf) == self.window:
+            old = buf[0]
+            n = len(buf) - 1
+            if n:
+                delta = old - self.mean
+                self.mean -= delta / n
+                self._ssqdm -= ((n + 1) * delta * delta) / n
+            else:
+                self.mean = self._ssqdm = 0.0
+        buf.append(x)
+        n = len(buf)
+        delta = x - self.mean
+        self.mean += delta / n
+        self._ssqdm += ((n - 1) * delta * delta) / n
+        self._since_refresh += 1
+        if self._since_refresh >= self.window:
+            self.mean = math.fsum(buf) / n
+            self._ssqdm = math.fsum((v - self.mean) ** 2 for v in buf)
+            self._since_refresh = 0
+
+    @property
+    def count(self) -> int:
+        return len(self.buf)
+
+    @property
+    def constant(self) -> bool:
+        return self._same >= len(self.buf)
+
+    def var(self) -> float:
+        if self.constant:
+            return 0.0
+        return max(self._ssqdm / len(self.buf), 0.0)
+
+
+class _MonotonicExtreme:
+    """Rolling max (or min) over the last `window` values with a monotonic deque."""
+
+    __slots__ = ('window', 'is_max', '_q', '_i')
+
+    def __init__(self, window: int, is_max: bool):
+        self.window = window
+        self.is_max = is_max
+        self._q = deque()
+        self._i = 0
+
+    def add(self, x: float) -> float:
+        q = self._q
+        if self.is_max:
+            while q and q[-1][1] <= x:
+                q.pop()
+        else:
+            while q and q[-1][1] >= x:
+                q.pop()
+        q.append((self._i, x))
+        if q[0][0] <= self._i - self.window:
+            q.popleft()
+        self._i += 1
+        return q[0][1]
+
+
+class _RollingCorr:
+    """rolling(window, min_periods).corr() over pairwise-complete observations, from running sums."""
+
+    __slots__ = ('window', 'min_periods', '_buf', '_sums', '_since_refresh')
+
+    def __init__(self, window: int, min_periods: int):
+        self.window = window
+        self.min_periods = min_periods
+        self._buf = deque(maxlen=window)
+        self._sums = [0, 0.0, 0.0, 0.0, 0.0, 0.0]  # n, x, y, xx, yy, xy
+        self._since_refresh = 0
+
+    def add(self, x: float, y: float) -> float:
+        buf, s = self._buf, self._sums
+        if len(buf) == self.window:
+            ox, oy = buf[0]
+            if ox == ox and oy == oy:
+                s[0] -= 1
+                s[1] -= ox
+                s[2] -= oy
+                s[3] -= ox * ox
+                s[4] -= oy * oy
+                s[5] -= ox * oy
+        buf.append((x, y))
+        if x == x and y == y:
+            s[0] += 1
+            s[1] += x
+            s[2] += y
+            s[3] += x * x
+            s[4] += y * y
+            s[5] += x * y
+        self._since_refresh += 1
+        if self._since_refresh >= self.window:
+            pairs = [(a, b) for a, b in buf if a == a and b == b]
+            self._sums = s = [len(pairs), math.fsum(a for a, _ in pairs), math.fsum(b for _, b in pairs),
+                              math.fsum(a * a for a, _ in pairs), math.fsum(b * b for _, b in pairs),
+                              math.fsum(a * b for a, b in pairs)]
+            self._since_refresh = 0
+        n = s[0]
+        if n < self.min_periods:
+            return NAN
+        cov = s[5] - s[1] * s[2] / n
+        var_x = s[3] - s[1] * s[1] / n
+        var_y = s[4] - s[2] * s[2] / n
+        if var_x <= 0 or var_y <= 0:
+            return NAN
+        return cov / math.sqrt(var_x * var_y)
+
+
+class _Adx:
+    """ta.trend.ADXIndicator (fillna=False) as a recurrence, including its warm-up conventions."""
+
+    __slots__ = ('w', 'n', 'trs', 'dip', 'din', 'adx', '_dx_warm')
+
+    def __init__(self, window: int = 14):
+        self.w = window
+        self.n = 0
+        self.trs = self.dip = self.din = 0.0
+        self.adx = 0.0
+        self._dx_warm = []
+
+    def add(self, high, low, prev_close, prev_high, prev_low):
+        """Returns (adx, +DI, -DI) for the bar just added."""
+        w, b = self.w, self.n
+        self.n += 1
+        if b == 0:
+            return 0.0, 0.0, 0.0
+        tr = max(high, prev_close) - min(low, prev_close)
+        up, down = high - prev_high, prev_low - low
+        pos = up if (up > down and up > 0) else 0.0
+        neg = down if (down > up and down > 0) else 0.0
+        if b <= w:
+            # ta seeds the smoothing with the plain sum of bars 1..w
+            self.trs += tr
+            self.dip += pos
+            self.din += neg
+            if b < w:
+                return 0.0, 0.0, 0.0
+        else:
+            self.trs = self.trs - (self.trs / float(w)) + tr
+            self.dip = self.dip - (self.dip / float(w)) + pos
+            self.din = self.din - (self.din / float(w)) + neg
+        if self.trs != 0:
+            di_pos = 100 * (self.dip / self.trs)
+            di_neg = 100 * (self.din / self.trs)
+        else:
+            di_pos = di_neg = 0.0
+        dx = 100 * abs((di_pos - di_neg) / (di_pos + di_neg)) if di_pos + di_neg != 0 else 0.0
+        if b < 2 * w - 1:
+            self._dx_warm.append(dx)
+        elif b == 2 * w - 1:
+            self._dx_warm.append(dx)
+            self.adx = float(np.mean(self._dx_warm))
+            self._dx_warm = []
+        else:
+            self.adx = ((self.adx * (w - 1)) + dx) / float(w)
+        if b == w:
+            # ta leaves +DI/-DI at 0 on the seed bar itself
+            return self.adx, 0.0, 0.0
+        return self.adx, di_pos, di_neg
+
+
+class StreamingIndicators:
+    """O(1)-per-bar equivalent of compute_technical_indicators.
+
+    volume / market_index / candles mirror the optional branches of the batch
+    function: pass False when the source frame has no volume column, no
+    market_index column, or lacks any of open/high/low.
+    """
+
+    columns = COLUMNS
+
+    def __init__(self, volume: bool = True, market_index: bool = False, candles: bool = True):
+        self.has_volume = volume
+        self.has_market_index = market_index
+        self.has_candles = candles
+        self.n = 0
+        self._closes = deque(maxlen=11)
+        self._prev = None  # (open, high, low, close, market_index, typical price)
+        self._prev_support = self._prev_resistance = NAN
+        self._sma = {w: _RollingMoments(w) for w in (5, 10, 20, 50)}
+        self._ema = {w: _Ewm(span=w, min_periods=w) for w in (12, 20, 26, 50)}
+        self._signal = _Ewm(span=9)
+        self._rsi_up = _Ewm(alpha=1 / 14, min_periods=14)
+        self._rsi_dn = _Ewm(alpha=1 / 14, min_periods=14)
+        self._atr = _Ewm(span=14, min_periods=14)
+        self._adx = _Adx(14)
+        self._low14 = _MonotonicExtreme(14, is_max=False)
+        self._high14 = _MonotonicExtreme(14, is_max=True)
+        self._support = _MonotonicExtreme(20, is_max=False)
+        self._resistance = _MonotonicExtreme(20, is_max=True)
+        self._stoch_k = deque(maxlen=3)
+        self._vol20 = _RollingSum(20)
+        self._pos_flow = _RollingSum(14)
+        self._neg_flow = _RollingSum(14)
+        self._obv = 0.0
+        self._corr = _RollingCorr(20, min_periods=10)
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> 'StreamingIndicators':
+        """Engine configured like compute_technical_indicators would be for df, warmed up on its bars."""
+        engine = cls.for_columns(df.columns)
+        engine.replay(df)
+        return engine
+
+    @classmethod
+    def for_columns(cls, columns) -> 'StreamingIndicators':
+        cols = {str(c).lower() for c in columns}
+        return cls(volume='volume' in cols, market_index='market_index' in cols,
+                   candles={'open', 'high', 'low', 'close'} <= cols)
+
+    def replay(self, df: pd.DataFrame, collect: bool = False):
+        """Feed every row of df; with collect=True return the indicator rows as a list of dicts."""
+        frame = df.rename(columns={c: str(c).lower() for c in df.columns})
+        # Plain Python floats: much faster than NumPy scalars one at a time
+        close = pd.to_numeric(frame['close'], errors='coerce').astype(float).tolist()
+        n = len(close)
+
+        def col(name, default):
+            if name in frame.columns:
+                return pd.to_numeric(frame[name], errors='coerce').astype(float).tolist()
+            return default
+
+        open_, high, low = col('open', close), col('high', close), col('low', close)
+        volume = col('volume', [0.0] * n)
+        market = col('market_index', [NAN] * n)
+        update = self.update
+        if collect:
+            return [update(*bar) for bar in zip(open_, high, low, close, volume, market)]
+        for bar in zip(open_, high, low, close, volume, market):
+            update(*bar)
+        return None
+
+    def push(self, bar: Mapping) -> dict:
+        """update() from a mapping with (case-insensitive) open/high/low/close/volume/market_index keys."""
+        bar = {str(k).lower(): v for k, v in bar.items()}
+        close = float(bar['close'])
+        return self.update(
+            float(bar.get('open', close)), float(bar.get('high', close)), float(bar.get('low', close)), close,
+            float(bar.get('volume', 0.0) or 0.0), float(bar.get('market_index', NAN)),
+        )
+
+    def copy(self) -> 'StreamingIndicators':
+        """Independent copy, e.g. to branch a forecast off the live state."""
+        return copy.deepcopy(self)
+
+    def update(self, open: float, high: float, low: float, close: float,
+               volume: float = 0.0, market_index: float = NAN) -> dict:
+        """Advance by one bar and return its indicator values keyed by column name."""
+        if not math.isfinite(close):
+            raise ValueError('StreamingIndicators needs a finite close for every bar')
+        prev = self._prev
+        pc = prev[3] if prev else NAN
+        self._closes.append(close)
+        closes = self._closes
+
+        # Moving averages, MACD
+        sma = {}
+        for w, mom in self._sma.items():
+            mom.add(close)
+            sma[w] = (close if mom.constant else mom.mean) if mom.count >= w else NAN
+        ema = self._ema
+        ema12, ema20, ema26, ema50 = ema[12].add(close), ema[20].add(close), ema[26].add(close), ema[50].add(close)
+        macd = ema12 - ema26
+        signal = self._signal.add(macd) if macd == macd else NAN
+        macd_hist = macd - signal
+
+        # RSI (ta: first diff counts as 0.0 for both directions)
+        diff = close - pc if prev else 0.0
+        up = self._rsi_up.add(diff if diff > 0 else 0.0)
+        dn = self._rsi_dn.add(-diff if diff < 0 else 0.0)
+        if dn != dn:
+            rsi = NAN
+        elif dn == 0:
+            rsi = 100.0
+        else:
+            rsi = 100 - (100 / (1 + up / dn))
+
+        # Bollinger bands and rolling dispersion
+        m20, m10 = self._sma[20], self._sma[10]
+        std20 = math.sqrt(m20.var()) if m20.count >= 20 else NAN
+        bb_upper, bb_lower = sma[20] + 2 * std20, sma[20] - 2 * std20
+        bb_width = (bb_upper - bb_lower) / sma[20] if sma[20] != 0 else NAN
+        rolling_std_10 = math.sqrt(m10.var()) if m10.count >= 5 else NAN
+        rolling_std_20 = math.sqrt(m20.var()) if m20.count >= 10 else NAN
+        skew, kurt = self._skew_kurt(m10) if m10.count >= 10 else (NAN, NAN)
+        zscore = _div(close - sma[10], rolling_std_10) if rolling_std_10 != 0 else NAN
+
+        # Stochastic
+        ll, hh = self._low14.add(low), self._high14.add(high)
+        if self.n >= 13 and hh - ll != 0:
+            stoch_k = (close - ll) / (hh - ll) * 100.0
+        else:
+            stoch_k = NAN
+        ks = self._stoch_k
+        ks.append(stoch_k)
+        stoch_d = (ks[0] + ks[1] + ks[2]) / 3 if len(ks) == 3 else NAN  # NaN in any of the three propagates
+
+        # ADX / DI, true range, ATR
+        adx, di_pos, di_neg = self._adx.add(high, low, pc, prev[1] if prev else NAN, prev[2] if prev else NAN)
+        tr = max(high - low, abs(high - pc), abs(low - pc)) if prev else high - low
+        atr = self._atr.add(tr)
+
+        # Volume
+        tp = (high + low + close) / 3.0
+        if self.has_volume:
+            self._vol20.add(volume)
+            vol_sma = self._vol20.sum() / 20 if self._vol20.count >= 20 else NAN
+            volume_spike = _div(volume, vol_sma)
+            if prev:
+                self._obv += (1.0 if close > pc else -1.0 if close < pc else 0.0) * volume
+                obv = self._obv
+            else:
+                obv = NAN
+            mf = tp * volume
+            tp_prev = prev[5] if prev else NAN
+            self._pos_flow.add(mf if tp > tp_prev else 0.0)
+            self._neg_flow.add(mf if tp < tp_prev else 0.0)
+            if self._pos_flow.count >= 14:
+                mfi = 100 - (100 / (1 + _div(self._pos_flow.sum(), self._neg_flow.sum())))
+            else:
+                mfi = NAN
+        else:
+            vol_sma = volume_spike = obv = mfi = NAN
+
+        # Support / resistance
+        support, resistance = self._support.add(close), self._resistance.add(close)
+        breakout = int(close > self._prev_resistance)
+        breakdown = int(close < self._prev_support)
+        self._prev_support, self._prev_resistance = support, resistance
+
+        # Lags and returns
+        k = len(closes)
+        lag1 = closes[-2] if k > 1 else NAN
+        lag3 = closes[-4] if k > 3 else NAN
+        lag5 = closes[-6] if k > 5 else NAN
+        lag10 = closes[-11] if k > 10 else NAN
+
+        # Candles
+        if self.has_candles:
+            body = abs(close - open)
+            rng = high - low
+            doji = int(rng != 0 and body / rng < 0.1)
+            if prev:
+                lo_prev, hi_prev = min(prev[0], prev[3]), max(prev[0], prev[3])
+                lo_cur, hi_cur = min(open, close), max(open, close)
+                engulf = lo_cur <= lo_prev and hi_cur >= hi_prev
+                bull, bear = int(close > open and engulf), int(close < open and engulf)
+            else:
+                bull = bear = 0
+        else:
+            doji = bull = bear = 0
+
+        # Correlation of returns with the market index
+        corr = NAN
+        if self.has_market_index:
+            r_asset = _div(close, pc) - 1.0 if prev else NAN
+            r_index = _div(market_index, prev[4]) - 1.0 if prev else NAN
+            corr = self._corr.add(r_asset, r_index)
+
+        self._prev = (open, high, low, close, market_index, tp)
+        self.n += 1
+        return {
+            'sma_5': sma[5], 'sma_10': sma[10], 'sma_20': sma[20], 'sma_50': sma[50],
+            'ema_12': ema12, 'ema_20': ema20, 'ema_26': ema26, 'ema_50': ema50,
+            'macd': macd, 'macd_signal': signal, 'macd_hist': macd_hist, 'rsi_14': rsi,
+            'bb_mid': sma[20], 'bb_upper': bb_upper, 'bb_lower': bb_lower, 'bb_width': bb_width,
+            'stoch_k_14': stoch_k, 'stoch_d_3': stoch_d, 'stoch_k': stoch_k, 'stoch_d': stoch_d,
+            'adx_14': adx, 'plus_di_14': di_pos, 'minus_di_14': di_neg, 'di_pos_14': di_pos, 'di_neg_14': di_neg,
+            'tr': tr, 'atr_14': atr,
+            'vol_sma_20': vol_sma, 'volume_spike': volume_spike, 'vol_spike': volume_spike, 'obv': obv, 'mfi_14': mfi,
+            'support_20': support, 'resistance_20': resistance, 'breakout': breakout, 'breakdown': breakdown,
+            'close_lag_1': lag1, 'close_lag_3': lag3, 'close_lag_5': lag5, 'close_lag_10': lag10,
+            'ret_1': _div(close, lag1) - 1.0, 'ret_5': _div(close, lag5) - 1.0,
+            'lag_1': lag1, 'lag_3': lag3, 'lag_5': lag5, 'lag_10': lag10,
+            'hl_pct': _div(high - low, open) * 100.0, 'co_pct': _div(close - open, open) * 100.0,
+            'cp_pct': _div(close - pc, pc) * 100.0,
+            'rolling_std_10': rolling_std_10, 'rolling_std_20': rolling_std_20,
+            'rolling_skew_10': skew, 'rolling_kurt_10': kurt, 'rolling_zscore_10': zscore,
+            'doji': doji, 'bull_engulf': bull, 'bear_engulf': bear,
+            'corr_with_index_20': corr, 'regime_trend': int(adx >= 25),
+        }
+
+    @staticmethod
+    def _skew_kurt(mom: _RollingMoments):
+        # Bias-corrected sample skewness/excess kurtosis (pandas rolling().skew()/.kurt());
+        # a 10-value window is cheap to take in two passes, which avoids power-sum cancellation.
+        if mom.constant:
+            return 0.0, -3.0
+        vals = mom.buf
+        n = len(vals)
+        mean = math.fsum(vals) / n
+        m2 = m3 = m4 = 0.0
+        for v in vals:
+            d = v - mean
+            d2 = d * d
+            m2 += d2
+            m3 += d2 * d
+            m4 += d2 * d2
+        m2, m3, m4 = m2 / n, m3 / n, m4 / n
+        if m2 <= 0:
+            return NAN, NAN
+        skew = math.sqrt(n * (n - 1)) * m3 / ((n - 2) * m2 ** 1.5)
+        kurt = ((n * n - 1) * m4 / (m2 * m2) - 3 * (n - 1) ** 2) / ((n - 2) * (n - 3))
+        return skew, kurt
+
+
+def streaming_indicators_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """compute_technical_indicators-shaped frame produced by replaying df through the engine."""
+    engine = StreamingIndicators.for_columns(df.columns)
+    rows = engine.replay(df, collect=True)
+    out = df.rename(columns={c: str(c).lower() for c in df.columns})
+    ind = pd.DataFrame.from_records(rows, index=out.index, columns=list(COLUMNS))
+    for c in INT_COLUMNS:
+        ind[c] = ind[c].astype(int)
+    return pd.concat([out, ind], axis=1)
@@ -58,4 +58,164 @@ def test_manual_mode_prediction(client):
     data = resp.get_json()
     assert isinstance(data['ticker'], str) and len(data['ticker']) > 0
     assert isinstance(data['predictions'], list)
-    assert len(data['predictions']) == 4
\ No newline at end of file
+    assert len(data['predictions']) == 4
+
+def test_cache_stats(client):
+    resp = client.get('/api/cache/stats')
+    assert resp.status_code == 200
+    stats = resp.get_json()['provider']
+    for k in ('hits', 'misses', 'coalesced', 'size', 'maxsize'):
+        assert k in stats
+
+
+def _synthetic_history(n=200, seed=0):
+    import numpy as np
+    import pandas as pd
+    rng = np.random.default_rng(seed)
+    close = 100 + rng.normal(0, 1, n).cumsum()
+    return pd.DataFrame({
+        'open': close - 0.2, 'high': close + 1, 'low': close - 1, 'close': close,
+        'volume': rng.integers(1000, 5000, n).astype(float),
+    }, index=pd.date_range('2023-01-01', periods=n, freq='D'))
+
+
+def test_predict_batch_streams_per_ticker_results(client, monkeypatch):
+    import app as app_module
+    import training
+
+    def fake_history(ticker, **kwargs):
+        if ticker == 'MISSING':
+            raise RuntimeError('unknown symbol')
+        return _synthetic_history(seed=len(ticker))
+
+    monkeypatch.setattr(app_module, 'fetch_history', fake_history)
+    monkeypatch.setattr(app_module, 'fetch_fundamentals_av',
+                        lambda ticker, api_key=None: {'eps': 10.0, 'pe': 20.0, 'peg': 1.5, 'pb': 3.0})
+    monkeypatch.setenv('TRAIN_WORKERS', '2')
+    pool = training.training_executor()
+    before = pool.stats()
+    payload = {"tickers": ["TCS", "INFY", "MISSING", "tcs"], "days": 3, "market_ticker": "^NSEI"}
+    resp = client.post('/api/predict/batch', data=json.dumps(payload), content_type='application/json')
+    assert resp.status_code == 200
+    assert resp.mimetype == 'application/x-ndjson'
+    rows = [json.loads(line) for line in resp.get_data(as_text=True).splitlines() if line]
+    by_ticker = {r['ticker']: r for r in rows}
+    assert set(by_ticker) == {"TCS", "INFY", "MISSING"}
+    assert len(by_ticker['TCS']['predictions']) == 3 and by_ticker['TCS']['error'] is None
+    assert by_ticker['MISSING']['predictions'] == [] and by_ticker['MISSING']['error']
+
+    # both fits trained on the pool, rather than falling back to the drift projection
+    after = pool.stats()
+    assert after['completed'] - before['completed'] == 2 and after['failed'] == before['failed']
+    drift, _ = app_module._fallback_prices(fake_history('TCS'), 3)
+    assert [p['price'] for p in by_ticker['TCS']['predictions']] != pytest.approx(drift, abs=0.01)
+
+    resp = client.post('/api/predict/batch', data=json.dumps({**payload, "stream": False}), content_type='application/json')
+    assert resp.status_code == 200
+    assert resp.get_json()['count'] == 3
+
+
+def test_predict_batch_requires_tickers(client):
+    resp = client.post('/api/predict/batch', data=json.dumps({"tickers": []}), content_type='application/json')
+    assert resp.status_code == 400
+
+
+def test_predict_reports_stage_timings(client, monkeypatch):
+    import app as app_module
+
+    monkeypatch.setattr(app_module, 'fetch_history', lambda ticker, **kwargs: _synthetic_history())
+    monkeypatch.setattr(app_module, 'fetch_fundamentals_av', lambda ticker, api_key=None: {})
+    resp = client.post('/api/predict', json={"ticker": "TCS", "days": 2})
+    assert resp.status_code == 200
+    header = resp.headers['Server-Timing']
+    assert 'history;dur=' in header and 'indicators;dur=' in header and 'total;dur=' in header
+    assert 'timings' not in resp.get_json()
+
+    resp = client.post('/api/predict?timings=1', json={"ticker": "TCS", "days": 2})
+    timings = resp.get_json()['timings']
+    assert {'history', 'indicators', 'fundamentals', 'total'} <= set(timings)
+    assert 'model' in timings or 'fallback' in timings
+    assert all(v >= 0 for v in timings.values())
+
+
+def test_screen_returns_latest_indicators_per_ticker(client, monkeypatch):
+    import app as app_module
+
+    def fake_history(ticker, **kwargs):
+        if ticker == 'MISSING':
+            raise RuntimeError('unknown symbol')
+        return _synthetic_history(n=100 + 10 * len(ticker), seed=len(ticker))
+
+    monkeypatch.setattr(app_module, 'fetch_history', fake_history)
+    payload = {"tickers": ["TCS", "RELIANCE", "MISSING"], "columns": ["rsi_14", "macd_hist"]}
+    resp = client.post('/api/screen', json=payload)
+    assert resp.status_code == 200
+    data = resp.get_json()
+    assert data['count'] == 2 and [e['ticker'] for e in data['errors']] == ['MISSING']
+    row = next(r for r in data['rows'] if r['ticker'] == 'RELIANCE')
+    expected = app_module.compute_technical_indicators(fake_history('RELIANCE'))
+    assert row['rsi_14'] == pytest.approx(expected['rsi_14'].iloc[-1])
+    assert row['macd_hist'] == pytest.approx(expected['macd_hist'].iloc[-1])
+    assert row['date'].startswith(str(expected.index[-1].date()))
+
+    assert client.post('/api/screen', json={"tickers": ["TCS"], "columns": ["nope"]}).status_code == 400
+
+
+def test_features_columns_counts_the_training_rows(client, monkeypatch):
+    import app as app_module
+    from features import assemble_features, valid_rows
+
+    hist = _synthetic_history(n=300)
+    index = _synthetic_history(n=300, seed=9)
+    fundamentals = {'eps': 10.0, 'pe': 20.0, 'peg': 1.5, 'pb': 3.0}
+    monkeypatch.setattr(app_module, 'fetch_history', lambda ticker, **kwargs: index if ticker == '^NSEI' else hist)
+    monkeypatch.setattr(app_module, 'fetch_fundamentals_av', lambda ticker, api_key=None: dict(fundamentals))
+    feats = assemble_features(hist, {**fundamentals, 'market_index': index['close']}, compact=True)
+    feats['target'] = feats['close'].shift(-1)
+    valid = int(valid_rows(feats).sum())
+    assert valid > 100
+
+    body = {"ticker": "COLS", "market_ticker": "^NSEI"}
+    data = client.post('/api/features-columns', json=body).get_json()
+    assert data['rows'] == valid and data['count'] == len(data['columns'])
+    assert 'target' not in data['columns']
+    data = client.post('/api/features-columns', json={**body, "window": 100}).get_json()
+    assert data['rows'] == 100
+
+
+def test_concurrent_predictions_keep_their_own_params(monkeypatch):
+    import threading
+    from concurrent.futures import ThreadPoolExecutor
+
+    import app as app_module
+
+    # both requests are in the route before either one starts predicting, and both fit at once
+    both_started = threading.Barrier(2, timeout=10)
+    both_fitting = threading.Barrier(2, timeout=10)
+    load_and_predict = app_module.load_and_predict
+
+    def start_together(*args, **kwargs):
+        both_started.wait()
+        return load_and_predict(*args, **kwargs)
+
+    def fake_fit(df, fundamentals, steps=5, model_type='ridge', ridge_alpha=1.0, **kwargs):
+        both_fitting.wait()
+        return [ridge_alpha] * steps
+
+    monkeypatch.setattr(app_module, 'load_and_predict', start_together)
+
+    monkeypatch.setattr(app_module, 'fetch_history', lambda ticker, **kwargs: _synthetic_history(seed=len(ticker)))
+    monkeypatch.setattr(app_module, 'fetch_fundamentals_av', lambda ticker, api_key=None: {})
+    monkeypatch.setattr(app_module, 'train_and_predict_ml', fake_fit)
+    monkeypatch.setenv('TRAIN_WORKERS', '0')
+
+    def predict(alpha):
+        with app.test_client() as client:
+            body = {"ticker": f"T{alpha}", "days": 2, "model": {"type": "ridge", "alpha": alpha}}
+            return client.post('/api/predict', json=body).get_json()
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        results = list(pool.map(predict, [2.0, 7.0]))
+    for alpha, result in zip([2.0, 7.0], results):
+        assert result['ticker'] == f'T{alpha}'
+        assert [p['price'] for p in result['predictions']] == [alpha, alpha]
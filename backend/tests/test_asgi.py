@@ -0,0 +1,108 @@
+import asyncio
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import app as app_module
+import asgi
+
+
+def _call(method, path, body=None, headers=()):
+    """Drive the ASGI app once and return (status, headers, decoded JSON body)."""
+    messages = [{'type': 'http.request', 'body': json.dumps(body).encode() if body is not None else b'', 'more_body': False}]
+    sent = []
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {'type': 'http', 'method': method, 'path': path, 'headers': list(headers)}
+    asyncio.run(asgi.app(scope, receive, send))
+    start, body_msg = sent
+    raw = body_msg['body']
+    return start['status'], dict(start['headers']), (json.loads(raw) if raw else None)
+
+
+@pytest.fixture
+def fake_provider(monkeypatch):
+    rng = np.random.default_rng(1)
+    close = 100 + rng.normal(0, 1, 150).cumsum()
+    hist = pd.DataFrame({'open': close, 'high': close + 1, 'low': close - 1, 'close': close,
+                         'volume': np.full(150, 1000.0)},
+                        index=pd.date_range('2024-01-01', periods=150, freq='D'))
+
+    def fake_history(ticker, return_metadata=False, **kwargs):
+        return (hist, {'provider': 'fake'}) if return_metadata else hist
+
+    monkeypatch.setattr(app_module, 'fetch_history', fake_history)
+    monkeypatch.setattr(app_module, 'fetch_fundamentals_av', lambda ticker, api_key=None: {})
+    monkeypatch.setenv('TRAIN_WORKERS', '0')
+    return hist
+
+
+def test_health_and_unknown_route():
+    status, _, data = _call('GET', '/health')
+    assert status == 200 and data['status'] == 'healthy'
+    assert _call('GET', '/nope')[0] == 404
+    assert _call('GET', '/api/predict')[0] == 405
+
+
+def test_history_and_indicators(fake_provider):
+    status, headers, data = _call('POST', '/api/history', {'ticker': 'tcs', 'limit': 5},
+                                  headers=[(b'origin', b'http://localhost:5173')])
+    assert status == 200
+    assert data['provider'] == 'fake' and len(data['rows']) == 5
+    assert headers[b'access-control-allow-origin'] == b'http://localhost:5173'
+
+    status, _, data = _call('POST', '/api/indicators', {'ticker': 'tcs', 'limit': 3})
+    assert status == 200 and len(data['rows']) == 3 and 'rsi_14' in data['rows'][-1]
+
+
+def test_predict_auto_and_validation(fake_provider):
+    status, _, data = _call('POST', '/api/predict', {'ticker': 'TCS', 'days': 3})
+    assert status == 200
+    assert len(data['predictions']) == 3
+    assert data['indicators_latest']['close'] == pytest.approx(float(fake_provider['close'].iloc[-1]))
+    assert _call('POST', '/api/predict', {'days': 3})[0] == 400
+
+
+def test_server_timing_header_and_opt_in_breakdown(fake_provider):
+    status, headers, data = _call('POST', '/api/indicators', {'ticker': 'TCS', 'limit': 3})
+    assert status == 200 and 'timings' not in data
+    timing = headers[b'server-timing'].decode()
+    assert 'history;dur=' in timing and 'indicators;dur=' in timing and 'total;dur=' in timing
+
+    status, _, data = _call('POST', '/api/predict', {'ticker': 'TCS', 'days': 2, 'timings': True})
+    assert status == 200
+    assert {'history', 'indicators', 'fundamentals', 'model', 'total'} <= set(data['timings'])
+
+
+def test_batch_streams_ndjson_and_shared_routes(fake_provider):
+    messages = [{'type': 'http.request', 'body': json.dumps({'tickers': ['TCS', 'INFY'], 'days': 2}).encode()}]
+    sent = []
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {'type': 'http', 'method': 'POST', 'path': '/api/predict/batch', 'headers': []}
+    asyncio.run(asgi.app(scope, receive, send))
+    assert sent[0]['status'] == 200 and dict(sent[0]['headers'])[b'content-type'] == b'application/x-ndjson'
+    rows = [json.loads(line) for m in sent[1:] for line in m['body'].decode().splitlines()]
+    assert sorted(r['ticker'] for r in rows) == ['INFY', 'TCS']
+    assert all(len(r['predictions']) == 2 and r['error'] is None for r in rows)
+    assert not sent[-1].get('more_body')
+
+    status, _, data = _call('POST', '/api/predict/batch', {'tickers': ['TCS'], 'stream': False})
+    assert status == 200 and data['count'] == 1
+    status, _, data = _call('POST', '/api/screen', {'tickers': ['TCS', 'INFY'], 'columns': ['rsi_14']})
+    assert status == 200 and data['count'] == 2
+    assert _call('POST', '/api/screen', {'tickers': []})[0] == 400
+    status, _, data = _call('POST', '/api/features-columns', {'ticker': 'TCS'})
+    assert status == 200 and 'rsi_14' in data['columns']
@@ -0,0 +1,87 @@
+import threading
+import time
+from datetime import datetime
+
+import pytest
+
+from cache import TTLCache
+from config import seconds_until_next_bar
+
+
+class _Clock:
+    def __init__(self):
+        self.t = 0.0
+
+    def __call__(self):
+        return self.t
+
+
+def test_ttl_expiry_and_lru_eviction():
+    clock = _Clock()
+    c = TTLCache(maxsize=2, clock=clock)
+    c.set('a', 1, ttl=10)
+    c.set('b', 2)
+    assert c.get('a') == 1  # 'a' becomes most recent
+    c.set('c', 3)  # evicts 'b'
+    assert c.get('b') is None
+    clock.t = 11
+    assert c.get('a') is None
+    s = c.stats()
+    assert s['evictions'] == 1 and s['expirations'] == 1
+
+
+def test_byte_budget_evicts_least_recently_used():
+    c = TTLCache(maxsize=100, maxbytes=10, sizeof=len)
+    c.set('a', 'xxxx')
+    c.set('b', 'yyyy')
+    assert c.get('a') == 'xxxx'
+    c.set('c', 'zzzz')  # 12 bytes > 10: evicts 'b', the least recently used
+    assert c.get('b') is None and c.stats()['bytes'] == 8
+    c.set('big', 'w' * 11)  # larger than the whole budget: not stored, nothing evicted
+    assert c.get('big') is None and c.get('a') == 'xxxx'
+    c.invalidate('a')
+    assert c.nbytes == 4
+
+
+def test_single_flight_coalesces_concurrent_loads():
+    c = TTLCache()
+    calls = []
+    gate = threading.Event()
+
+    def loader():
+        calls.append(1)
+        gate.wait(2)
+        return 'v'
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(c.get_or_load('k', loader, ttl=60))) for _ in range(8)]
+    for t in threads:
+        t.start()
+    time.sleep(0.05)
+    gate.set()
+    for t in threads:
+        t.join()
+    assert results == ['v'] * 8
+    assert len(calls) == 1
+    assert c.stats()['misses'] == 1
+    assert c.get_or_load('k', loader) == 'v'
+    assert c.stats()['hits'] == 1
+
+
+def test_errors_and_rejected_values_are_not_cached():
+    c = TTLCache()
+
+    def boom():
+        raise RuntimeError('upstream down')
+
+    with pytest.raises(RuntimeError):
+        c.get_or_load('k', boom)
+    assert c.get_or_load('k', lambda: {}, cache_if=bool) == {}
+    assert len(c) == 0
+
+
+def test_seconds_until_next_bar():
+    now = datetime(2024, 12, 31, 18, 0, 0)  # Tuesday
+    assert seconds_until_next_bar('daily', now) == 6 * 3600
+    assert seconds_until_next_bar('weekly', now) == (5 * 24 + 6) * 3600
+    assert seconds_until_next_bar('monthly', now) == 6 * 3600
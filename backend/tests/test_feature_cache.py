@@ -0,0 +1,79 @@
+import json
+
+import pandas as pd
+
+import app as app_module
+import feature_cache
+from feature_cache import FEATURE_CACHE, cached_features, cached_indicators, feature_scope
+from local_provider import synthetic_ohlcv
+
+
+def _counting(monkeypatch, name):
+    calls = []
+    real = getattr(feature_cache, name)
+    monkeypatch.setattr(feature_cache, name, lambda *a, **kw: calls.append(1) or real(*a, **kw))
+    return calls
+
+
+def test_frames_are_memoized_per_scope_and_last_bar(monkeypatch):
+    FEATURE_CACHE.clear()
+    calls = _counting(monkeypatch, 'assemble_features')
+    df = synthetic_ohlcv(200, seed=1)
+    fundamentals = {'eps': 10.0, 'market_close': df['close'] * 2}
+
+    cached_features(df, fundamentals)  # no scope: computed, not stored
+    with feature_scope('tcs', 'daily'):
+        first = cached_features(df, fundamentals)
+        first['target'] = 1.0  # callers get their own column set
+        again = cached_features(df, dict(fundamentals))
+        assert 'target' not in again.columns
+        pd.testing.assert_frame_equal(first.drop(columns='target'), again)
+        cached_features(df, {'eps': 11.0, 'market_close': df['close'] * 2})  # new fundamentals
+        revised = df.copy()
+        revised.iloc[-1, revised.columns.get_loc('close')] += 1.0  # today's bar moved
+        cached_features(revised, fundamentals)
+    with feature_scope('TCS', 'weekly'):
+        cached_features(df, fundamentals)
+    assert len(calls) == 5
+
+    indicator_calls = _counting(monkeypatch, 'compute_technical_indicators')
+    with feature_scope('TCS'):
+        cached_indicators(df, ['rsi_14'])
+        assert list(cached_indicators(df, ['rsi_14']).columns)[-1] == 'rsi_14'
+    assert len(indicator_calls) == 1 and FEATURE_CACHE.nbytes > 0
+
+
+def test_predict_route_reuses_features_across_requests(monkeypatch):
+    FEATURE_CACHE.clear()
+    hist = synthetic_ohlcv(300, seed=2)
+    monkeypatch.setattr(app_module, 'fetch_history', lambda ticker, **kwargs: hist)
+    monkeypatch.setattr(app_module, 'fetch_fundamentals_av', lambda ticker, api_key=None: {})
+    calls = _counting(monkeypatch, 'assemble_features')
+    with app_module.app.test_client() as client:
+        for _ in range(2):
+            resp = client.post('/api/predict', data=json.dumps({"ticker": "TCS", "days": 2}),
+                               content_type='application/json')
+            assert resp.status_code == 200 and resp.get_json()['error'] is None
+        stats = client.get('/api/cache/stats').get_json()['features']
+    # Training features are built once; the forecast itself advances the streaming engine
+    assert len(calls) == 1
+    assert stats['hits'] >= 2 and stats['bytes'] > 0
+    assert stats['tickers'] == 1 and stats['bytes_per_ticker'] == stats['bytes']
+
+
+def test_grown_history_extends_the_cached_frame(monkeypatch):
+    FEATURE_CACHE.clear()
+    df = synthetic_ohlcv(800, seed=3)
+    full = _counting(monkeypatch, 'compute_technical_indicators')
+    tails = _counting(monkeypatch, 'update_technical_indicators')
+    before = feature_cache.feature_cache_stats()['extended']
+    with feature_scope('INFY'):
+        cached_indicators(df.iloc[:798])
+        cached_features(df.iloc[:799])  # one more bar
+        grown = cached_indicators(df)
+        cached_indicators(synthetic_ohlcv(800, seed=4))  # a different history is computed in full
+    assert len(full) == 2 and len(tails) == 2
+    assert feature_cache.feature_cache_stats()['extended'] - before == 2
+    expected = feature_cache.compute_technical_indicators(df, compact=True)
+    pd.testing.assert_frame_equal(grown.drop(columns='rolling_kurt_10'), expected.drop(columns='rolling_kurt_10'),
+                                  rtol=1e-8)
@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import features
+import features_jit
+from features import INDICATOR_COLUMNS, compute_technical_indicators
+from local_provider import synthetic_ohlcv
+
+KERNEL_COLUMNS = ('rolling_skew_10', 'rolling_kurt_10', 'stoch_k_14', 'stoch_d_3', 'adx_14', 'plus_di_14',
+                  'minus_di_14', 'mfi_14', 'doji', 'bull_engulf', 'bear_engulf')
+# pandas' rolling kurt/skew accumulate power sums over the whole series; the kernels take exact window moments
+LOOSE = {'rolling_skew_10': dict(rtol=1e-5, atol=1e-6), 'rolling_kurt_10': dict(rtol=1e-3, atol=1e-4)}
+
+
+def _frame(n, seed=7):
+    df = synthetic_ohlcv(n, seed=seed)
+    if n > 120:
+        df.iloc[100:112, :4] = 101.0  # doji, zero ranges, flat windows
+        df.iloc[200:204, df.columns.get_loc('volume')] = 0.0
+    return df
+
+
+@pytest.mark.parametrize('n', [5, 20, 30, 600])
+def test_kernels_match_pandas_engine(n, monkeypatch):
+    monkeypatch.setenv('INDICATOR_JIT', '0')
+    df = _frame(n)
+    expected = compute_technical_indicators(df)
+    o, h, lo, c, v = (df[k].to_numpy(float) for k in ('open', 'high', 'low', 'close', 'volume'))
+    actual = dict(zip(('stoch_k_14', 'stoch_d_3'), features_jit.stochastic(h, lo, c, 14, 3)))
+    actual.update(zip(('adx_14', 'plus_di_14', 'minus_di_14'), features_jit.adx(h, lo, c, 14)))
+    actual.update(zip(('doji', 'bull_engulf', 'bear_engulf'), features_jit.candles(o, h, lo, c)))
+    actual['rolling_skew_10'] = features_jit.rolling_skew(c, 10)
+    actual['rolling_kurt_10'] = features_jit.rolling_kurt(c, 10)
+    actual['mfi_14'] = features_jit.mfi(h, lo, c, v, 14)
+    for col in KERNEL_COLUMNS:
+        assert actual[col].dtype.kind == expected[col].dtype.kind, col
+        np.testing.assert_allclose(actual[col], expected[col].to_numpy(float), equal_nan=True, err_msg=col,
+                                   **LOOSE.get(col, dict(rtol=1e-8, atol=1e-9)))
+
+
+def test_pandas_engine_routes_gap_free_frames_to_kernels(monkeypatch):
+    df = _frame(300)
+    gappy = df.copy()
+    gappy.iloc[150, gappy.columns.get_loc('close')] = np.nan
+    monkeypatch.setenv('INDICATOR_JIT', '0')
+    expected, expected_gappy = compute_technical_indicators(df), compute_technical_indicators(gappy)
+
+    calls = []
+    monkeypatch.delenv('INDICATOR_JIT')
+    monkeypatch.setattr(features_jit, 'AVAILABLE', True)  # interpreted kernels stand in for Numba
+    real = features_jit.adx
+    monkeypatch.setattr(features_jit, 'adx', lambda *a: calls.append(1) or real(*a))
+    actual = compute_technical_indicators(df)
+    assert calls == [1]
+    assert actual.dtypes.equals(expected.dtypes)
+    for col in INDICATOR_COLUMNS:
+        np.testing.assert_allclose(actual[col].to_numpy(float), expected[col].to_numpy(float), equal_nan=True,
+                                   err_msg=col, **LOOSE.get(col, dict(rtol=1e-8, atol=1e-9)))
+    pd.testing.assert_frame_equal(compute_technical_indicators(gappy), expected_gappy)
+    assert calls == [1]
@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from features import INDICATOR_COLUMNS, compute_technical_indicators
+from local_provider import synthetic_ohlcv
+
+# pandas' rolling kurt/skew accumulate power sums over the whole series and drift on long, trending
+# histories; the NumPy engine takes exact per-window moments (it agrees with streaming.py to ~1e-13)
+LOOSE = {'rolling_skew_10': dict(rtol=1e-5, atol=1e-6), 'rolling_kurt_10': dict(rtol=1e-3, atol=1e-4)}
+
+
+def _frame(n, seed=5):
+    df = synthetic_ohlcv(n, seed=seed)
+    rng = np.random.default_rng(seed)
+    df['market_index'] = 5000 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    return df
+
+
+@pytest.mark.parametrize('n', [20, 30, 400, 3000])
+def test_numpy_engine_matches_pandas(n):
+    df = _frame(n)
+    if n > 120:
+        df.iloc[100:112, :4] = 101.0  # doji, zero ranges, constant windows
+    expected = compute_technical_indicators(df)
+    actual = compute_technical_indicators(df, engine='numpy')
+    assert list(actual.columns) == list(expected.columns)
+    for col in INDICATOR_COLUMNS:
+        assert actual[col].dtype.kind == expected[col].dtype.kind, col
+        np.testing.assert_allclose(actual[col].to_numpy(float), expected[col].to_numpy(float), equal_nan=True,
+                                   err_msg=col, **LOOSE.get(col, dict(rtol=1e-8, atol=1e-9)))
+
+
+def test_numpy_engine_arrays_and_float32():
+    df = _frame(300)
+    arrays = compute_technical_indicators(df, engine='numpy', as_arrays=True, dtype=np.float32)
+    assert tuple(arrays) == INDICATOR_COLUMNS
+    assert all(a.flags.c_contiguous and len(a) == len(df) for a in arrays.values())
+    assert arrays['rsi_14'].dtype == np.float32 and arrays['doji'].dtype == np.int64
+
+    full = compute_technical_indicators(df, engine='numpy')
+    # MACD is a difference of two EMAs, so float32 error scales with the price level, not with MACD itself
+    np.testing.assert_allclose(arrays['macd'], full['macd'], atol=1e-5 * df['close'].max(), equal_nan=True)
+    np.testing.assert_allclose(arrays['rsi_14'], full['rsi_14'], rtol=1e-4, equal_nan=True)
+    # The pandas engine honours as_arrays too, so callers can switch engines freely
+    assert tuple(compute_technical_indicators(df, as_arrays=True)) == INDICATOR_COLUMNS
+
+
+def test_engine_selection(monkeypatch):
+    df = _frame(60)
+    gappy = df.copy()
+    gappy.iloc[30, gappy.columns.get_loc('close')] = np.nan
+    # Missing bars change pandas' min_periods/skipna semantics; that input stays on the pandas path
+    pd.testing.assert_frame_equal(compute_technical_indicators(gappy, engine='numpy'),
+                                  compute_technical_indicators(gappy))
+
+    monkeypatch.setenv('INDICATOR_ENGINE', 'numpy')
+    pd.testing.assert_frame_equal(compute_technical_indicators(df),
+                                  compute_technical_indicators(df, engine='numpy'))
+    with pytest.raises(ValueError):
+        compute_technical_indicators(df, engine='polars')
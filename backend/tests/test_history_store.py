@@ -0,0 +1,148 @@
+import json
+import sqlite3
+
+import pandas as pd
+import pytest
+
+import config
+from history_store import HistoryStore, merge_history
+
+
+def _av_payload(dates, start=100.0):
+    ts = {}
+    for i, d in enumerate(dates):
+        px = start + i
+        ts[d] = {
+            '1. open': str(px),
+            '2. high': str(px + 1),
+            '3. low': str(px - 1),
+            '4. close': str(px + 0.5),
+            '5. volume': str(1000 + i),
+        }
+    return {'Meta Data': {}, 'Time Series (Daily)': ts}
+
+
+class _Resp:
+    def __init__(self, payload):
+        self._payload = payload
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self._payload
+
+    @property
+    def text(self):
+        return json.dumps(self._payload)
+
+    @property
+    def content(self):
+        return self.text.encode()
+
+
+@pytest.fixture
+def av_env(tmp_path, monkeypatch):
+    monkeypatch.setenv('DATA_PROVIDER', 'alphavantage')
+    monkeypatch.setenv('ALPHA_VANTAGE_API_KEY', 'test')
+    monkeypatch.setenv('HISTORY_CACHE_DIR', str(tmp_path))
+    monkeypatch.setenv('AV_RATE_LIMIT', '0')
+    config.PROVIDER_CACHE.clear()
+    calls = []
+    responses = []
+
+    class _Session:
+        def get(self, url, params=None, timeout=None):
+            calls.append(dict(params))
+            return _Resp(responses.pop(0))
+
+    monkeypatch.setattr(config, 'get_session', lambda: _Session())
+    return calls, responses
+
+
+def test_store_roundtrip(tmp_path):
+    store = HistoryStore(tmp_path / 'h.sqlite')
+    idx = pd.to_datetime(['2024-01-01', '2024-01-02'])
+    df = pd.DataFrame({'open': [1.0, 2.0], 'close': [1.5, 2.5]}, index=idx)
+    assert store.save('ABC', 'daily', df) == 2
+    out = store.load('ABC', 'daily')
+    assert list(out.columns) == ['open', 'close']
+    assert out['close'].tolist() == [1.5, 2.5]
+    assert store.load('ABC', 'weekly').empty
+
+
+def test_merge_history_prefers_delta():
+    idx = pd.date_range('2024-01-01', periods=3)
+    cached = pd.DataFrame({'close': [1.0, 2.0, 3.0]}, index=idx)
+    delta = pd.DataFrame({'close': [30.0, 4.0]}, index=idx[2:].append(pd.DatetimeIndex(['2024-01-04'])))
+    out = merge_history(cached, delta)
+    assert out['close'].tolist() == [1.0, 2.0, 30.0, 4.0]
+
+
+def test_fetch_history_tops_up_with_compact(av_env):
+    calls, responses = av_env
+    full_dates = [d.strftime('%Y-%m-%d') for d in pd.date_range('2024-01-01', periods=10)]
+    responses.append(_av_payload(full_dates))
+    df1 = config.fetch_history('ABC', outputsize='full')
+    assert len(df1) == 10
+    assert calls[-1]['outputsize'] == 'full'
+
+    delta_dates = full_dates[-2:] + ['2024-01-11']
+    responses.append(_av_payload(delta_dates, start=500.0))
+    config.PROVIDER_CACHE.clear()
+    df2, meta = config.fetch_history('ABC', outputsize='full', return_metadata=True)
+    assert calls[-1]['outputsize'] == 'compact'
+    assert meta['cache'] == 'topup'
+    assert len(df2) == 11
+    assert df2['open'].iloc[-1] == 502.0
+    assert df2.index.is_monotonic_increasing
+
+
+def test_fetch_history_serves_cache_on_rate_limit_note(av_env):
+    calls, responses = av_env
+    dates = [d.strftime('%Y-%m-%d') for d in pd.date_range('2024-01-01', periods=5)]
+    responses.append(_av_payload(dates))
+    config.fetch_history('ABC', outputsize='full')
+
+    responses.append({'Note': 'Thank you for using Alpha Vantage! ...'})
+    config.PROVIDER_CACHE.clear()
+    df, meta = config.fetch_history('ABC', outputsize='full', return_metadata=True)
+    assert meta['cache'] == 'stale'
+    assert len(df) == 5
+
+
+def test_compact_seed_is_refetched_full(av_env):
+    calls, responses = av_env
+    dates = [d.strftime('%Y-%m-%d') for d in pd.date_range('2024-01-01', periods=10)]
+    responses.append(_av_payload(dates[-3:]))
+    assert len(config.fetch_history('ABC')) == 3  # default outputsize='compact'
+    assert calls[-1]['outputsize'] == 'compact'
+
+    responses.append(_av_payload(dates))
+    config.PROVIDER_CACHE.clear()
+    df, meta = config.fetch_history('ABC', outputsize='full', return_metadata=True)
+    assert calls[-1]['outputsize'] == 'full' and meta['cache'] == 'miss'
+    assert len(df) == 10
+
+    # now recorded as full: the next request is a top-up
+    responses.append(_av_payload(dates[-2:] + ['2024-01-11']))
+    config.PROVIDER_CACHE.clear()
+    df, meta = config.fetch_history('ABC', outputsize='full', return_metadata=True)
+    assert calls[-1]['outputsize'] == 'compact' and meta['cache'] == 'topup'
+    assert len(df) == 11
+
+
+def test_topup_survives_store_write_failure(av_env, monkeypatch):
+    calls, responses = av_env
+    dates = [d.strftime('%Y-%m-%d') for d in pd.date_range('2024-01-01', periods=10)]
+    responses.append(_av_payload(dates))
+    config.fetch_history('ABC', outputsize='full')
+
+    def locked(*args, **kwargs):
+        raise sqlite3.OperationalError('database is locked')
+
+    monkeypatch.setattr(HistoryStore, 'save', locked)
+    responses.append(_av_payload(dates[-2:] + ['2024-01-11']))
+    config.PROVIDER_CACHE.clear()
+    df, meta = config.fetch_history('ABC', outputsize='full', return_metadata=True)
+    assert meta['cache'] == 'topup' and len(df) == 11
@@ -0,0 +1,113 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import app as app_module
+import features
+from features import (COMPACT_INDICATOR_COLUMNS, INDICATOR_ALIASES, INDICATOR_COLUMNS, assemble_features,
+                      WARMUP, compute_technical_indicators, feature_warmup, indicator_column, indicator_dependencies,
+                      indicator_lookback, memory_footprint, update_technical_indicators, valid_rows)
+from local_provider import synthetic_ohlcv
+
+
+def test_dependencies_are_resolved_in_column_order():
+    assert indicator_dependencies(['macd_hist']) == ('ema_12', 'ema_26', 'macd', 'macd_signal', 'macd_hist')
+    assert indicator_dependencies(['regime_trend'])[-1] == 'regime_trend'
+    assert set(indicator_dependencies(INDICATOR_COLUMNS)) == set(INDICATOR_COLUMNS)
+    with pytest.raises(ValueError):
+        indicator_dependencies(['sma_7'])
+
+
+@pytest.mark.parametrize('engine', features.ENGINES)
+def test_subset_matches_full_computation(engine, monkeypatch):
+    df = synthetic_ohlcv(300, seed=4)
+    full = compute_technical_indicators(df, engine=engine)
+    subset = ['rolling_zscore_10', 'vol_spike', 'ret_5', 'bb_width', 'regime_trend']
+    evaluated = []
+    if engine == 'pandas':
+        monkeypatch.setattr(features, '_NODES', [
+            node._replace(fn=lambda b, cols, node=node: evaluated.extend(node.outputs) or node.fn(b, cols))
+            for node in features._NODES
+        ])
+    out = compute_technical_indicators(df, engine=engine, columns=subset)
+    assert list(out.columns) == list(df.columns) + [c for c in INDICATOR_COLUMNS if c in subset]
+    pd.testing.assert_frame_equal(out, full[out.columns])
+    if engine == 'pandas':
+        assert set(evaluated) == set(indicator_dependencies(subset))
+        assert 'rolling_kurt_10' not in evaluated and 'mfi_14' not in evaluated
+
+
+def test_route_payloads_unchanged_by_subsetting():
+    df = synthetic_ohlcv(120, seed=9)
+    full = compute_technical_indicators(df)
+    assert app_module._indicator_rows(full, 5) == app_module._indicator_rows(
+        compute_technical_indicators(df, columns=app_module.INDICATOR_ROW_COLUMNS), 5)
+
+    snapshot = app_module._latest_indicators(df)
+    assert set(snapshot) == {'date', 'close', *app_module.LATEST_INDICATOR_COLUMNS}
+    assert snapshot['macd_hist'] == pytest.approx(full['macd_hist'].iloc[-1])
+
+
+@pytest.mark.parametrize('columns', [None, ['obv', 'sma_50', 'macd_signal']])
+def test_tail_update_matches_full_recomputation(columns):
+    df = synthetic_ohlcv(1500, seed=6)
+    assert indicator_lookback(['sma_50']) == 49 and indicator_lookback(['obv']) == 1
+    assert indicator_lookback() > indicator_lookback(['ema_50']) > 50  # EMA seed allowance
+
+    prev = compute_technical_indicators(df.iloc[:1490], columns=columns)
+    revised = df.iloc[1489:].copy()
+    revised.iloc[0, revised.columns.get_loc('close')] *= 1.01  # prev's last bar was still moving
+    expected = compute_technical_indicators(pd.concat([df.iloc[:1489], revised]), columns=columns)
+    actual = update_technical_indicators(prev, revised)
+    assert actual.index.equals(expected.index) and actual.dtypes.equals(expected.dtypes)
+    for col in expected.columns:
+        # rolling kurt: pandas' own running power sums drift over a 1500-bar pass
+        tol = dict(rtol=1e-6, atol=1e-6) if col == 'rolling_kurt_10' else dict(rtol=1e-8, atol=1e-8)
+        np.testing.assert_allclose(actual[col].to_numpy(float), expected[col].to_numpy(float),
+                                   equal_nan=True, err_msg=col, **tol)
+
+    short = compute_technical_indicators(df.iloc[:30], columns=columns)
+    pd.testing.assert_frame_equal(update_technical_indicators(short, df.iloc[30:40]),
+                                  compute_technical_indicators(df.iloc[:40], columns=columns))
+
+
+@pytest.mark.parametrize('engine', features.ENGINES)
+def test_compact_frames(engine):
+    df = synthetic_ohlcv(400, seed=8)
+    full = compute_technical_indicators(df, engine=engine)
+    compact = compute_technical_indicators(df, engine=engine, compact=True)
+    assert list(compact.columns) == list(df.columns) + list(COMPACT_INDICATOR_COLUMNS)
+    assert compact['doji'].dtype == np.int8 and compact['rsi_14'].dtype == np.float64
+    pd.testing.assert_frame_equal(compact, full[compact.columns], check_dtype=False)
+    for alias, name in INDICATOR_ALIASES.items():
+        pd.testing.assert_series_equal(indicator_column(compact, alias), full[alias], check_names=False)
+    # asking for an alias returns the column it duplicates
+    assert list(compute_technical_indicators(df, columns=['lag_5'], compact=True).columns)[-1] == 'close_lag_5'
+
+    lean = compute_technical_indicators(df, engine=engine, compact=True, dtype=np.float32)
+    assert lean['rsi_14'].dtype == np.float32
+    sizes = [memory_footprint(f)['indicator_bytes'] for f in (full, compact, lean)]
+    assert sizes[0] > sizes[1] > 2 * sizes[2] * 0.9
+    grown = update_technical_indicators(lean.iloc[:-1], df.iloc[-1:])
+    assert grown.dtypes.equals(lean.dtypes)
+
+    feats = assemble_features(df, {}, compact=True)
+    pd.testing.assert_frame_equal(feats, assemble_features(df, {})[feats.columns], check_dtype=False)
+
+
+def test_warmup_metadata_and_validity_mask():
+    df = synthetic_ohlcv(400, seed=11)
+    market = pd.Series(np.linspace(100, 140, 400) + np.sin(np.arange(400)), index=df.index)
+    full = compute_technical_indicators(df.assign(market_index=market))
+    for col in INDICATOR_COLUMNS:
+        assert full[col].notna().to_numpy().argmax() == WARMUP[col], col
+    assert feature_warmup() == 49 and feature_warmup(['rsi_14', 'ret_5']) == 13
+
+    gappy = df.copy()
+    gappy.iloc[[60, 200], gappy.columns.get_loc('close')] = np.nan
+    flat = df.copy()
+    flat.iloc[100:120, :4] = 100.0  # zero ranges: stoch and zscore go NaN mid-frame
+    for frame in (df, gappy, flat, df.iloc[:25], df.iloc[:40]):
+        feats = assemble_features(frame, {'market_index': market}, compact=True)
+        feats['target'] = feats['close'].shift(-1)
+        np.testing.assert_array_equal(valid_rows(feats), feats.notna().all(axis=1).to_numpy())
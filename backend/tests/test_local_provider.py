@@ -0,0 +1,79 @@
+import json
+
+import pytest
+
+import config
+from local_provider import InjectedProviderError, LocalProvider, write_synthetic_dataset
+
+
+@pytest.fixture
+def local_env(tmp_path, monkeypatch):
+    write_synthetic_dataset(tmp_path, ['TCS.BSE', 'INFY.BSE'], bars=300)
+    monkeypatch.setenv('DATA_PROVIDER', 'local')
+    monkeypatch.setenv('LOCAL_DATA_DIR', str(tmp_path))
+    config.PROVIDER_CACHE.clear()
+    return tmp_path
+
+
+def test_history_daily_and_resampled(local_env):
+    df, meta = config.fetch_history('tcs.bse', frequency='daily', outputsize='full', return_metadata=True)
+    assert meta['provider'] == 'local'
+    assert len(df) == 300
+    assert list(df.columns) == ['open', 'high', 'low', 'close', 'volume']
+    weekly = config.fetch_history('TCS.BSE', frequency='weekly')
+    assert 55 <= len(weekly) <= 65
+    assert weekly['close'].iloc[-1] == df['close'].iloc[-1]
+    assert config.fetch_history('UNKNOWN', frequency='daily').empty
+
+
+def test_quote_and_overview(local_env):
+    q = config.fetch_global_quote_av('INFY.BSE')
+    assert q['provider'] == 'local' and 'error' not in q
+    assert q['price'] == pytest.approx(config.fetch_history('INFY.BSE')['close'].iloc[-1])
+    (local_env / 'INFY.BSE_OVERVIEW.json').write_text(json.dumps({'EPS': '12.5', 'PERatio': 'None'}))
+    f = config.fetch_fundamentals_av('INFY.BSE')
+    assert f['eps'] == 12.5 and f['pe'] is None
+
+
+def test_injected_errors_and_latency(tmp_path):
+    write_synthetic_dataset(tmp_path, ['ABC'], bars=10)
+    p = LocalProvider(tmp_path, error_rate=1.0, seed=1, series_parser=config._series_from_payload)
+    with pytest.raises(InjectedProviderError):
+        p.history('ABC')
+    p = LocalProvider(tmp_path, latency_ms=20, series_parser=config._series_from_payload)
+    import time
+    t0 = time.perf_counter()
+    assert len(p.history('ABC')) == 10
+    assert time.perf_counter() - t0 >= 0.02
+
+
+def test_recorded_alphavantage_response_replays(tmp_path, monkeypatch):
+    record = tmp_path / 'rec'
+    monkeypatch.setenv('AV_RECORD_DIR', str(record))
+    monkeypatch.setenv('AV_RATE_LIMIT', '0')
+    payload = {'Time Series (Daily)': {
+        '2024-01-02': {'1. open': '1', '2. high': '2', '3. low': '0.5', '4. close': '1.5', '5. volume': '10'},
+        '2024-01-03': {'1. open': '2', '2. high': '3', '3. low': '1.5', '4. close': '2.5', '5. volume': '20'},
+    }}
+
+    class _Resp:
+        text = json.dumps(payload)
+        content = text.encode()
+
+        def raise_for_status(self):
+            pass
+
+        def json(self):
+            return payload
+
+    class _Session:
+        def get(self, url, params=None, timeout=None):
+            return _Resp()
+
+    monkeypatch.setattr(config, 'get_session', lambda: _Session())
+    config._av_get({'function': 'TIME_SERIES_DAILY', 'symbol': 'ABC.BSE', 'outputsize': 'full', 'apikey': 'k'})
+    assert (record / 'ABC.BSE_TIME_SERIES_DAILY.json').exists()
+
+    p = LocalProvider(record, series_parser=config._series_from_payload)
+    df = p.history('ABC.BSE')
+    assert df['close'].tolist() == [1.5, 2.5]
@@ -0,0 +1,91 @@
+import pickle
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import app as app_module
+from features import assemble_features, compute_technical_indicators
+from local_provider import synthetic_ohlcv
+from market import MarketIndices, rolling_corr_beta, relative_strength
+
+
+def test_running_sum_statistics_match_pandas():
+    rng = np.random.default_rng(0)
+    x = pd.Series(rng.normal(0, 0.01, 3000))
+    y = 0.6 * x + pd.Series(rng.normal(0, 0.01, 3000))
+    x[100], y[300:305] = np.nan, np.nan
+    corr, beta = rolling_corr_beta(x.to_numpy(), y.to_numpy(), 20, min_periods=10)
+    np.testing.assert_allclose(corr, x.rolling(20, min_periods=10).corr(y), rtol=1e-9, atol=1e-12, equal_nan=True)
+    var = y.where(x.notna()).rolling(20, min_periods=10).var()
+    np.testing.assert_allclose(beta, x.rolling(20, min_periods=10).cov(y) / var, rtol=1e-8, equal_nan=True)
+    # (time x column) input gives the per-column results
+    both = rolling_corr_beta(np.c_[x, y], np.c_[y, x], 20, min_periods=10)[0]
+    np.testing.assert_allclose(both[:, 1], corr, equal_nan=True)
+
+    close, index = np.exp(x.fillna(0).cumsum()), np.exp(y.fillna(0).cumsum())
+    rs = relative_strength(close, index, 5)
+    assert np.isnan(rs[:5]).all()
+    assert rs[50] == pytest.approx(np.log(close[50] / close[45]) - np.log(index[50] / index[45]))
+
+
+def test_market_close_and_named_indices_reach_the_features():
+    df = synthetic_ohlcv(300, seed=3)
+    nifty = synthetic_ohlcv(320, seed=4)['close'].set_axis(pd.date_range(end=df.index[-1], periods=320))
+    sensex = nifty * 3.3 + 10
+    # the key app.py used to pass market closes under: corr_with_index_20 now uses it
+    feats = assemble_features(df, {'market_close': nifty})
+    expected = compute_technical_indicators(df.assign(market_index=nifty.reindex(df.index)))
+    assert feats['corr_with_index_20'].notna().sum() > 200
+    np.testing.assert_allclose(feats['corr_with_index_20'], expected['corr_with_index_20'].loc[feats.index],
+                               rtol=1e-9, equal_nan=True)
+
+    market = MarketIndices({'^NSEI': nifty, 'SENSEX': sensex}, primary=nifty)
+    for _ in range(3):  # every ticker of a batch on the same calendar
+        feats = assemble_features(df, {'market_indices': market})
+    assert len(market._aligned) == 1  # aligned once
+    assert {'beta_index_20', 'rs_index_20', 'corr_nsei_20', 'beta_sensex_20', 'rs_sensex_20'} <= set(feats.columns)
+    np.testing.assert_allclose(feats['corr_nsei_20'], feats['corr_with_index_20'])
+    np.testing.assert_allclose(feats['rs_nsei_20'], feats['rs_sensex_20'], atol=0.02)
+    clone = pickle.loads(pickle.dumps(market))
+    assert clone.key == market.key and clone.aligned(df.index).keys() == market.aligned(df.index).keys()
+
+
+def test_predict_trains_on_market_relative_features(monkeypatch):
+    hist = synthetic_ohlcv(300, seed=5)
+    fetched, fits = [], []
+
+    def fake_history(ticker, **kwargs):
+        fetched.append(ticker)
+        return synthetic_ohlcv(300, seed=len(ticker)) if ticker != 'TCS' else hist
+
+    def fake_fit(df, fundamentals, **kwargs):
+        fits.append(fundamentals)
+        return [1.0] * kwargs['steps']
+
+    monkeypatch.setattr(app_module, 'fetch_history', fake_history)
+    monkeypatch.setattr(app_module, 'fetch_fundamentals_av', lambda ticker, api_key=None: {})
+    monkeypatch.setattr(app_module, 'train_and_predict_ml', fake_fit)
+    monkeypatch.setenv('TRAIN_WORKERS', '0')
+    with app_module.app.test_client() as client:
+        resp = client.post('/api/predict/batch', json={"tickers": ["TCS", "INFY", "WIPRO"], "stream": False,
+                                                       "market_ticker": "^NSEI", "market_tickers": "^BSESN"})
+        assert resp.status_code == 200
+        resp = client.post('/api/features-columns', json={"ticker": "TCS", "market_ticker": "^NSEI",
+                                                          "market_tickers": ["^BSESN"]})
+    assert fetched.count('^NSEI') == 2 and fetched.count('^BSESN') == 2  # once per batch, once per request
+    assert len(fits) == 3 and all(f['market_indices'] is fits[0]['market_indices'] for f in fits)
+    columns = resp.get_json()['columns']
+    assert {'market_index', 'corr_with_index_20', 'beta_index_20', 'corr_bsesn_20', 'rs_bsesn_20'} <= set(columns)
+
+
+def test_carried_to_extends_each_series_at_its_last_level():
+    dates = pd.date_range('2024-01-01', periods=5, freq='D')
+    market = MarketIndices({'^BSESN': pd.Series([1.0, 2.0, 3.0, np.nan], index=dates[:4])},
+                           primary=pd.Series([10.0, 11.0, 12.0], index=dates[:3]))
+    carried = market.carried_to(dates)
+    assert carried.primary.tolist() == [10.0, 11.0, 12.0, 12.0, 12.0]
+    # only bars after the series' end are filled; a NaN inside it stays
+    bsesn = carried.indices['bsesn']
+    assert len(bsesn) == 5 and np.isnan(bsesn.iloc[3]) and bsesn.iloc[4] == 3.0
+    assert carried.key != market.key and market.primary.tolist() == [10.0, 11.0, 12.0]
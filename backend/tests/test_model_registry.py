@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import RandomForestRegressor
+
+import ml
+import model_registry
+from feature_cache import FEATURE_CACHE, feature_scope
+from local_provider import synthetic_ohlcv
+from model_registry import ModelRegistry
+
+
+@pytest.fixture
+def registry(tmp_path, monkeypatch):
+    reg = ModelRegistry(tmp_path / 'models', maxsize=4)
+    monkeypatch.setattr(model_registry, 'MODEL_REGISTRY', reg)
+    return reg
+
+
+@pytest.mark.parametrize('model_type', ['ridge', 'rf'])
+def test_repeat_predictions_reuse_the_fitted_model(registry, model_type, monkeypatch):
+    FEATURE_CACHE.clear()
+    if model_type == 'rf':
+        small = lambda **kw: RandomForestRegressor(**{**kw, 'n_estimators': 10})
+        monkeypatch.setattr(ml, 'RandomForestRegressor', small)
+    df = synthetic_ohlcv(300, seed=3)
+    fundamentals = {'eps': 10.0, 'pe': 20.0, 'peg': 1.5, 'pb': 3.0, 'market_index': synthetic_ohlcv(301, seed=4)['close']}
+    kw = dict(steps=3, model_type=model_type, window=200)
+    with feature_scope('TCS', 'daily'):
+        first = ml.train_and_predict_ml(df, fundamentals, **kw)
+        again = ml.train_and_predict_ml(df, fundamentals, **kw)
+        ml.train_and_predict_ml(df, fundamentals, **{**kw, 'window': 150})  # other parameters: own model
+    assert first == again and registry.fits == 2 and registry.models.hits == 1
+    assert len(list(registry.path.glob('*.joblib'))) == 2
+
+    # another worker (empty memory) loads the file instead of training
+    fresh = ModelRegistry(registry.path)
+    monkeypatch.setattr(model_registry, 'MODEL_REGISTRY', fresh)
+    assert ml.train_and_predict_ml(df, fundamentals, scope=('TCS', 'daily'), **kw) == pytest.approx(first)
+    assert fresh.fits == 0 and fresh.loads == 1
+
+    # a new bar replaces the series' model in memory and on disk
+    grown = synthetic_ohlcv(301, seed=3)
+    ml.train_and_predict_ml(grown, fundamentals, scope=('TCS', 'daily'), **kw)
+    assert fresh.fits == 1 and len(fresh.models) == 1
+    assert len(list(registry.path.glob('*.joblib'))) == 2
+
+
+def test_schema_change_and_unscoped_fits(registry):
+    df = synthetic_ohlcv(200, seed=5)
+    X = df[['open', 'close']]
+    fits = []
+    fit = lambda: fits.append(1) or 'model'
+    assert model_registry.registered_model(('ridge', None, 1.0), df, {}, X, fit) == 'model'  # no scope
+    scope = ('INFY', 'daily')
+    model_registry.registered_model(('ridge', None, 1.0), df, {}, X, fit, scope)
+    model_registry.registered_model(('ridge', None, 1.0), df, {}, X, fit, scope)
+    model_registry.registered_model(('ridge', None, 1.0), df, {}, X.astype(np.float32), fit, scope)
+    assert len(fits) == 3
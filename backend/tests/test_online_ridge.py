@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.linear_model import Ridge
+
+import ml
+import model_registry
+from features import assemble_features, valid_rows
+from feature_cache import FEATURE_CACHE, feature_scope
+from local_provider import synthetic_ohlcv
+from model_registry import ModelRegistry
+from online_ridge import OnlineRidge
+
+
+def _rows(bars=700, horizons=1):
+    df = synthetic_ohlcv(bars, seed=12)
+    fundamentals = {'eps': 10.0, 'pe': 20.0, 'peg': 1.5, 'pb': 3.0,
+                    'market_index': synthetic_ohlcv(bars, seed=13)['close'] * 40}
+    feats = assemble_features(df, fundamentals, compact=True)
+    columns = list(feats.columns)
+    targets = pd.DataFrame({h: feats['close'].shift(-h) for h in range(1, horizons + 1)})
+    rows = valid_rows(pd.concat([feats, targets], axis=1))
+    y = targets.loc[rows, 1] if horizons == 1 else targets.loc[rows]
+    return df, fundamentals, feats, feats.loc[rows, columns], y
+
+
+@pytest.mark.parametrize('horizons', [1, 3])
+def test_matches_sklearn_ridge_while_the_window_slides(horizons):
+    _, _, feats, X, y = _rows(horizons=horizons)
+    window = 250
+    model = OnlineRidge(alpha=2.0).fit(X.iloc[:window], y.iloc[:window])
+    for end in range(window, window + 40):
+        model.update(X.iloc[end:end + 1], y.iloc[end:end + 1]).downdate(X.iloc[end - window:end - window + 1],
+                                                                       y.iloc[end - window:end - window + 1])
+    rows = slice(40, window + 40)
+    expected = Ridge(alpha=2.0).fit(X.iloc[rows], y.iloc[rows])
+    np.testing.assert_allclose(model.predict(feats[X.columns].iloc[-5:]),
+                               expected.predict(feats[X.columns].iloc[-5:]), rtol=1e-9)
+    np.testing.assert_allclose(model.coef_, expected.coef_, rtol=1e-5, atol=1e-9 * np.abs(expected.coef_).max())
+    assert model.n_samples_ == window
+
+
+def test_slide_follows_new_and_revised_bars():
+    _, _, feats, X, y = _rows()
+    model = OnlineRidge().fit(X.iloc[:-30], y.iloc[:-30])
+    assert model.slide(X.iloc[-300:], y.iloc[-300:], feats)
+    revised = y.iloc[-300:].copy()
+    revised.iloc[-1] += 1.0
+    assert model.slide(X.iloc[-300:], revised, feats)
+    expected = Ridge().fit(X.iloc[-300:], revised)
+    np.testing.assert_allclose(model.predict(X.iloc[-3:]), expected.predict(X.iloc[-3:]), rtol=1e-9)
+    split = revised * 0.5  # a split-adjusted history is refitted, not slid
+    assert not model.slide(X.iloc[-300:], split, feats) and model.n_samples_ == 300
+
+
+def test_registry_updates_ridge_models_with_new_bars(tmp_path, monkeypatch):
+    reg = ModelRegistry(tmp_path)
+    monkeypatch.setattr(model_registry, 'MODEL_REGISTRY', reg)
+    FEATURE_CACHE.clear()
+    df, fundamentals, *_ = _rows()
+    with feature_scope('TCS', 'daily'):
+        for end in (-3, -2, -1, None):
+            preds = ml.train_and_predict_ml(df.iloc[:end], fundamentals, steps=3, window=200)
+    assert reg.fits == 1 and reg.extended == 3
+    monkeypatch.setattr(model_registry, 'MODEL_REGISTRY', None)
+    assert preds == pytest.approx(ml.train_and_predict_ml(df, fundamentals, steps=3, window=200), rel=1e-9)
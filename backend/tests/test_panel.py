@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from features import INDICATOR_COLUMNS, compute_technical_indicators
+from local_provider import synthetic_ohlcv
+from panel import compute_panel, panel_from_arrays
+
+LOOSE = {'rolling_skew_10', 'rolling_kurt_10'}
+
+
+def _universe():
+    hists = {f'T{i}': synthetic_ohlcv(n, seed=i) for i, n in enumerate((400, 250, 20, 300, 60))}
+    hists['T1'] = hists['T1'].iloc[:-30]  # stops trading early
+    hists['T3'] = hists['T3'].drop(hists['T3'].index[100:105])  # missing days mid-history
+    return hists
+
+
+def test_panel_matches_per_ticker_computation():
+    hists = _universe()
+    panel = compute_panel(hists)
+    assert panel.columns == INDICATOR_COLUMNS
+    for ticker, df in hists.items():
+        expected = compute_technical_indicators(df)
+        actual = panel.ticker(ticker)
+        assert list(actual.columns) == list(expected.columns) and actual.index.equals(expected.index)
+        for col in INDICATOR_COLUMNS:
+            tol = dict(rtol=1e-5, atol=1e-6) if col in LOOSE else dict(rtol=1e-8, atol=1e-9)
+            np.testing.assert_allclose(actual[col].to_numpy(float), expected[col].to_numpy(float),
+                                       equal_nan=True, err_msg=f'{ticker} {col}', **tol)
+    # Cells where a ticker has no bar stay empty
+    assert panel['rsi_14']['T1'].iloc[-30:].isna().all() and (panel['doji']['T2'].iloc[:-20] == 0).all()
+
+
+def test_panel_inputs_and_screening_view():
+    hists = _universe()
+    panel = compute_panel(hists, columns=['rsi_14', 'macd_hist'])
+    assert panel.columns == ('macd_hist', 'rsi_14')
+
+    wide = pd.concat(hists, axis=1)  # (ticker, field) columns
+    from_frame = compute_panel(wide, columns=['rsi_14'])
+    pd.testing.assert_frame_equal(from_frame['rsi_14'], panel['rsi_14'], check_freq=False)
+    close = panel['close']
+    from_arrays = panel_from_arrays(close.to_numpy(), index=close.index, tickers=close.columns, columns=['rsi_14'])
+    np.testing.assert_allclose(from_arrays.data['rsi_14'], panel.data['rsi_14'], equal_nan=True)
+
+    latest = panel.latest(['rsi_14'])
+    assert list(latest.index) == list(hists)
+    assert latest.loc['T1', 'date'] == hists['T1'].index[-1]
+    assert latest.loc['T3', 'rsi_14'] == pytest.approx(compute_technical_indicators(hists['T3'])['rsi_14'].iloc[-1])
@@ -0,0 +1,61 @@
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+import app as app_module
+import precompute
+from local_provider import synthetic_ohlcv
+from precompute import ForecastStore, Scheduler, next_run
+
+IST = ZoneInfo('Asia/Kolkata')
+
+
+def _at(*args):
+    return datetime(*args, tzinfo=IST).timestamp()
+
+
+def test_next_run_is_the_next_weekday_close():
+    assert next_run(_at(2026, 10, 14, 9, 0)) == _at(2026, 10, 14, 16, 0)  # Wednesday morning
+    assert next_run(_at(2026, 10, 14, 16, 0)) == _at(2026, 10, 15, 16, 0)
+    assert next_run(_at(2026, 10, 16, 17, 0)) == _at(2026, 10, 19, 16, 0)  # Friday evening -> Monday
+    assert next_run(_at(2026, 10, 14, 9, 0), close='16:00', tz='America/New_York', delay_minutes=0) == \
+        datetime(2026, 10, 14, 16, 0, tzinfo=ZoneInfo('America/New_York')).timestamp()
+
+
+def test_predict_serves_precomputed_watchlist_forecasts(tmp_path, monkeypatch):
+    fetched = []
+    hist = synthetic_ohlcv(300, seed=7)
+    monkeypatch.setattr(app_module, 'fetch_history', lambda ticker, **kw: fetched.append(ticker) or hist)
+    monkeypatch.setattr(app_module, 'fetch_fundamentals_av', lambda ticker, api_key=None: {})
+    store = ForecastStore(tmp_path / 'forecasts.sqlite')
+    monkeypatch.setattr(app_module, '_FORECAST_STORE', store)
+    monkeypatch.setattr(app_module, '_WATCHLIST', frozenset({'TCS.BSE', 'GONE.BSE'}))
+
+    def compute(ticker, request):
+        if ticker == 'GONE.BSE':
+            return {"ticker": ticker, "predictions": [], "error": "no history available from provider"}
+        return app_module.precompute_forecast(ticker, request)
+
+    scheduler = Scheduler(['TCS.BSE', 'GONE.BSE'], compute, app_module.precompute_key, store, request={'days': 3})
+    assert scheduler.stale() == ['TCS.BSE', 'GONE.BSE']
+    assert scheduler.run_once() == {**scheduler.last_run, 'stored': 1, 'failed': 1}
+    assert scheduler.stale() == ['GONE.BSE'] and fetched == ['TCS.BSE']
+    # valid until the next close's refresh is due, plus the grace period
+    key = app_module.precompute_key('TCS.BSE', {'days': 3})
+    assert store.fresh([key], now=scheduler.next_run() + 3599) and not store.fresh([key], now=scheduler.next_run() + 3601)
+
+    with app_module.app.test_client() as client:
+        served = client.post('/api/predict', json={'ticker': 'tcs.bse', 'days': 3}).get_json()
+        assert fetched == ['TCS.BSE'] and len(served['predictions']) == 3
+        assert store.get(app_module.precompute_key('TCS.BSE', {'days': 3})) == served
+        client.post('/api/predict', json={'ticker': 'TCS.BSE', 'days': 3, 'model': {'type': 'rf'}})
+        client.post('/api/predict', json={'ticker': 'INFY.BSE', 'days': 3})
+    assert fetched == ['TCS.BSE', 'TCS.BSE', 'INFY.BSE']  # other parameters and tickers: on demand
+
+
+def test_watchlist_from_env(tmp_path, monkeypatch):
+    monkeypatch.setenv('PRECOMPUTE_WATCHLIST', 'tcs.bse, INFY.BSE,,tcs.bse')
+    assert precompute.watchlist_from_env() == ['TCS.BSE', 'INFY.BSE']
+    path = tmp_path / 'watchlist.txt'
+    path.write_text('# banks\nHDFCBANK.BSE\nICICIBANK.BSE\n')
+    monkeypatch.setenv('PRECOMPUTE_WATCHLIST', str(path))
+    assert precompute.watchlist_from_env() == ['HDFCBANK.BSE', 'ICICIBANK.BSE']
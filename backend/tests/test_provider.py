@@ -0,0 +1,118 @@
+import json
+import threading
+import time
+
+import config
+
+
+def test_session_is_pooled_per_process(monkeypatch):
+    monkeypatch.setenv('HTTP_POOL_MAXSIZE', '7')
+    monkeypatch.setenv('HTTP_RETRIES', '2')
+    monkeypatch.setattr(config, '_SESSION', None)
+    s1 = config.get_session()
+    assert config.get_session() is s1
+    adapter = s1.get_adapter(config.AV_URL)
+    assert adapter._pool_maxsize == 7
+    assert adapter.max_retries.total == 2
+    assert 503 in adapter.max_retries.status_forcelist
+
+    # A forked worker (different pid) must not reuse the parent's sockets
+    monkeypatch.setattr(config, '_SESSION_PID', -1)
+    assert config.get_session() is not s1
+
+
+def test_http_timeout_from_env(monkeypatch):
+    monkeypatch.setenv('HTTP_CONNECT_TIMEOUT', '2')
+    monkeypatch.setenv('HTTP_TIMEOUT', '9')
+    assert config._http_timeout() == (2.0, 9.0)
+
+
+def test_token_bucket_is_shared_between_limiters(tmp_path):
+    from ratelimit import RateLimiter
+    # Two instances on one file stand in for two gunicorn workers
+    a = RateLimiter(tmp_path / 'rl.sqlite', rate_per_minute=2, name='av')
+    b = RateLimiter(tmp_path / 'rl.sqlite', rate_per_minute=2, name='av')
+    assert a.try_acquire() == 0.0
+    assert b.try_acquire() == 0.0
+    wait = a.try_acquire()
+    assert 0 < wait <= 30.0
+
+
+def test_scheduler_serves_interactive_before_background():
+    from ratelimit import RequestScheduler, INTERACTIVE, BACKGROUND
+
+    class _Limiter:
+        open = threading.Event()
+
+        def try_acquire(self):
+            return 0.0 if self.open.is_set() else 0.01
+
+    sched = RequestScheduler(_Limiter())
+    order = []
+
+    def call(prio, label):
+        sched.acquire(priority=prio)
+        order.append(label)
+
+    threads = [threading.Thread(target=call, args=(BACKGROUND, 'bg'))]
+    threads[0].start()
+    time.sleep(0.05)
+    threads.append(threading.Thread(target=call, args=(INTERACTIVE, 'ui')))
+    threads[1].start()
+    time.sleep(0.05)
+    _Limiter.open.set()
+    for t in threads:
+        t.join(5)
+    assert order == ['ui', 'bg']
+
+
+def test_throttled_response_is_requeued(tmp_path, monkeypatch):
+    monkeypatch.setenv('RATE_LIMIT_DB', str(tmp_path / 'rl.sqlite'))
+    monkeypatch.setenv('AV_RATE_LIMIT', '6000')
+    payloads = [{'Note': 'Thank you for using Alpha Vantage! Our standard API call frequency is 5 calls per minute'},
+                {'Global Quote': {'05. price': '1.0'}}]
+
+    class _Resp:
+        def __init__(self, j):
+            self._j = j
+
+        def raise_for_status(self):
+            pass
+
+        def json(self):
+            return self._j
+
+        @property
+        def text(self):
+            return json.dumps(self._j)
+
+        @property
+        def content(self):
+            return self.text.encode()
+
+    class _Session:
+        def get(self, url, params=None, timeout=None):
+            return _Resp(payloads.pop(0))
+
+    monkeypatch.setattr(config, 'get_session', lambda: _Session())
+    j = config._av_get({'function': 'GLOBAL_QUOTE', 'symbol': 'ABC', 'apikey': 'k'})
+    assert 'Global Quote' in j
+    assert payloads == []
+
+
+def test_columnar_parse_matches_csv_parse():
+    ts = {
+        '2024-01-03': {'1. open': '3', '2. high': '4', '3. low': '2', '4. close': '3.5', '5. volume': '300'},
+        '2024-01-02': {'1. open': '2', '2. high': '3', '3. low': '1', '4. close': '2.5', '5. volume': '200'},
+        '2024-01-04': {'1. open': '4', '2. high': '5', '3. low': '3', '4. close': 'bad', '5. volume': '400'},
+    }
+    df = config._parse_av_series(ts)
+    assert list(df.columns) == ['open', 'high', 'low', 'close', 'volume']
+    assert df.index.name == 'date'
+    assert [d.strftime('%Y-%m-%d') for d in df.index] == ['2024-01-02', '2024-01-03']  # sorted, bad close dropped
+    assert df['close'].tolist() == [2.5, 3.5]
+
+    csv = 'timestamp,open,high,low,close,volume\r\n2024-01-03,3,4,2,3.5,300\r\n2024-01-02,2,3,1,2.5,200\r\n'
+    df_csv = config._parse_av_csv(csv)
+    assert df_csv.equals(df)
+    assert config._parse_av_csv('{"Note": "x"}').empty
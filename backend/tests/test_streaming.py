@@ -0,0 +1,88 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.linear_model import Ridge
+
+import ml
+from features import compute_technical_indicators
+from local_provider import synthetic_ohlcv
+from streaming import COLUMNS, StreamingIndicators, streaming_indicators_frame
+
+# pandas' rolling skew/kurt keep running power sums; the engine takes exact moments, so allow a little slack
+LOOSE = {'rolling_skew_10', 'rolling_kurt_10'}
+
+
+def _frame(n=400, seed=3):
+    df = synthetic_ohlcv(n, seed=seed)
+    rng = np.random.default_rng(seed)
+    df['market_index'] = 5000 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    # A few flat bars exercise doji, zero ranges and constant windows
+    df.iloc[100:112, :4] = 101.0
+    return df
+
+
+def _assert_parity(expected: pd.DataFrame, actual: pd.DataFrame):
+    for col in COLUMNS:
+        tol = dict(rtol=1e-5, atol=1e-6) if col in LOOSE else dict(rtol=1e-8, atol=1e-9)
+        np.testing.assert_allclose(actual[col].to_numpy(float), expected[col].to_numpy(float),
+                                   equal_nan=True, err_msg=col, **tol)
+
+
+def test_columns_follow_batch_order():
+    df = _frame(60)
+    batch = compute_technical_indicators(df)
+    assert tuple(c for c in batch.columns if c not in df.columns) == COLUMNS
+
+
+def test_replay_matches_compute_technical_indicators():
+    df = _frame()
+    out = streaming_indicators_frame(df)
+    assert list(out.columns) == list(compute_technical_indicators(df).columns)
+    _assert_parity(compute_technical_indicators(df), out)
+
+
+def test_live_updates_match_batch_and_copy_is_independent():
+    df = _frame()
+    engine = StreamingIndicators.from_frame(df.iloc[:300])
+    branch = engine.copy()
+    rows = [engine.push(bar) for bar in df.iloc[300:].to_dict('records')]
+    live = pd.DataFrame(rows, index=df.index[300:])
+    _assert_parity(compute_technical_indicators(df).iloc[300:], live)
+
+    # The branch still sits at bar 300 and diverges on its own data
+    row = branch.update(1.0, 1.0, 1.0, 1.0, 0.0)
+    assert row['close_lag_1'] == pytest.approx(df['close'].iloc[299])
+    with pytest.raises(ValueError):
+        branch.update(1.0, 1.0, 1.0, float('nan'))
+
+
+def test_streaming_forecast_matches_full_recompute(monkeypatch):
+    df = _frame(300).asfreq('D').ffill()
+    # as in production, the benchmark ends on the ticker's last bar: the forecast bars have no index bar
+    market = pd.Series(np.linspace(5000, 5600, len(df)), index=df.index)
+    fundamentals = {'eps': 10.0, 'pe': 20.0, 'peg': 1.5, 'pb': 3.0, 'market_index': market}
+
+    preds = ml.train_and_predict_ml(df, fundamentals, steps=4)
+    monkeypatch.setattr(ml, '_forecast_streaming',
+                        lambda model, hist, feats, cols, f, steps: ml._forecast_recompute(model, hist, f, steps))
+    expected = ml.train_and_predict_ml(df, fundamentals, steps=4)
+    np.testing.assert_allclose(preds, expected, rtol=1e-9)
+    assert len(set(np.round(preds, 8))) == len(preds)  # predicted bars really feed back into the features
+
+
+def test_direct_strategy_predicts_every_horizon_in_one_call(monkeypatch):
+    df = _frame(300)
+    fundamentals = {'eps': 10.0, 'pe': 20.0, 'peg': 1.5, 'pb': 3.0,
+                    'market_index': pd.Series(np.linspace(5000, 5600, len(df)), index=df.index)}
+    monkeypatch.setattr(ml, '_forecast_streaming', None)  # no feature loop
+    monkeypatch.setattr(ml, '_forecast_recompute', None)
+    preds = ml.train_and_predict_ml(df, fundamentals, steps=4, strategy='direct')
+    assert len(preds) == 4 and all(np.isfinite(preds))
+
+    # each horizon is an independent ridge on the rows where every horizon's target is known
+    feats = ml.cached_features(df, fundamentals)
+    X = feats.iloc[:-4].dropna()
+    model = Ridge(alpha=1.0).fit(X, feats['close'].shift(-1).loc[X.index])
+    assert preds[0] == pytest.approx(model.predict(feats.iloc[[-1]])[0], rel=1e-9)
+    with pytest.raises(ValueError):
+        ml.train_and_predict_ml(df, fundamentals, strategy='sideways')
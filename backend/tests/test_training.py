@@ -0,0 +1,66 @@
+import time
+
+import pytest
+
+import app as app_module
+import training
+from local_provider import synthetic_ohlcv
+from ratelimit import BACKGROUND, INTERACTIVE
+from training import TrainingExecutor, TrainingQueueFull
+
+
+def _finished_at(delay):
+    time.sleep(delay)
+    return time.time()
+
+
+@pytest.fixture
+def executor():
+    pool = TrainingExecutor(workers=1, threads_per_job=2, max_queue=1)
+    yield pool
+    pool.shutdown()
+
+
+def test_jobs_run_capped_and_interactive_fits_go_first(executor):
+    assert executor.submit(training.job_threads).result() == 2
+
+    busy = executor.submit(_finished_at, 0.3, priority=BACKGROUND)
+    batch = executor.submit(_finished_at, 0, priority=BACKGROUND)
+    interactive = executor.submit(_finished_at, 0, priority=INTERACTIVE)
+    # one interactive fit already waits for the only process
+    with pytest.raises(TrainingQueueFull):
+        executor.submit(_finished_at, 0, priority=INTERACTIVE)
+    assert executor.stats()['queued'] == 2
+    # background jobs are never turned away
+    late = executor.submit(_finished_at, 0, priority=BACKGROUND)
+
+    assert busy.result() < interactive.result() < batch.result() < late.result()
+    stats = executor.stats()
+    assert stats['completed'] == 5 and stats['rejected'] == 1 and stats['running'] == stats['queued'] == 0
+
+
+def test_offloaded_fit_matches_inline_fit(executor, monkeypatch):
+    df = synthetic_ohlcv(300, seed=5)
+    fundamentals = {'eps': 10.0, 'pe': 20.0, 'peg': 1.5, 'pb': 3.0, 'market_index': synthetic_ohlcv(301, seed=6)['close']}
+    monkeypatch.setattr(app_module, 'training_executor', lambda: executor)
+    monkeypatch.setattr(app_module, 'offloaded', lambda model_type: True)
+    pooled = app_module.fit_and_predict(df, fundamentals, steps=3, window=200)
+    assert executor.stats()['completed'] == 1
+
+    monkeypatch.setattr(app_module, 'offloaded', lambda model_type: False)
+    assert app_module.fit_and_predict(df, fundamentals, steps=3, window=200) == pytest.approx(pooled)
+
+
+def test_train_workers_setting(monkeypatch, caplog):
+    monkeypatch.delenv('BATCH_FIT_WORKERS', raising=False)
+    monkeypatch.setenv('TRAIN_WORKERS', '0')
+    assert training.training_executor() is None
+    assert not training.offloaded('rf')
+
+    # the deprecated name still applies when TRAIN_WORKERS is unset, with a warning
+    monkeypatch.delenv('TRAIN_WORKERS')
+    monkeypatch.setenv('BATCH_FIT_WORKERS', '0')
+    monkeypatch.setattr(training, '_WARNED_LEGACY', False)
+    with caplog.at_level('WARNING', logger='training'):
+        assert training.training_executor() is None
+    assert 'BATCH_FIT_WORKERS is deprecated' in caplog.text
@@ -0,0 +1,91 @@
+"""Per-request stage timings.
+
+A Timeline is bound to the current context (like ratelimit.provider_priority),
+so code anywhere below a route can record a stage with
+
+    with span('fit'):
+        model.fit(X, y)
+
+without threading a timer through every signature. Outside a timeline span()
+is a no-op costing one ContextVar lookup, and that includes process-pool
+workers. The Flask app renders the collected spans as a Server-Timing header
+and a structured log line.
+"""
+import re
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+_TIMELINE: ContextVar[Optional['Timeline']] = ContextVar('timeline', default=None)
+_TOKEN_RE = re.compile(r'[^A-Za-z0-9_.\-]')
+
+
+class Timeline:
+    """Ordered stage durations for one request; repeated stage names accumulate."""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self._spans: dict = {}
+        self._counts: dict = {}
+
+    def add(self, name: str, seconds: float) -> None:
+        self._spans[name] = self._spans.get(name, 0.0) + seconds
+        self._counts[name] = self._counts.get(name, 0) + 1
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.start
+
+    def as_dict(self) -> dict:
+        """{stage: milliseconds} plus 'total'; stages hit more than once also report '<stage>.count'."""
+        out = {}
+        for name, secs in self._spans.items():
+            out[name] = round(secs * 1000.0, 3)
+            if self._counts[name] > 1:
+                out[f'{name}.count'] = self._counts[name]
+        out['total'] = round(self.elapsed() * 1000.0, 3)
+        return out
+
+    def server_timing(self) -> str:
+        """Server-Timing header value, e.g. 'history;dur=12.1, fit;dur=80.4, total;dur=95.0'."""
+        parts = [f'{_TOKEN_RE.sub("_", name)};dur={secs * 1000.0:.1f}' for name, secs in self._spans.items()]
+        parts.append(f'total;dur={self.elapsed() * 1000.0:.1f}')
+        return ', '.join(parts)
+
+
+def current_timeline() -> Optional[Timeline]:
+    return _TIMELINE.get()
+
+
+def start_timeline():
+    """Bind a fresh Timeline to the current context; returns (timeline, token) for stop_timeline()."""
+    tl = Timeline()
+    return tl, _TIMELINE.set(tl)
+
+
+def stop_timeline(token) -> None:
+    _TIMELINE.reset(token)
+
+
+@contextmanager
+def timeline():
+    """Context manager form of start_timeline()/stop_timeline()."""
+    tl, token = start_timeline()
+    try:
+        yield tl
+    finally:
+        stop_timeline(token)
+
+
+@contextmanager
+def span(name: str):
+    """Record the wall time of the enclosed block on the current timeline, if any."""
+    tl = _TIMELINE.get()
+    if tl is None:
+        yield
+        return
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        tl.add(name, time.perf_counter() - t0)
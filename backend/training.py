@@ -0,0 +1,201 @@
+"""Model training on one process pool shared by every request.
+
+RandomForestRegressor(n_jobs=-1) started a thread per core for every fit, so a
+few concurrent forest requests across gunicorn workers oversubscribed the host
+many times over. Fits now go through TrainingExecutor instead:
+- TRAIN_WORKERS processes train, one job each at a time.
+- Every job is capped at TRAIN_THREADS_PER_JOB threads. The cap covers the
+  forest's joblib workers (see job_threads()) and the BLAS pools.
+- Further jobs wait in a queue. Interactive fits are dispatched before
+  background ones (batch, precompute), following the provider_priority of
+  the submitting context.
+
+Web threads only wait for the result, so /health and cached reads are served
+while the pool is busy. TRAIN_QUEUE_MAX bounds the interactive fits waiting for
+a process. Beyond it, submit() raises TrainingQueueFull, and /api/predict
+answers with the drift projection instead of holding another web thread.
+"""
+import heapq
+import itertools
+import logging
+import os
+import threading
+from concurrent.futures import CancelledError, Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+
+try:
+    from .ratelimit import INTERACTIVE, current_priority
+except Exception:
+    from ratelimit import INTERACTIVE, current_priority  # type: ignore
+
+try:
+    from threadpoolctl import threadpool_limits
+except ImportError:  # installed with scikit-learn; without it only the env vars cap BLAS
+    threadpool_limits = None
+
+LOG = logging.getLogger(__name__)
+
+_THREAD_ENV = ('OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS')
+_JOB_THREADS: Optional[int] = None  # set in pool processes
+_LIMITS = None
+
+
+class TrainingQueueFull(RuntimeError):
+    """Raised when TRAIN_QUEUE_MAX interactive fits are already waiting for a process."""
+
+
+def job_threads() -> int:
+    """Threads a single fit may use: n_jobs for estimators that parallelize themselves."""
+    if _JOB_THREADS is not None:
+        return _JOB_THREADS
+    return max(1, int(os.environ.get('TRAIN_THREADS_PER_JOB', 1)))
+
+
+def _init_worker(threads: int) -> None:
+    global _JOB_THREADS, _LIMITS
+    _JOB_THREADS = threads
+    for name in _THREAD_ENV:
+        os.environ[name] = str(threads)
+    if threadpool_limits is not None:
+        # the pools of BLAS libraries loaded before the fork ignore the env vars
+        _LIMITS = threadpool_limits(limits=threads)
+
+
+class TrainingExecutor:
+    """Process pool with a priority queue in front of it.
+
+    Only `workers` jobs are handed to the pool at a time, so the rest stay in this
+    process's queue, ordered by (priority, arrival). They can be reordered there,
+    and counted, which a ProcessPoolExecutor's internal queue does not allow.
+    """
+
+    def __init__(self, workers: int, threads_per_job: int = 1, max_queue: int = 64):
+        self.workers = max(1, int(workers))
+        self.threads_per_job = max(1, int(threads_per_job))
+        self.max_queue = int(max_queue)
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._queue = []  # heap of (priority, seq, future, fn, args, kwargs)
+        self._seq = itertools.count()
+        self._running = 0
+        # reentrant: a job that is already done runs its callback inside _dispatch()
+        self._lock = threading.RLock()
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+
+    def submit(self, fn, *args, priority: Optional[int] = None, **kwargs) -> Future:
+        """Queue fn(*args, **kwargs) for a pool process; priority defaults to the current provider_priority."""
+        prio = current_priority() if priority is None else priority
+        fut = Future()
+        with self._lock:
+            if prio <= INTERACTIVE and self.max_queue >= 0 and self._running >= self.workers:
+                waiting = sum(1 for item in self._queue if item[0] <= INTERACTIVE)
+                if waiting >= self.max_queue:
+                    self.rejected += 1
+                    raise TrainingQueueFull(f'{waiting} interactive fits already queued')
+            heapq.heappush(self._queue, (prio, next(self._seq), fut, fn, args, kwargs))
+            self.submitted += 1
+            self._dispatch()
+        return fut
+
+    def _dispatch(self) -> None:
+        # with self._lock held
+        while self._running < self.workers and self._queue:
+            _, _, fut, fn, args, kwargs = heapq.heappop(self._queue)
+            if not fut.set_running_or_notify_cancel():
+                continue
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                                 initargs=(self.threads_per_job,))
+            try:
+                inner = self._pool.submit(fn, *args, **kwargs)
+            except BrokenProcessPool as e:
+                # a process died (e.g. OOM-killed): start a fresh pool for the next job
+                LOG.error('training pool broken, restarting it: %s', e)
+                self._pool = None
+                self.failed += 1
+                fut.set_exception(e)
+                continue
+            self._running += 1
+            inner.add_done_callback(lambda inner, fut=fut: self._finished(inner, fut))
+
+    def _finished(self, inner: Future, fut: Future) -> None:
+        error = CancelledError() if inner.cancelled() else inner.exception()
+        with self._lock:
+            self._running -= 1
+            if error is None:
+                self.completed += 1
+            else:
+                self.failed += 1
+                if isinstance(error, BrokenProcessPool):
+                    self._pool = None
+            self._dispatch()
+        if error is None:
+            fut.set_result(inner.result())
+        else:
+            fut.set_exception(error)
+
+    def shutdown(self, wait: bool = True) -> None:
+        with self._lock:
+            pool, self._pool = self._pool, None
+            queued, self._queue = self._queue, []
+        for item in queued:
+            item[2].cancel()
+        if pool is not None:
+            pool.shutdown(wait=wait)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {'workers': self.workers, 'threads_per_job': self.threads_per_job, 'running': self._running,
+                    'queued': len(self._queue), 'max_queue': self.max_queue, 'submitted': self.submitted,
+                    'completed': self.completed, 'failed': self.failed, 'rejected': self.rejected}
+
+
+_EXECUTOR: Optional[TrainingExecutor] = None
+_EXECUTOR_LOCK = threading.Lock()
+
+
+_WARNED_LEGACY = False
+
+
+def _workers_from_env() -> int:
+    global _WARNED_LEGACY
+    raw = os.environ.get('TRAIN_WORKERS')
+    if not raw and os.environ.get('BATCH_FIT_WORKERS'):
+        # deprecated: the setting's name from when only batch fits used the pool
+        raw = os.environ['BATCH_FIT_WORKERS']
+        if not _WARNED_LEGACY:
+            LOG.warning('BATCH_FIT_WORKERS is deprecated; set TRAIN_WORKERS instead')
+            _WARNED_LEGACY = True
+    if raw:
+        return int(raw)
+    return max(1, (os.cpu_count() or 1) // job_threads())
+
+
+def training_executor() -> Optional[TrainingExecutor]:
+    """The process's TrainingExecutor, or None when fits run in the calling thread (TRAIN_WORKERS=0)."""
+    global _EXECUTOR
+    workers = _workers_from_env()
+    if workers <= 0:
+        return None
+    with _EXECUTOR_LOCK:
+        if _EXECUTOR is None:
+            _EXECUTOR = TrainingExecutor(workers, job_threads(), int(os.environ.get('TRAIN_QUEUE_MAX', 64)))
+        return _EXECUTOR
+
+
+def offloaded(model_type: Optional[str]) -> bool:
+    """True if a single prediction's fit goes to the pool rather than the request's thread.
+
+    TRAIN_INLINE_MODELS (default: ridge) lists the model types fitted inline. A ridge fit takes
+    milliseconds and is updated bar by bar from the in-process model registry and feature cache,
+    which a pool process does not share.
+    """
+    inline = {m.strip().lower() for m in os.environ.get('TRAIN_INLINE_MODELS', 'ridge').split(',') if m.strip()}
+    return (model_type or 'ridge').lower() not in inline and training_executor() is not None
+
+
+def training_stats() -> Optional[dict]:
+    return None if _EXECUTOR is None else _EXECUTOR.stats()